@@ -1,7 +1,241 @@
-from django.contrib import admin
-from .models import Employee, ScheduleEntry, CalendarEvent
+import logging
 
-# Register your models here.
-admin.site.register(Employee)
-admin.site.register(ScheduleEntry)
-admin.site.register(CalendarEvent)
\ No newline at end of file
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
+
+from . import schedule_edits
+from .google_calendar import get_stored_calendar
+from .models import Employee, ScheduleEntry, CalendarEvent, Absence, CalendarSyncState, ProfileReport
+from .schedule_edits import ScheduleEditError
+
+logger = logging.getLogger(__name__)
+
+# Below this many rows the estimate is not worth it: count exactly
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that, on PostgreSQL, takes the planner's row estimate for an
+    unfiltered changelist instead of running COUNT(*) over the whole table.
+    Filtered or searched lists, small tables and other databases are
+    counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class ReassignForm(forms.Form):
+    # Searched through EmployeeAdmin instead of listing every employee
+    employee = forms.ModelChoiceField(
+        queryset=Employee.objects.all(),
+        label="担当者",
+        widget=AutocompleteSelect(ScheduleEntry._meta.get_field("assigned_employee"), admin.site),
+    )
+
+
+@admin.register(Employee)
+class EmployeeAdmin(admin.ModelAdmin):
+    list_display = ("name", "employee_id", "email", "role", "order", "order_gyomu", "is_rotation_active")
+    list_filter = ("role", "is_rotation_active")
+    # Also used by the assigned_employee autocomplete of the other admins
+    search_fields = ("name", "employee_id", "email")
+    ordering = ("order",)
+    actions = ("activate_rotation", "deactivate_rotation")
+
+    @admin.action(description="選択した社員をローテーションに戻す")
+    def activate_rotation(self, request, queryset):
+        updated = queryset.update(is_rotation_active=True)
+        self.message_user(request, f"{updated}名をローテーションに戻しました。", messages.SUCCESS)
+
+    @admin.action(description="選択した社員をローテーションから外す")
+    def deactivate_rotation(self, request, queryset):
+        updated = queryset.update(is_rotation_active=False)
+        self.message_user(request, f"{updated}名をローテーションから外しました。", messages.SUCCESS)
+
+
+@admin.register(ScheduleEntry)
+class ScheduleEntryAdmin(admin.ModelAdmin):
+    """
+    Changelist sized for years of entries: the assignee is joined instead
+    of queried per row, filters and the date drill-down use indexes on
+    date, and the full table is never counted (see EstimatedCountPaginator).
+    """
+    list_display = ("date", "speech_type", "assigned_employee", "is_cancelled", "is_sent")
+    list_select_related = ("assigned_employee",)
+    list_filter = ("speech_type", "is_sent", "is_cancelled")
+    date_hierarchy = "date"
+    search_fields = ("assigned_employee__name", "=google_event_id")
+    autocomplete_fields = ("assigned_employee",)
+    raw_id_fields = ("batch",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ("cancel_entries", "reassign_entries", "mark_unsent")
+
+    def _apply_edit(self, request, queryset, edit, *args, success):
+        """
+        Run a schedule edit (core/schedule_edits.py) on every selected entry,
+        so sent entries get their calendar events updated and the rotation
+        is adjusted as for the same edit made from the schedule preview.
+        Uses the server-side Google credentials.
+
+        A failure (a refused edit, or any error from Google or the transport)
+        only skips that entry, so the summary always lists what was done.
+        """
+        calendar = get_stored_calendar()
+        done, errors = 0, []
+        for entry_id, day in queryset.order_by("date").values_list("id", "date"):
+            try:
+                edit(calendar, entry_id, *args)
+            except ScheduleEditError as e:
+                errors.append(f"{day}: {e}")
+            except Exception as e:
+                logger.exception("Admin edit %s failed for entry %s", edit.__name__, entry_id)
+                errors.append(f"{day}: Google Calendar の更新に失敗しました: {e}")
+            else:
+                done += 1
+
+        if done:
+            self.message_user(request, success.format(count=done), messages.SUCCESS)
+        for error in errors[:10]:
+            self.message_user(request, error, messages.ERROR)
+        if len(errors) > 10:
+            self.message_user(request, f"ほか{len(errors) - 10}件が失敗しました。", messages.ERROR)
+
+    @admin.action(description="選択した予定をキャンセルにする")
+    def cancel_entries(self, request, queryset):
+        self._apply_edit(request, queryset, schedule_edits.cancel_entry, success="{count}件をキャンセルにしました。")
+
+    @admin.action(description="選択した予定を未送信に戻す")
+    def mark_unsent(self, request, queryset):
+        # Only for months that are not sent (e.g. after a partly failed
+        # retract): deletes the calendar events, so the next send of the
+        # month creates them again instead of duplicating them
+        self._apply_edit(request, queryset, schedule_edits.unsend_entry, success="{count}件を未送信に戻しました。")
+
+    @admin.action(description="選択した予定の担当者を変更する")
+    def reassign_entries(self, request, queryset):
+        form = ReassignForm(request.POST if "apply" in request.POST else None)
+        if form.is_valid():
+            employee = form.cleaned_data["employee"]
+            self._apply_edit(
+                request, queryset, schedule_edits.reassign_entry, employee.pk,
+                success=f"{{count}}件の担当者を{employee.name}に変更しました。",
+            )
+            return None
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "担当者の変更",
+            "opts": self.model._meta,
+            "form": form,
+            "entries": queryset.select_related("assigned_employee")[:100],
+            "count": queryset.count(),
+            "action_checkbox_name": admin.helpers.ACTION_CHECKBOX_NAME,
+            "selected": request.POST.getlist(admin.helpers.ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across", "0"),
+        }
+        return TemplateResponse(request, "admin/core/scheduleentry/reassign.html", context)
+
+
+@admin.register(CalendarEvent)
+class CalendarEventAdmin(admin.ModelAdmin):
+    list_display = ("google_calendar_event_id", "calendar_email", "schedule_entry", "created_at")
+    list_select_related = ("schedule_entry",)
+    search_fields = ("=google_calendar_event_id", "calendar_email")
+    raw_id_fields = ("schedule_entry",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Absence)
+class AbsenceAdmin(admin.ModelAdmin):
+    list_display = ("employee", "start_date", "end_date", "reason")
+    list_select_related = ("employee",)
+    date_hierarchy = "start_date"
+    search_fields = ("employee__name", "reason")
+    autocomplete_fields = ("employee",)
+
+
+admin.site.register(CalendarSyncState)
+
+
+@admin.register(ProfileReport)
+class ProfileReportAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the requests profiled by core/profiling.py.
+    """
+    list_display = (
+        "created_at", "method", "path", "status_code", "user",
+        "duration_ms", "query_count", "query_ms", "api_call_count", "api_ms",
+    )
+    list_filter = ("method", "status_code")
+    search_fields = ("path", "user")
+    fields = (
+        ("created_at", "method", "path", "status_code", "user"),
+        ("duration_ms", "query_count", "query_ms", "api_call_count", "api_ms"),
+        "duplicate_queries", "query_table", "api_call_table", "profile_output",
+    )
+    readonly_fields = fields[0] + fields[1] + fields[2:]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="重複クエリ")
+    def duplicate_queries(self, obj):
+        # The same statement run many times usually means a query per row
+        counts = {}
+        for query in obj.queries:
+            counts[query["sql"]] = counts.get(query["sql"], 0) + 1
+        repeated = sorted(((n, sql) for sql, n in counts.items() if n > 1), reverse=True)
+        if not repeated:
+            return "-"
+        return format_html(
+            "<table>{}</table>",
+            format_html_join("", "<tr><td>{}×</td><td><code>{}</code></td></tr>", repeated),
+        )
+
+    @admin.display(description="SQL")
+    def query_table(self, obj):
+        return format_html(
+            "<table><tr><th>ms</th><th>呼び出し元</th><th>SQL</th></tr>{}</table>",
+            format_html_join(
+                "", "<tr><td>{}</td><td>{}</td><td><code>{}</code></td></tr>",
+                ((query["ms"], query["origin"], query["sql"]) for query in obj.queries),
+            ),
+        )
+
+    @admin.display(description="Google API")
+    def api_call_table(self, obj):
+        return format_html(
+            "<table><tr><th>ms</th><th>method</th><th>bytes</th><th>URI</th></tr>{}</table>",
+            format_html_join(
+                "", "<tr><td>{}</td><td>{}</td><td>{}</td><td><code>{}</code></td></tr>",
+                ((call["ms"], call["method"], call["bytes"], call["uri"]) for call in obj.api_calls),
+            ),
+        )
+
+    @admin.display(description="プロファイル")
+    def profile_output(self, obj):
+        return format_html("<p>{}</p><pre>{}</pre>", obj.profiler, obj.profile)
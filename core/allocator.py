@@ -0,0 +1,118 @@
+"""
+Race-free allocation of employee IDs and rotation order slots.
+
+Values come from named rows of the Counter table. A block of `n` values is
+reserved with a single `UPDATE ... SET value = value + n`, which holds the
+row lock until the transaction ends, so concurrent callers (several workers,
+a bulk import running next to the add-member form) always receive disjoint
+ranges and never have to retry. Values that are allocated but never used
+simply leave gaps, like a database sequence.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Counter, Employee
+
+EMPLOYEE_ID_COUNTER = "employee_id"
+ORDER_COUNTER = "order"
+ORDER_GYOMU_COUNTER = "order_gyomu"
+
+EMPLOYEE_ID_PREFIX = "EMP"
+
+
+def format_employee_id(number):
+    return f"{EMPLOYEE_ID_PREFIX}{number:03d}"
+
+
+def _initial_value(name):
+    """
+    Highest value currently in use for the counter, used when a counter row
+    does not exist yet (the 0007 migration normally seeds them).
+    """
+    if name == EMPLOYEE_ID_COUNTER:
+        pattern = re.compile(rf"{EMPLOYEE_ID_PREFIX}(\d+)")
+        numbers = [
+            int(match.group(1))
+            for match in map(pattern.fullmatch, Employee.objects.values_list("employee_id", flat=True))
+            if match
+        ]
+        return max(numbers, default=0)
+    return Employee.objects.aggregate(value=Max(name))["value"] or 0
+
+
+def allocate(name, count=1):
+    """
+    Atomically reserve `count` consecutive values from the named counter.
+
+    Returns:
+        range of the reserved values
+    """
+    if count < 1:
+        return range(0)
+
+    with transaction.atomic():
+        counters = Counter.objects.filter(name=name)
+        if not counters.update(value=F("value") + count):
+            Counter.objects.get_or_create(name=name, defaults={"value": _initial_value(name)})
+            counters.update(value=F("value") + count)
+        end = counters.values_list("value", flat=True).get()
+
+    return range(end - count + 1, end + 1)
+
+
+def allocate_employee_ids(count=1):
+    """
+    Reserve `count` new employee IDs (EMP001, EMP002, ...).
+    """
+    return [format_employee_id(number) for number in allocate(EMPLOYEE_ID_COUNTER, count)]
+
+
+def allocate_order_slots(count=1):
+    """
+    Reserve `count` positions at the end of both rotations.
+
+    Returns:
+        List of (order, order_gyomu) tuples
+    """
+    return list(zip(allocate(ORDER_COUNTER, count), allocate(ORDER_GYOMU_COUNTER, count)))
+
+
+def _break_ties(name):
+    """
+    Give employees who share a position in the `name` rotation distinct
+    positions, keeping their (name, id) order: each tied value is moved up
+    just past the one before it. Nothing is written without ties.
+    """
+    tied = Employee.objects.order_by().values(name).annotate(count=Count("id")).filter(count__gt=1)
+    if not tied.exists():
+        return
+    changed = []
+    previous = None
+    for pk, value in Employee.objects.order_by(name, "id").values_list("id", name):
+        if previous is not None and value <= previous:
+            value = previous + 1
+            changed.append(Employee(id=pk, **{name: value}))
+        previous = value
+    Employee.objects.bulk_update(changed, [name])
+
+
+def sync_order_counters():
+    """
+    Move the order counters back to the current maximum after the rotation
+    has been renumbered (member removal, rotation update), so newly added
+    members continue right after the last position instead of after every
+    slot ever handed out. One UPDATE per counter.
+
+    Tied positions are spread out first (see _break_ties): a renumbering
+    that skips some employees (advance_rotation only renumbers the active
+    ones) or a slot reserved by an add that had not committed yet would
+    otherwise leave two employees on one position, and moving either of
+    them in the dashboard would have no effect.
+    """
+    for name in (ORDER_COUNTER, ORDER_GYOMU_COUNTER):
+        _break_ties(name)
+        current_max = Employee.objects.order_by(f"-{name}").values(name)[:1]
+        Counter.objects.filter(name=name).update(value=Coalesce(Subquery(current_max), 0))
@@ -0,0 +1,126 @@
+"""
+Cache helpers for the dashboard and the iCalendar feeds.
+
+Cached data is stored under keys that embed a data version. Versions are
+bumped (see core/signals.py) whenever the underlying models are written, so
+stale entries are simply never read again and expire on their own.
+
+Versions are nanosecond timestamps rather than counters: a bumped version can
+never go back to a previously used value (even if the key was evicted), and
+it doubles as a Last-Modified time for the feeds.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+DASHBOARD_VERSION_KEY = "core:dashboard:version"
+
+# Bumped on any change that affects the roster feed
+FEED_ROSTER_VERSION_KEY = "core:feeds:roster:version"
+# Bumped by bulk writes, where the affected employees are unknown
+FEED_EPOCH_KEY = "core:feeds:epoch"
+
+
+def _get_versions(*keys):
+    """
+    Return the current versions for `keys` (one cache round trip),
+    initialising any missing ones.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = time.time_ns()
+            if not cache.add(key, version, timeout=None):
+                # Another process initialised it first
+                version = cache.get(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def _bump_versions(*keys):
+    version = time.time_ns()
+    cache.set_many({key: version for key in keys}, timeout=None)
+
+
+# =====================================================
+# Dashboard
+# =====================================================
+
+def get_dashboard_version():
+    """
+    Return the current dashboard data version, initialising it if missing.
+    """
+    [version] = _get_versions(DASHBOARD_VERSION_KEY)
+    return version
+
+
+def bump_dashboard_version():
+    """
+    Invalidate every cached dashboard context.
+    """
+    _bump_versions(DASHBOARD_VERSION_KEY)
+
+
+def get_dashboard_context(today, build_context):
+    """
+    Return the cached dashboard context for `today`, building it with
+    `build_context(today)` on a miss.
+
+    The date is part of the key because "days passed" and the current/next
+    month depend on it.
+    """
+    key = f"core:dashboard:context:{get_dashboard_version()}:{today.isoformat()}"
+    context = cache.get(key)
+    if context is None:
+        context = build_context(today)
+        cache.set(key, context, settings.DASHBOARD_CACHE_TIMEOUT)
+    return context
+
+
+# =====================================================
+# iCalendar feeds
+# =====================================================
+
+def employee_feed_version_key(employee_id):
+    return f"core:feeds:employee:{employee_id}:version"
+
+
+def get_employee_feed_versions(employee_id):
+    """
+    Return (epoch, employee_version) for an employee's feed.
+    """
+    epoch, version = _get_versions(FEED_EPOCH_KEY, employee_feed_version_key(employee_id))
+    return epoch, version
+
+
+def get_roster_feed_version():
+    [version] = _get_versions(FEED_ROSTER_VERSION_KEY)
+    return version
+
+
+def get_employee_versions(employee_ids):
+    """
+    Return {employee_id: version} for many employees in one cache round trip.
+
+    These are the feed versions, which change whenever the employee or one
+    of their schedule entries is written, so they also key per-employee
+    fragments such as the dashboard rows.
+    """
+    employee_ids = list(employee_ids)
+    epoch, *versions = _get_versions(FEED_EPOCH_KEY, *(employee_feed_version_key(pk) for pk in employee_ids))
+    return {pk: f"{epoch}.{version}" for pk, version in zip(employee_ids, versions)}
+
+
+def bump_employee_feed_versions(employee_ids):
+    """
+    Invalidate the feeds of the given employees (and the roster feed).
+    """
+    _bump_versions(FEED_ROSTER_VERSION_KEY, *(employee_feed_version_key(pk) for pk in employee_ids))
+
+
+def bump_feed_epoch():
+    """
+    Invalidate every feed, for writes whose affected employees are unknown.
+    """
+    _bump_versions(FEED_EPOCH_KEY, FEED_ROSTER_VERSION_KEY)
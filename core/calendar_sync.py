@@ -0,0 +1,456 @@
+"""
+Incremental ingestion of changes made directly in Google Calendar.
+
+The first sync walks the calendar once to obtain a syncToken; every later
+events().list(syncToken=...) returns only the events changed since, so
+detecting drift costs one small call. Changes are applied to the matching
+ScheduleEntry rows in bulk:
+
+- an event deleted in the calendar clears google_event_id / is_sent, so a
+  later retract or resend does not trip over it;
+- an event whose attendee was changed to another employee's address is
+  reassigned to that employee.
+
+A push channel (events().watch) can be registered so Google notifies the
+webhook view. The view answers at once and request_sync() runs the same
+incremental sync in a background thread, coalescing bursts of
+notifications into one sync at a time across workers.
+
+reconcile_calendar() is the full check for a date range: one paged listing
+is diffed against the entries in memory, and repairs go out as batch requests.
+
+send_batch() / retract_batch() publish or withdraw a whole month; the send and
+retract views are thin adapters over them.
+
+All functions take a CalendarGateway (core/google_calendar.py).
+"""
+import logging
+import secrets
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.functions import Lower
+from django.utils import timezone as django_timezone
+
+from .google_calendar import build_event_body, get_stored_calendar, is_gone
+from .models import CalendarSyncState, Employee, ScheduleEntry, SpeechType
+
+# Only what each job reads
+SYNC_FIELDS = "id,status,attendees(email)"
+RECONCILE_FIELDS = "id,summary,attendees(email)"
+APPLY_CHUNK_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def get_sync_state(calendar):
+    state, _created = CalendarSyncState.objects.get_or_create(calendar_id=calendar.calendar_id)
+    return state
+
+
+def apply_changes(changes):
+    """
+    Update the ScheduleEntry rows matching changed events, in bulk.
+
+    Args:
+        changes: Dict {event_id: EventInfo}
+
+    Returns:
+        Dict {"deleted": n, "reassigned": n}
+    """
+    stats = {"deleted": 0, "reassigned": 0}
+    event_ids = list(changes)
+
+    for start in range(0, len(event_ids), APPLY_CHUNK_SIZE):
+        chunk = event_ids[start:start + APPLY_CHUNK_SIZE]
+        entries = list(
+            ScheduleEntry.objects.filter(google_event_id__in=chunk)
+            .only("id", "google_event_id", "is_sent", "assigned_employee")
+        )
+        # Emails are matched case-insensitively, as by the roster import
+        emails = set()
+        for entry in entries:
+            event = changes[entry.google_event_id]
+            if event.status != "cancelled" and event.attendee:
+                emails.add(event.attendee.lower())
+        employees = dict(
+            Employee.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=emails)
+            .values_list("email_lower", "id")
+        )
+
+        changed = []
+        for entry in entries:
+            event = changes[entry.google_event_id]
+            if event.status == "cancelled":
+                entry.google_event_id = None
+                entry.is_sent = False
+                changed.append(entry)
+                stats["deleted"] += 1
+                continue
+
+            employee_id = employees.get((event.attendee or "").lower())
+            if employee_id and employee_id != entry.assigned_employee_id:
+                entry.assigned_employee_id = employee_id
+                changed.append(entry)
+                stats["reassigned"] += 1
+
+        if changed:
+            ScheduleEntry.objects.bulk_update(changed, ["google_event_id", "is_sent", "assigned_employee"])
+    return stats
+
+
+def sync_calendar(calendar):
+    """
+    Fetch the events changed since the last sync and apply them.
+    An expired sync token (410 Gone) falls back to a full listing.
+
+    Returns:
+        Dict {"changed": n, "deleted": n, "reassigned": n, "full": bool}
+    """
+    state = get_sync_state(calendar)
+    full = not state.sync_token
+    try:
+        if full:
+            changes, next_token = calendar.list_events(SYNC_FIELDS, showDeleted=True)
+        else:
+            changes, next_token = calendar.list_events(SYNC_FIELDS, showDeleted=True, syncToken=state.sync_token)
+    except Exception as e:
+        # 410 Gone: the sync token expired
+        if full or not is_gone(e):
+            raise
+        full = True
+        changes, next_token = calendar.list_events(SYNC_FIELDS, showDeleted=True)
+
+    stats = apply_changes(changes)
+    state.sync_token = next_token
+    state.last_synced_at = django_timezone.now()
+    state.save(update_fields=["sync_token", "last_synced_at"])
+    return {"changed": len(changes), "full": full, **stats}
+
+
+# =====================================================
+# Push notifications
+# =====================================================
+
+CHANNEL_FIELDS = ["channel_id", "channel_token", "channel_resource_id", "channel_expiration"]
+
+
+def watch_calendar(calendar, address):
+    """
+    Register a push channel that notifies `address` (the webhook URL)
+    of changes, replacing any channel registered before.
+    """
+    state = get_sync_state(calendar)
+    if state.channel_id:
+        stop_watch(calendar, state)
+
+    channel = calendar.watch(uuid.uuid4().hex, secrets.token_urlsafe(32), address)
+    state.channel_id = channel.id
+    state.channel_token = channel.token
+    state.channel_resource_id = channel.resource_id
+    state.channel_expiration = channel.expiration
+    state.save(update_fields=CHANNEL_FIELDS)
+    return state
+
+
+def stop_watch(calendar, state):
+    calendar.stop_channel(state.channel_id, state.channel_resource_id)
+    state.channel_id = state.channel_token = state.channel_resource_id = None
+    state.channel_expiration = None
+    state.save(update_fields=CHANNEL_FIELDS)
+
+
+SYNC_PENDING_KEY = "calendar_sync:pending"
+SYNC_LOCK_KEY = "calendar_sync:running"
+# Longest a sync may hold the lock, so one killed mid-sync does not block
+# the next notifications for good
+SYNC_LOCK_TIMEOUT = 600
+
+
+def request_sync():
+    """
+    Ask for an incremental sync after a push notification, without running
+    it in the request. The sync is marked pending and, unless one is already
+    running (in any worker, with a shared cache), started in a background
+    thread. A running sync repeats while notifications keep arriving, so a
+    burst costs one or two syncs instead of one per notification.
+
+    Returns:
+        True if this call started the sync thread
+    """
+    cache.set(SYNC_PENDING_KEY, True, timeout=SYNC_LOCK_TIMEOUT)
+    if not cache.add(SYNC_LOCK_KEY, True, timeout=SYNC_LOCK_TIMEOUT):
+        return False
+    threading.Thread(target=_run_pending_syncs, name="calendar-sync", daemon=True).start()
+    return True
+
+
+def _run_pending_syncs():
+    """
+    Sync while notifications are pending, then release the lock. Runs with
+    SYNC_LOCK_KEY held.
+    """
+    try:
+        while True:
+            while cache.get(SYNC_PENDING_KEY):
+                cache.delete(SYNC_PENDING_KEY)
+                _sync_stored_calendar()
+            cache.delete(SYNC_LOCK_KEY)
+            # A notification between the last check and the release saw the
+            # lock still held and left its sync to this thread
+            if not cache.get(SYNC_PENDING_KEY) or not cache.add(SYNC_LOCK_KEY, True, timeout=SYNC_LOCK_TIMEOUT):
+                return
+    finally:
+        connection.close()
+
+
+def _sync_stored_calendar():
+    calendar = get_stored_calendar()
+    if calendar is None:
+        logger.warning("Calendar notification received but no stored Google credentials")
+        return
+    try:
+        stats = sync_calendar(calendar)
+    except Exception:
+        logger.exception("Calendar sync failed", extra={"event": "calendar.sync"})
+    else:
+        logger.info("Calendar sync: %s", stats, extra={"event": "calendar.sync", **stats})
+
+
+def find_channel(channel_id, token):
+    """
+    The sync state a push notification belongs to, or None if the channel
+    is unknown or the token does not match.
+    """
+    if not channel_id or not token:
+        return None
+    state = CalendarSyncState.objects.filter(channel_id=channel_id).first()
+    if state is None or not secrets.compare_digest(state.channel_token or "", token):
+        return None
+    return state
+
+
+# =====================================================
+# Full reconciliation
+# =====================================================
+
+def diff_calendar(events, entries):
+    """
+    Compare calendar events with schedule entries in one pass.
+
+    Args:
+        events: Dict {event_id: EventInfo}
+        entries: ScheduleEntry objects with a google_event_id
+
+    Returns:
+        Dict with
+        - "missing": entries whose event no longer exists in the calendar
+        - "mismatched": entries whose event has another attendee (emails
+          compared case-insensitively)
+        - "orphans": speech events no entry refers to (event ids)
+    """
+    speech_titles = set(SpeechType.labels)
+    referenced = set()
+    missing = []
+    mismatched = []
+
+    for entry in entries:
+        event = events.get(entry.google_event_id)
+        if event is None:
+            missing.append(entry)
+            continue
+        referenced.add(entry.google_event_id)
+        email = entry.assigned_employee.email if entry.assigned_employee else None
+        if not entry.is_cancelled and email and (event.attendee or "").lower() != email.lower():
+            mismatched.append(entry)
+
+    orphans = [
+        event_id for event_id, event in events.items()
+        if event_id not in referenced and event.summary in speech_titles
+    ]
+    return {"missing": missing, "mismatched": mismatched, "orphans": orphans}
+
+
+def repair_calendar(calendar, diff):
+    """
+    Fix a diff from diff_calendar() with batched API calls:
+    missing events are re-created (or the stale id dropped for cancelled /
+    unassigned entries), mismatched attendees are patched and orphan events
+    are deleted. Entry changes are saved with one bulk_update.
+
+    Returns:
+        Dict {"created": n, "patched": n, "deleted": n, "failed": n}
+    """
+    stats = {"created": 0, "patched": 0, "deleted": 0, "failed": 0}
+
+    to_insert = {}
+    changed = []
+    for entry in diff["missing"]:
+        if entry.is_cancelled or entry.assigned_employee is None:
+            entry.google_event_id = None
+            entry.is_sent = False
+            changed.append(entry)
+        else:
+            to_insert[str(entry.pk)] = entry
+
+    inserted = calendar.execute_batched(
+        (key, calendar.insert_request(build_event_body(entry, entry.assigned_employee.email)))
+        for key, entry in to_insert.items()
+    )
+    for key, (response, exception) in inserted.items():
+        if exception is not None:
+            stats["failed"] += 1
+            continue
+        entry = to_insert[key]
+        entry.google_event_id = response["id"]
+        entry.is_sent = True
+        changed.append(entry)
+        stats["created"] += 1
+
+    patched = calendar.execute_batched(
+        (entry.pk, calendar.patch_attendee_request(entry.google_event_id, entry.assigned_employee.email))
+        for entry in diff["mismatched"]
+    )
+    for _response, exception in patched.values():
+        stats["failed" if exception is not None else "patched"] += 1
+
+    deleted = calendar.execute_batched(
+        (event_id, calendar.delete_request(event_id)) for event_id in diff["orphans"]
+    )
+    for _response, exception in deleted.values():
+        # Already gone counts as deleted
+        stats["failed" if exception is not None and not is_gone(exception) else "deleted"] += 1
+
+    if changed:
+        ScheduleEntry.objects.bulk_update(changed, ["google_event_id", "is_sent"])
+    return stats
+
+
+def reconcile_calendar(calendar, start, end, repair=False):
+    """
+    Diff the sent schedule between `start` and `end` (inclusive) against the
+    calendar and optionally repair it. One paged listing plus one entry query.
+
+    Returns:
+        (diff, repair stats or None)
+    """
+    events, _sync_token = calendar.list_events(
+        RECONCILE_FIELDS,
+        timeMin=f"{start.isoformat()}T00:00:00+09:00",
+        timeMax=f"{(end + timedelta(days=1)).isoformat()}T00:00:00+09:00",
+    )
+    entries = list(
+        ScheduleEntry.objects
+        .filter(date__range=(start, end), google_event_id__isnull=False)
+        .select_related("assigned_employee")
+        .order_by("date")
+    )
+    diff = diff_calendar(events, entries)
+    stats = repair_calendar(calendar, diff) if repair else None
+    return diff, stats
+
+
+# =====================================================
+# Publishing a month
+# =====================================================
+
+class PublishResult(NamedTuple):
+    done: int
+    # [(entry, message)] for the entries that failed
+    failures: list
+
+
+def _log_publish(event, batch, done, failures, started):
+    """
+    One summary record per send / retract; the failed days are only listed
+    at DEBUG level.
+    """
+    duration_ms = round((time.monotonic() - started) * 1000)
+    logger.log(
+        logging.WARNING if failures else logging.INFO,
+        "%s %s: %d done, %d failed in %d ms",
+        event, batch.month, done, len(failures), duration_ms,
+        extra={
+            "event": event,
+            "month": batch.month.isoformat(),
+            "done": done,
+            "failed": len(failures),
+            "duration_ms": duration_ms,
+        },
+    )
+    if failures and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s %s failures: %s", event, batch.month, [message for _entry, message in failures])
+
+
+def send_batch(calendar, batch):
+    """
+    Create a calendar event for every assigned, non-cancelled entry of a
+    batch. Each event id is saved as soon as it is created, so a failure
+    half-way does not lose the events already sent. The batch is marked
+    sent if at least one event was created.
+
+    Returns:
+        PublishResult
+    """
+    started = time.monotonic()
+    entries = (
+        ScheduleEntry.objects
+        .filter(batch=batch, assigned_employee__isnull=False, is_cancelled=False)
+        .select_related("assigned_employee")
+    )
+    sent = 0
+    failures = []
+    for entry in entries:
+        if not entry.assigned_employee.email:
+            failures.append((entry, f"{entry.assigned_employee.name} has no email."))
+            continue
+        try:
+            entry.google_event_id = calendar.insert_event(build_event_body(entry, entry.assigned_employee.email))
+        except Exception as e:
+            failures.append((entry, f"Failed to create event for {entry.date}: {e}"))
+            continue
+        entry.is_sent = True
+        entry.save(update_fields=["google_event_id", "is_sent"])
+        sent += 1
+
+    if sent:
+        batch.is_sent = True
+        batch.save(update_fields=["is_sent"])
+    _log_publish("calendar.send", batch, sent, failures, started)
+    return PublishResult(sent, failures)
+
+
+def retract_batch(calendar, batch):
+    """
+    Delete the sent events of a batch (events already deleted in the
+    calendar are just cleared locally) and reset batch.is_sent so the
+    month can be sent again.
+
+    Returns:
+        PublishResult
+    """
+    started = time.monotonic()
+    entries = ScheduleEntry.objects.filter(batch=batch, google_event_id__isnull=False)
+    deleted = 0
+    failures = []
+    for entry in entries:
+        try:
+            calendar.delete_event(entry.google_event_id)
+        except Exception as e:
+            failures.append((entry, f"Failed to delete event for {entry.date}: {e}"))
+            continue
+        entry.google_event_id = None
+        entry.is_sent = False
+        entry.save(update_fields=["google_event_id", "is_sent"])
+        deleted += 1
+
+    batch.is_sent = False
+    batch.save(update_fields=["is_sent"])
+    _log_publish("calendar.retract", batch, deleted, failures, started)
+    return PublishResult(deleted, failures)
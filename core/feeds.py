@@ -0,0 +1,117 @@
+"""
+Subscribable iCalendar feeds: one per employee plus one for the whole roster.
+
+Feed URLs carry a signed token, so no lookup is needed to authorise a
+request. ETag / Last-Modified come from the change versions kept in the cache
+(core/cache.py), so a conditional request for an unchanged feed is answered
+with 304 without touching the database, and a changed feed is rendered once
+and then served from the cache until the next write.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from .cache import get_employee_feed_versions, get_roster_feed_version
+from .models import Employee, ScheduleEntry
+from .schedule_export import iter_ics, iter_schedule_values
+
+ROSTER_FEED_SUBJECT = "roster"
+FEED_KINDS = ("employee", "roster")
+
+_signer = signing.Signer(salt="core.feeds")
+
+
+def employee_feed_token(employee_id):
+    return _signer.sign(str(employee_id))
+
+
+def roster_feed_token():
+    return _signer.sign(ROSTER_FEED_SUBJECT)
+
+
+def _unsign(token):
+    try:
+        return _signer.unsign(token)
+    except signing.BadSignature:
+        return None
+
+
+def _version_datetime(version):
+    return datetime.fromtimestamp(version / 1e9, tz=timezone.utc).replace(microsecond=0)
+
+
+def get_feed_state(kind, token, today=None):
+    """
+    Resolve a feed token into its cache state, without any database query.
+
+    Returns:
+        None for an invalid token, otherwise a dict with
+        "kind", "subject" (employee pk or None), "etag", "last_modified"
+        and "cache_key".
+    """
+    subject = _unsign(token)
+    if subject is None:
+        return None
+
+    if kind == "employee":
+        if not subject.isdigit():
+            return None
+        employee_id = int(subject)
+        epoch, version = get_employee_feed_versions(employee_id)
+        return {
+            "kind": kind,
+            "subject": employee_id,
+            "etag": f"{epoch}.{version}",
+            "last_modified": _version_datetime(max(epoch, version)),
+            "cache_key": f"core:feeds:employee:{employee_id}:{epoch}.{version}",
+        }
+
+    if kind == "roster":
+        if subject != ROSTER_FEED_SUBJECT:
+            return None
+        # The roster feed only covers a trailing window, so it also changes daily
+        today = today or date.today()
+        version = get_roster_feed_version()
+        day_start = datetime.combine(today, time.min, tzinfo=timezone.utc)
+        return {
+            "kind": kind,
+            "subject": None,
+            "etag": f"{version}.{today.isoformat()}",
+            "last_modified": max(_version_datetime(version), day_start),
+            "cache_key": f"core:feeds:roster:{version}:{today.isoformat()}",
+        }
+
+    return None
+
+
+def _render_feed(state):
+    """
+    Render a feed body, or return None if the employee no longer exists.
+    """
+    if state["kind"] == "employee":
+        employee = Employee.objects.filter(pk=state["subject"]).only("name").first()
+        if employee is None:
+            return None
+        values = iter_schedule_values(queryset=ScheduleEntry.objects.filter(assigned_employee_id=employee.pk))
+        calendar_name = f"朝礼スピーチ - {employee.name}"
+    else:
+        since = date.today() - timedelta(days=settings.FEED_PAST_DAYS)
+        values = iter_schedule_values(start=since)
+        calendar_name = "朝礼スピーチ"
+
+    return "".join(iter_ics(values, calendar_name)).encode("utf-8")
+
+
+def get_feed_body(state):
+    """
+    Return the rendered feed for a state from get_feed_state(), using the
+    cache. Returns None if the feed subject no longer exists.
+    """
+    body = cache.get(state["cache_key"])
+    if body is None:
+        body = _render_feed(state)
+        if body is not None:
+            cache.set(state["cache_key"], body, settings.FEED_CACHE_TIMEOUT)
+    return body
@@ -0,0 +1,381 @@
+"""
+Google Calendar API access shared by the views and the background jobs.
+
+The OAuth callback stores the credentials server-side only (GoogleCredential);
+sessions just record that the browser authenticated. Views, management
+commands and the push-notification webhook all build their client from the
+stored copy.
+
+Every call goes through CalendarGateway, which asks for partial responses
+(`fields=` masks) and returns small typed results instead of full event
+resources. The HTTP layer (core/google_client.py, imported lazily) always
+requests gzip (Accept-Encoding plus a User-Agent containing "gzip", as Google
+requires) and meters every round trip in `call_stats`: calls, response bytes
+and latency per HTTP method.
+
+Calls are paced by a token bucket shared by all workers (core/ratelimit.py);
+rate-limit errors slow the shared bucket down and the call is retried after
+Retry-After (or an exponential backoff), so bursts such as month-end sends
+no longer fail half-way.
+"""
+import json
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+
+from .models import GoogleCredential
+from .ratelimit import google_api_bucket
+
+CREDENTIAL_FIELDS = ("token", "refresh_token", "token_uri", "client_id", "client_secret", "scopes")
+
+# The Calendar API accepts at most 50 calls per batch request
+BATCH_SIZE = 50
+LIST_PAGE_SIZE = 2500
+
+# 403 reasons that mean "slow down" rather than "forbidden"
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"}
+MAX_BACKOFF_SECONDS = 64
+
+# Partial-response masks: only what callers read
+ID_FIELDS = "id"
+CHANNEL_FIELDS = "resourceId,expiration"
+
+
+# =====================================================
+# Metering
+# =====================================================
+
+class CallStats:
+    """
+    Thread-safe per-process counters of Calendar API round trips.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def record(self, method, size, seconds):
+        with self._lock:
+            calls, total_size, total_seconds = self._counters.get(method, (0, 0, 0.0))
+            self._counters[method] = (calls + 1, total_size + size, total_seconds + seconds)
+
+    def snapshot(self):
+        """
+        Returns:
+            Dict {http_method: {"calls": n, "bytes": n, "seconds": s}}
+        """
+        with self._lock:
+            return {
+                method: {"calls": calls, "bytes": size, "seconds": round(seconds, 3)}
+                for method, (calls, size, seconds) in self._counters.items()
+            }
+
+    def summary(self):
+        totals = self.snapshot().values()
+        calls = sum(item["calls"] for item in totals)
+        size = sum(item["bytes"] for item in totals)
+        seconds = sum(item["seconds"] for item in totals)
+        return f"{calls} API calls, {size / 1024:.1f} KiB received, {seconds * 1000:.0f} ms"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+call_stats = CallStats()
+
+
+# =====================================================
+# Credentials
+# =====================================================
+
+def credentials_to_data(creds):
+    return {field: getattr(creds, field) for field in CREDENTIAL_FIELDS}
+
+
+def save_credentials(creds, key="default"):
+    """
+    Keep a server-side copy of OAuth credentials for background jobs.
+    """
+    GoogleCredential.objects.update_or_create(key=key, defaults={"data": credentials_to_data(creds)})
+
+
+def load_credentials_data(key="default"):
+    return GoogleCredential.objects.filter(key=key).values_list("data", flat=True).first()
+
+
+def get_calendar(creds_data):
+    """
+    CalendarGateway for stored credential data.
+    Returns None if there are no (valid) credentials.
+    """
+    if not creds_data:
+        return None
+    from .google_client import build_service
+
+    try:
+        return CalendarGateway(build_service(creds_data))
+    except Exception:
+        return None
+
+
+def get_stored_calendar(key="default"):
+    """
+    CalendarGateway built from the server-side credentials, or None.
+    """
+    return get_calendar(load_credentials_data(key))
+
+
+def build_event_body(entry, email):
+    """
+    Calendar event for a schedule entry: an all-day event titled with the
+    speech type ("業務" / "３分間"), with the speaker as the only attendee.
+    """
+    return {
+        "summary": entry.get_speech_type_display(),
+        "start": {"date": entry.date.isoformat(), "timeZone": "Asia/Tokyo"},
+        "end": {"date": (entry.date + timedelta(days=1)).isoformat(), "timeZone": "Asia/Tokyo"},
+        "attendees": [
+            {"email": email}
+        ],
+    }
+
+
+# =====================================================
+# Gateway
+# =====================================================
+
+class EventInfo(NamedTuple):
+    """
+    The parts of an event the app reads; fields outside the requested
+    mask are None.
+    """
+    id: str
+    status: Optional[str] = None
+    summary: Optional[str] = None
+    attendee: Optional[str] = None
+
+    @classmethod
+    def from_resource(cls, event):
+        attendees = event.get("attendees") or []
+        return cls(
+            id=event["id"],
+            status=event.get("status"),
+            summary=event.get("summary"),
+            attendee=attendees[0].get("email") if attendees else None,
+        )
+
+
+class Channel(NamedTuple):
+    id: str
+    token: str
+    resource_id: Optional[str]
+    expiration: Optional[datetime]
+
+
+def _status(error):
+    # HttpError carries the response in .resp (checked by duck typing so the
+    # client library does not have to be imported here)
+    return getattr(getattr(error, "resp", None), "status", None)
+
+
+def is_gone(error):
+    """
+    True for the 404 / 410 returned for an event (or channel) that no longer exists.
+    """
+    return _status(error) in (404, 410)
+
+
+def _error_reasons(error):
+    try:
+        errors = json.loads(error.content.decode("utf-8"))["error"].get("errors", [])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return set()
+    return {item.get("reason") for item in errors if isinstance(item, dict)}
+
+
+def rate_limit_delay(error, attempt=0):
+    """
+    Seconds to back off after a rate-limit error (Retry-After if given,
+    otherwise exponential backoff with jitter), or None for any other error.
+    """
+    status = _status(error)
+    if status == 403:
+        if not _error_reasons(error) & RATE_LIMIT_REASONS:
+            return None
+    elif status != 429:
+        return None
+
+    try:
+        return float(error.resp.get("retry-after"))
+    except (TypeError, ValueError):
+        return min(2 ** attempt, MAX_BACKOFF_SECONDS) + random.random()
+
+
+class CalendarGateway:
+    """
+    Calendar API calls for one calendar, with minimal partial responses,
+    paced by the shared token bucket.
+    """
+
+    def __init__(self, service, calendar_id=None, bucket=None):
+        self.service = service
+        self.calendar_id = calendar_id or settings.GOOGLE_CALENDAR_ID
+        self.bucket = bucket or google_api_bucket()
+
+    def execute(self, request):
+        """
+        Execute one request within the quota, retrying rate-limit errors.
+        """
+        for attempt in range(settings.GOOGLE_API_MAX_RETRIES + 1):
+            self.bucket.take()
+            try:
+                return request.execute()
+            except Exception as e:
+                delay = rate_limit_delay(e, attempt)
+                if delay is None or attempt == settings.GOOGLE_API_MAX_RETRIES:
+                    raise
+                self.bucket.throttle(delay)
+
+    # Request builders (also used in batches)
+
+    def insert_request(self, body):
+        return self.service.events().insert(
+            calendarId=self.calendar_id, body=body, sendNotifications=False, fields=ID_FIELDS,
+        )
+
+    def patch_attendee_request(self, event_id, email):
+        return self.service.events().patch(
+            calendarId=self.calendar_id,
+            eventId=event_id,
+            body={"attendees": [{"email": email}]},
+            sendUpdates="none",
+            fields=ID_FIELDS,
+        )
+
+    def delete_request(self, event_id):
+        return self.service.events().delete(calendarId=self.calendar_id, eventId=event_id)
+
+    # Single calls
+
+    def insert_event(self, body):
+        """
+        Create an event and return its id.
+        """
+        return self.execute(self.insert_request(body))["id"]
+
+    def patch_attendee(self, event_id, email):
+        self.execute(self.patch_attendee_request(event_id, email))
+
+    def delete_event(self, event_id):
+        """
+        Delete an event. Returns False if it was already gone.
+        """
+        try:
+            self.execute(self.delete_request(event_id))
+        except Exception as e:
+            if is_gone(e):
+                return False
+            raise
+        return True
+
+    def list_events(self, fields, **params):
+        """
+        Page through events().list with the largest page size.
+
+        Args:
+            fields: Item fields to request, e.g. "id,status,attendees(email)"
+            params: Extra list parameters (syncToken, timeMin, ...)
+
+        Returns:
+            ({event_id: EventInfo}, nextSyncToken or None)
+        """
+        params = {
+            "calendarId": self.calendar_id,
+            "maxResults": LIST_PAGE_SIZE,
+            "fields": f"items({fields}),nextPageToken,nextSyncToken",
+            **params,
+        }
+        events = {}
+        while True:
+            response = self.execute(self.service.events().list(**params))
+            for item in response.get("items", []):
+                events[item["id"]] = EventInfo.from_resource(item)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return events, response.get("nextSyncToken")
+            params["pageToken"] = page_token
+
+    def watch(self, channel_id, token, address):
+        """
+        Register a push channel notifying `address` of changes.
+        """
+        response = self.execute(self.service.events().watch(
+            calendarId=self.calendar_id,
+            body={"id": channel_id, "type": "web_hook", "address": address, "token": token},
+            fields=CHANNEL_FIELDS,
+        ))
+        expiration = response.get("expiration")
+        return Channel(
+            id=channel_id,
+            token=token,
+            resource_id=response.get("resourceId"),
+            expiration=datetime.fromtimestamp(int(expiration) / 1000, tz=timezone.utc) if expiration else None,
+        )
+
+    def stop_channel(self, channel_id, resource_id):
+        """
+        Stop a push channel. Returns False if it had already expired.
+        """
+        try:
+            self.execute(self.service.channels().stop(body={"id": channel_id, "resourceId": resource_id}))
+        except Exception as e:
+            if is_gone(e):
+                return False
+            raise
+        return True
+
+    def execute_batched(self, requests, batch_size=BATCH_SIZE):
+        """
+        Execute requests with batch HTTP requests (up to `batch_size` calls
+        per round trip). Each call in a batch counts against the quota;
+        calls that hit a rate limit are retried in a later batch.
+
+        Args:
+            requests: Iterable of (key, HttpRequest)
+
+        Returns:
+            Dict {str(key): (response, exception)}
+        """
+        results = {}
+        pending = [(str(key), request) for key, request in requests]
+        attempt = 0
+
+        while pending:
+            retry = {}
+            delays = []
+
+            def callback(request_id, response, exception):
+                delay = rate_limit_delay(exception, attempt)
+                if delay is not None and attempt < settings.GOOGLE_API_MAX_RETRIES:
+                    retry[request_id] = True
+                    delays.append(delay)
+                else:
+                    results[request_id] = (response, exception)
+
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                self.bucket.take(len(chunk))
+                batch = self.service.new_batch_http_request(callback=callback)
+                for key, request in chunk:
+                    batch.add(request, request_id=key)
+                batch.execute()
+
+            if delays:
+                self.bucket.throttle(max(delays))
+            pending = [(key, request) for key, request in pending if key in retry]
+            attempt += 1
+        return results
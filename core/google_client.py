@@ -0,0 +1,65 @@
+"""
+The Google client stack (google-auth, google-api-python-client, oauthlib).
+
+Importing these libraries takes a large share of a process's start-up time,
+so nothing imports this module at load time: core/google_calendar.py and the
+OAuth / calendar views import it inside the functions that talk to Google.
+Worker boots, management commands and requests that never touch the
+calendar do not pay for it.
+"""
+import time
+
+import google_auth_httplib2
+import httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import Flow
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError  # noqa: F401 (re-exported for callers)
+
+from .google_calendar import CREDENTIAL_FIELDS, call_stats
+from .profiling import record_api_call
+
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+
+
+class MeteredHttp(httplib2.Http):
+    """
+    httplib2 transport that always asks for gzip and records the response
+    size (decoded) and latency of every request in `call_stats` (and in
+    the report of a profiled request, see core/profiling.py).
+    """
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        headers = dict(headers or {})
+        headers.setdefault("accept-encoding", "gzip, deflate")
+        user_agent = headers.get("user-agent", "")
+        if "gzip" not in user_agent:
+            headers["user-agent"] = f"{user_agent} (gzip)".strip()
+
+        started = time.perf_counter()
+        response, content = super().request(uri, method, body, headers, *args, **kwargs)
+        seconds = time.perf_counter() - started
+        call_stats.record(method, len(content or b""), seconds)
+        record_api_call(method, uri, len(content or b""), seconds)
+        return response, content
+
+
+def credentials_from_data(data):
+    return Credentials(**{field: data.get(field) for field in CREDENTIAL_FIELDS})
+
+
+def build_service(creds_data):
+    """
+    Calendar API client on the metered transport.
+    """
+    http = google_auth_httplib2.AuthorizedHttp(credentials_from_data(creds_data), http=MeteredHttp())
+    return build("calendar", "v3", http=http)
+
+
+def oauth_flow(client_secrets_file, redirect_uri, state=None):
+    return Flow.from_client_secrets_file(
+        client_secrets_file,
+        scopes=SCOPES,
+        redirect_uri=redirect_uri,
+        state=state,
+    )
@@ -0,0 +1,128 @@
+"""
+HTTP load generation shared by the loadtest and benchmark_server commands.
+
+Stdlib only: C client threads, each with its own cookie jar, send N requests
+to one URL in total. POST clients first fetch a CSRF cookie and send it back
+as X-CSRFToken. Redirects are not followed, so a redirecting view is
+measured on its own.
+"""
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from typing import NamedTuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+
+class NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Client:
+    def __init__(self, method, url, data=None, csrf_url=None):
+        self.jar = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.jar), NoRedirect)
+        self.method = method
+        self.url = url
+        self.data = urlencode(data).encode() if data else None
+        self.headers = {}
+        if method != "GET" and csrf_url:
+            self.opener.open(csrf_url).read()
+            token = next((cookie.value for cookie in self.jar if cookie.name == "csrftoken"), None)
+            if token:
+                self.headers = {"X-CSRFToken": token, "Referer": csrf_url}
+
+    def request(self):
+        """
+        Returns:
+            (status, seconds)
+        """
+        request = Request(self.url, data=self.data, headers=self.headers, method=self.method)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                status = response.status
+        except HTTPError as e:
+            # Includes the 3xx responses NoRedirect refuses to follow
+            e.read()
+            status = e.code
+        except URLError as e:
+            status = type(e.reason).__name__
+        return status, time.perf_counter() - started
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class LoadResult(NamedTuple):
+    requests: int
+    seconds: float
+    # Sorted latencies in seconds
+    latencies: list
+    statuses: Counter
+
+    @property
+    def throughput(self):
+        return self.requests / self.seconds
+
+    def percentile(self, fraction):
+        return _percentile(self.latencies, fraction)
+
+    def summary_lines(self):
+        latencies = self.latencies
+        return [
+            f"Throughput: {self.throughput:.1f} req/s ({self.requests} requests in {self.seconds:.2f} s)",
+            "Latency (ms): "
+            f"mean {statistics.mean(latencies) * 1000:.1f}  "
+            f"p50 {self.percentile(0.50) * 1000:.1f}  "
+            f"p95 {self.percentile(0.95) * 1000:.1f}  "
+            f"p99 {self.percentile(0.99) * 1000:.1f}  "
+            f"max {latencies[-1] * 1000:.1f}",
+            "Status: " + ", ".join(
+                f"{status} x{count}" for status, count in sorted(self.statuses.items(), key=str)
+            ),
+        ]
+
+
+def run_load(url, concurrency, total, method="GET", data=None, csrf_url=None, warmup=10):
+    """
+    Send `total` requests to `url` from `concurrency` clients.
+
+    Raises:
+        URLError / OSError: the CSRF page could not be fetched
+    """
+    clients = [Client(method, url, data, csrf_url) for _ in range(concurrency)]
+    for index in range(warmup):
+        clients[index % concurrency].request()
+
+    results = []
+    lock = threading.Lock()
+    remaining = iter(range(total))
+
+    def worker(client):
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            outcome = client.request()
+            with lock:
+                results.append(outcome)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, clients))
+    elapsed = time.perf_counter() - started
+
+    return LoadResult(
+        requests=len(results),
+        seconds=elapsed,
+        latencies=sorted(seconds for _status, seconds in results),
+        statuses=Counter(status for status, _seconds in results),
+    )
@@ -0,0 +1,85 @@
+"""
+Logging plumbing configured from settings.LOGGING.
+
+- QueueStreamHandler: the handler attached to the `core` loggers. A request
+  only puts the record on an in-memory queue; a background QueueListener
+  thread formats it and writes it to the stream, so slow log I/O never
+  blocks a request.
+- JsonFormatter: one JSON object per line, with the fields passed through
+  `extra=` as top-level keys (DJANGO_LOG_FORMAT=json).
+
+Log with %-style arguments (formatted only if the record is emitted) and put
+the values worth querying in `extra`:
+
+    logger.info("Sent %s: %d events", month, sent, extra={"event": "calendar.send", "sent": sent})
+
+Guard payloads that are expensive to build with logger.isEnabledFor().
+"""
+import copy
+import json
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    QueueHandler writing to a StreamHandler (stderr by default) from a
+    listener thread. The formatter configured for this handler is applied
+    by the listener, off the request thread.
+    """
+
+    def __init__(self, stream=None):
+        self.target = logging.StreamHandler(stream)
+        super().__init__(queue.SimpleQueue())
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        # Forked workers (gunicorn --preload) inherit the handler but not the
+        # listener thread: give them a fresh queue and thread of their own
+        os.register_at_fork(after_in_child=self._restart_listener)
+
+    def _restart_listener(self):
+        self.queue = self.listener.queue = queue.SimpleQueue()
+        self.listener._thread = None
+        self.listener.start()
+
+    def close(self):
+        # Called by logging.shutdown() at exit: write out what is still queued
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, since args and exc_info may
+        # not survive until the listener gets to the record; everything else
+        # (extra fields included) is formatted by the target's formatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
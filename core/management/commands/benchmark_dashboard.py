@@ -0,0 +1,104 @@
+"""
+Management command to measure dashboard render times at several roster sizes.
+
+For each size it creates that many employees (plus a year of sent schedule
+entries) inside a transaction that is rolled back afterwards, then times:
+- context: building the dashboard context (roster and speech-date queries)
+- cold render: rendering dashboard.html with no cached row fragments
+- warm render: rendering it again with every row fragment cached
+
+Each time is the median of --repeat runs. Nothing is left in the database;
+the row fragments it caches are keyed on employee versions that it bumps
+away (the cold runs include that one cache round trip).
+
+Usage:
+    python manage.py benchmark_dashboard
+    python manage.py benchmark_dashboard --sizes 50 500 5000 --repeat 5
+"""
+
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from core.cache import bump_feed_epoch, get_employee_versions
+from core.models import Employee, Role, ScheduleEntry, SpeechType
+from core.views import _build_dashboard_context
+
+
+def _timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+class Command(BaseCommand):
+    help = 'Time dashboard context building and rendering at several roster sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000], help='Roster sizes (default: 50 500 5000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/dashboard/')
+        request.session = {}
+        repeat = max(options['repeat'], 1)
+
+        self.stdout.write(f"{'employees':>9} {'context':>10} {'cold render':>12} {'warm render':>12} {'HTML':>9}")
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.populate(size)
+                today = date.today()
+
+                context_ms, context = _timed(lambda: _build_dashboard_context(today), repeat)
+
+                def cold_render():
+                    # New employee versions: every row fragment misses
+                    bump_feed_epoch()
+                    versions = get_employee_versions(member['id'] for member in context['top_zone'])
+                    for member in context['top_zone']:
+                        member['version'] = versions[member['id']]
+                    return render_to_string('core/dashboard.html', context, request=request)
+
+                cold_ms, html = _timed(cold_render, repeat)
+                warm_ms, _html = _timed(
+                    lambda: render_to_string('core/dashboard.html', context, request=request), repeat
+                )
+                transaction.set_rollback(True)
+
+            self.stdout.write(
+                f"{size:>9} {context_ms:>7.1f} ms {cold_ms:>9.1f} ms {warm_ms:>9.1f} ms {len(html) / 1024:>5.0f} KiB"
+            )
+
+    def populate(self, size):
+        Employee.objects.all().delete()
+        employees = Employee.objects.bulk_create(
+            Employee(
+                name=f"社員{number:05d}",
+                email=f"bench{number:05d}@example.com",
+                employee_id=f"BENCH{number:05d}",
+                order=number,
+                order_gyomu=number,
+                role=Role.MEMBER if number % 3 else Role.SHACHOU_SHITSU,
+                is_rotation_active=number % 10 != 0,
+            )
+            for number in range(1, size + 1)
+        )
+        ScheduleEntry.objects.all().delete()
+        start = date.today() - timedelta(days=365)
+        ScheduleEntry.objects.bulk_create(
+            ScheduleEntry(
+                date=start + timedelta(days=offset),
+                speech_type=SpeechType.THREE_MIN,
+                assigned_employee=employees[offset % size],
+                is_sent=True,
+            )
+            for offset in range(365 + 30)
+        )
@@ -0,0 +1,167 @@
+"""
+Management command to compare gunicorn worker configurations.
+
+For every worker class (and, with --compare-preload, with and without
+preloading) it starts gunicorn with gunicorn.conf.py on a local port, loads
+the dashboard (GET) and the generate endpoint (POST), then reports
+throughput, p95 latency and the memory of the worker processes
+(PSS, which counts pages shared after a preload fork only once, and RSS).
+Linux only (memory is read from /proc).
+
+The generate requests write the schedule of --generate-month (default
+2099-12) to the configured database: run this against a development copy.
+
+Usage:
+    python manage.py benchmark_server
+    python manage.py benchmark_server --worker-class sync --worker-class gthread \\
+        --workers 4 -c 50 -n 2000 --compare-preload
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.loadtest import run_load
+
+WORKER_CLASS_PACKAGES = {"gevent": "gevent", "uvicorn": "uvicorn"}
+
+
+def _worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; ppid follows the closing parenthesis
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def _memory_kib(pid, path, field):
+    try:
+        with open(f"/proc/{pid}/{path}") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urlopen(url, timeout=2).read()
+            return True
+        except HTTPError:
+            return True
+        except (URLError, OSError):
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Start gunicorn with each worker configuration and compare throughput and memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-class', action='append', dest='worker_classes',
+                            help='sync, gthread, gevent or uvicorn (repeatable; default: all installed)')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes (default: 2)')
+        parser.add_argument('--threads', type=int, default=4, help='Threads per gthread worker (default: 4)')
+        parser.add_argument('--compare-preload', action='store_true', help='Run every configuration with and without --preload')
+        parser.add_argument('-c', '--concurrency', type=int, default=20, help='Concurrent clients (default: 20)')
+        parser.add_argument('-n', '--requests', type=int, default=500, help='Requests per endpoint (default: 500)')
+        parser.add_argument('--port', type=int, default=8050, help='Local port for the server (default: 8050)')
+        parser.add_argument('--generate-month', default='2099-12', help='Month the generate requests write (YYYY-MM)')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir('/proc/self'):
+            raise CommandError('benchmark_server reads worker memory from /proc (Linux only)')
+        try:
+            year, month = (int(part) for part in options['generate_month'].split('-'))
+        except ValueError:
+            raise CommandError('--generate-month must be YYYY-MM')
+
+        worker_classes = options['worker_classes'] or ['sync', 'gthread', 'gevent', 'uvicorn']
+        configs = []
+        for worker_class in worker_classes:
+            package = WORKER_CLASS_PACKAGES.get(worker_class)
+            if package and importlib.util.find_spec(package) is None:
+                self.stderr.write(f"Skipping {worker_class}: {package} is not installed")
+                continue
+            for preload in ((True, False) if options['compare_preload'] else (True,)):
+                configs.append((worker_class, preload))
+
+        rows = []
+        for worker_class, preload in configs:
+            label = f"{worker_class} x{options['workers']}"
+            if worker_class == 'gthread':
+                label += f" ({options['threads']} threads)"
+            if preload:
+                label += " preload"
+            self.stdout.write(f"== {label}")
+            rows.append((label, self.run_config(worker_class, preload, year, month, options)))
+
+        self.stdout.write("")
+        self.stdout.write(f"{'configuration':<32} {'dashboard':>22} {'generate':>22} {'PSS/worker':>11} {'RSS/worker':>11}")
+        for label, (dashboard, generate, pss, rss) in rows:
+            self.stdout.write(
+                f"{label:<32} "
+                f"{dashboard.throughput:>8.1f} req/s {dashboard.percentile(0.95) * 1000:>6.0f} ms "
+                f"{generate.throughput:>8.1f} req/s {generate.percentile(0.95) * 1000:>6.0f} ms "
+                f"{pss / 1024:>8.1f} MiB {rss / 1024:>8.1f} MiB"
+            )
+        self.stdout.write("(req/s, p95 latency; memory measured after the load)")
+
+    def run_config(self, worker_class, preload, year, month, options):
+        base = f"http://127.0.0.1:{options['port']}"
+        env = {
+            **os.environ,
+            "GUNICORN_WORKER_CLASS": worker_class,
+            "WEB_WORKERS": str(options['workers']),
+            "GUNICORN_THREADS": str(options['threads']),
+            "GUNICORN_PRELOAD": "1" if preload else "0",
+            "GUNICORN_BIND": f"127.0.0.1:{options['port']}",
+            # No recycling in the middle of a run
+            "GUNICORN_MAX_REQUESTS": "0",
+            "GUNICORN_ACCESS_LOG": os.devnull,
+        }
+        with tempfile.TemporaryFile() as log:
+            server = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "-c", str(settings.BASE_DIR / "gunicorn.conf.py")],
+                cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=log,
+            )
+            try:
+                if not _wait_until_up(f"{base}/dashboard/"):
+                    log.seek(0)
+                    raise CommandError(f"gunicorn did not start:\n{log.read().decode(errors='replace')[-2000:]}")
+
+                dashboard = run_load(f"{base}/dashboard/", options['concurrency'], options['requests'])
+                generate = run_load(
+                    f"{base}/schedule/generate/", options['concurrency'], options['requests'],
+                    method="POST", data=[("year", year), ("month", month)], csrf_url=f"{base}/dashboard/",
+                )
+                for result in (dashboard, generate):
+                    for line in result.summary_lines():
+                        self.stdout.write(f"  {line}")
+
+                pids = _worker_pids(server.pid)
+                pss = sum(_memory_kib(pid, "smaps_rollup", "Pss") for pid in pids) / max(len(pids), 1)
+                rss = sum(_memory_kib(pid, "status", "VmRSS") for pid in pids) / max(len(pids), 1)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        return dashboard, generate, pss, rss
@@ -0,0 +1,28 @@
+"""
+Management command to export the roster as CSV or JSON.
+
+Usage:
+    python manage.py export_roster > roster.csv
+    python manage.py export_roster --format json --output roster.json
+"""
+
+from django.core.management.base import BaseCommand
+from core.roster import iter_roster_export
+
+
+class Command(BaseCommand):
+    help = 'Export all employees as CSV or JSON (streamed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+        parser.add_argument('--output', help='Output file path (default: stdout)')
+
+    def handle(self, *args, **options):
+        chunks = iter_roster_export(options['format'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,43 @@
+"""
+Management command to export schedule entries for a date range as CSV or
+iCalendar (.ics). Output is streamed, so any range (e.g. five years) uses
+constant memory.
+
+Usage:
+    python manage.py export_schedule --start 2025-01-01 --end 2029-12-31 > schedule.csv
+    python manage.py export_schedule --start 2025-01-01 --end 2025-12-31 --format ics --output schedule.ics
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from core.schedule_export import iter_schedule_export
+
+
+class Command(BaseCommand):
+    help = 'Export schedule entries for a date range as CSV or iCalendar (streamed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='First date (YYYY-MM-DD, inclusive)')
+        parser.add_argument('--end', required=True, help='Last date (YYYY-MM-DD, inclusive)')
+        parser.add_argument('--format', choices=['csv', 'ics'], default='csv')
+        parser.add_argument('--output', help='Output file path (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError('--start and --end must be dates in YYYY-MM-DD format')
+        if end < start:
+            raise CommandError('--end must not be before --start')
+
+        chunks = iter_schedule_export(options['format'], start, end)
+
+        if options['output']:
+            # newline='' keeps the CRLF line endings required by iCalendar / CSV
+            with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,29 @@
+"""
+Management command to print the signed iCalendar feed URLs
+(one for the whole roster and one per employee) to hand out to subscribers.
+
+Usage:
+    python manage.py feed_urls --base-url https://jidouka.example.com
+"""
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from core.feeds import employee_feed_token, roster_feed_token
+from core.models import Employee
+
+
+class Command(BaseCommand):
+    help = 'Print the signed iCalendar feed URLs for the roster and every employee'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='', help='Prefix for the printed paths, e.g. https://host')
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+
+        roster_path = reverse('roster_feed', kwargs={'token': roster_feed_token()})
+        self.stdout.write(f'roster\t{base_url}{roster_path}')
+
+        for pk, email in Employee.objects.order_by('order', 'id').values_list('id', 'email'):
+            path = reverse('employee_feed', kwargs={'token': employee_feed_token(pk)})
+            self.stdout.write(f'{email}\t{base_url}{path}')
@@ -0,0 +1,51 @@
+"""
+Management command to bulk import (upsert) employees from a CSV or JSON file.
+
+Rows are matched on email: unknown emails are created and appended to the end
+of both rotations, known emails get name / role / is_rotation_active updated.
+
+Usage:
+    python manage.py import_roster roster.csv
+    python manage.py import_roster roster.json --dry-run
+    cat roster.jsonl | python manage.py import_roster - --format json
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from core.roster import detect_format, import_roster
+
+
+class Command(BaseCommand):
+    help = 'Bulk import employees from a CSV or JSON roster file (upsert by email)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Roster file path, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'json'],
+                            help='File format (default: guessed from the file extension)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and report without writing to the database')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+
+        try:
+            if path == '-':
+                summary = import_roster(sys.stdin, fmt=fmt, dry_run=options['dry_run'])
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    summary = import_roster(stream, fmt=fmt, dry_run=options['dry_run'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for row_number, message in summary['errors']:
+            self.stdout.write(self.style.WARNING(f'Row {row_number}: {message}'))
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}✅ Roster imported: {summary['created']} created, "
+                f"{summary['updated']} updated, {len(summary['errors'])} skipped"
+            )
+        )
@@ -0,0 +1,63 @@
+"""
+Management command to load-test a running server over HTTP.
+
+Sends N requests to one URL from C concurrent clients (see core/loadtest.py)
+and reports throughput, latency percentiles and status codes, so the
+same endpoint can be compared across deployments, e.g. the sync WSGI
+setup against the ASGI one:
+
+    gunicorn jidouka.wsgi:application --workers 2 --bind 127.0.0.1:8000
+    uvicorn jidouka.asgi:application --workers 2 --port 8001
+
+    python manage.py loadtest http://127.0.0.1:8000/dashboard/ -c 50 -n 2000
+    python manage.py loadtest http://127.0.0.1:8001/dashboard/ -c 50 -n 2000
+
+POST requests first fetch a CSRF cookie (from --csrf-url, default the
+site root) in every client and send it back as X-CSRFToken:
+
+    python manage.py loadtest http://127.0.0.1:8000/schedule/generate/ \\
+        --method POST --data year=2030 --data month=4 -c 10 -n 200
+"""
+
+from urllib.error import URLError
+from urllib.parse import urljoin
+
+from django.core.management.base import BaseCommand, CommandError
+from core.loadtest import run_load
+
+
+class Command(BaseCommand):
+    help = 'Send concurrent HTTP requests to a running server and report throughput and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Absolute URL to request')
+        parser.add_argument('-c', '--concurrency', type=int, default=20, help='Concurrent clients (default: 20)')
+        parser.add_argument('-n', '--requests', type=int, default=500, help='Total requests (default: 500)')
+        parser.add_argument('--method', default='GET', choices=['GET', 'POST'])
+        parser.add_argument('--data', action='append', default=[], metavar='KEY=VALUE', help='Form field for POST requests')
+        parser.add_argument('--csrf-url', help='Page that sets the CSRF cookie (default: the site root)')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per run (default: 10)')
+
+    def handle(self, *args, **options):
+        concurrency, total = options['concurrency'], options['requests']
+        if concurrency < 1 or total < 1:
+            raise CommandError('--concurrency and --requests must be at least 1')
+        data = []
+        for item in options['data']:
+            key, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError('--data must be KEY=VALUE')
+            data.append((key, value))
+
+        url = options['url']
+        csrf_url = options['csrf_url'] or urljoin(url, '/')
+        try:
+            result = run_load(
+                url, concurrency, total, options['method'], data, csrf_url, options['warmup'],
+            )
+        except (URLError, OSError) as e:
+            raise CommandError(f'Cannot reach {csrf_url}: {e}')
+
+        self.stdout.write(f"{options['method']} {url} ({concurrency} concurrent)")
+        for line in result.summary_lines():
+            self.stdout.write(line)
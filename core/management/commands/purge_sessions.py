@@ -0,0 +1,48 @@
+"""
+Management command to delete expired sessions.
+
+Like Django's clearsessions, but for database-backed engines (db, cached_db)
+it deletes in chunks, so purging a large django_session table does not hold
+one long-running DELETE. Cache-only engines expire sessions by themselves.
+Meant to be run periodically (e.g. daily from cron).
+
+Usage:
+    python manage.py purge_sessions
+    python manage.py purge_sessions --chunk-size 5000
+"""
+
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Sessions deleted per query (default: 1000)')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            store.clear_expired()
+            self.stdout.write(f"{settings.SESSION_ENGINE} expires sessions by itself; nothing to purge")
+            return
+
+        sessions = store.get_model_class().objects
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                sessions.filter(expire_date__lt=now).values_list('session_key', flat=True)[:options['chunk_size']]
+            )
+            if not keys:
+                break
+            deleted += sessions.filter(session_key__in=keys).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired sessions"))
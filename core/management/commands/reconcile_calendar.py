@@ -0,0 +1,71 @@
+"""
+Management command to verify sent schedule entries against Google Calendar.
+
+Lists the calendar once for the period (paged, partial responses), diffs it
+against ScheduleEntry in memory and reports:
+- missing: entries whose event was deleted from the calendar
+- mismatched: events whose attendee is not the assigned employee
+- orphans: speech events that no entry refers to
+
+With --repair, missing events are re-created, attendees patched and orphans
+deleted, using batch requests.
+
+Usage:
+    python manage.py reconcile_calendar --month 2025-04
+    python manage.py reconcile_calendar --range 2022-01-01 2025-12-31 --repair
+"""
+
+from calendar import monthrange
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from core.calendar_sync import reconcile_calendar
+from core.google_calendar import call_stats, get_stored_calendar
+
+
+class Command(BaseCommand):
+    help = 'Diff sent schedule entries against Google Calendar and optionally repair them'
+
+    def add_arguments(self, parser):
+        period = parser.add_mutually_exclusive_group(required=True)
+        period.add_argument('--month', help='Month to check (YYYY-MM)')
+        period.add_argument('--range', nargs=2, metavar=('START', 'END'), help='Dates to check (YYYY-MM-DD, inclusive)')
+        parser.add_argument('--repair', action='store_true', help='Fix the differences instead of only reporting them')
+
+    def handle(self, *args, **options):
+        try:
+            if options['month']:
+                year, month = (int(part) for part in options['month'].split('-'))
+                start = date(year, month, 1)
+                end = date(year, month, monthrange(year, month)[1])
+            else:
+                start, end = (date.fromisoformat(value) for value in options['range'])
+        except ValueError:
+            raise CommandError('--month must be YYYY-MM and --range dates YYYY-MM-DD')
+        if end < start:
+            raise CommandError('The end of the range must not be before its start')
+
+        calendar = get_stored_calendar()
+        if calendar is None:
+            raise CommandError('No stored Google credentials. Authenticate through /google/auth/ first.')
+
+        diff, stats = reconcile_calendar(calendar, start, end, repair=options['repair'])
+
+        for entry in diff['missing']:
+            # (the event id may already have been replaced by --repair)
+            self.stdout.write(f'missing\t{entry.date}\t{entry.get_speech_type_display()}')
+        for entry in diff['mismatched']:
+            self.stdout.write(f'mismatched\t{entry.date}\t{entry.google_event_id}\t{entry.assigned_employee.email}')
+        for event_id in diff['orphans']:
+            self.stdout.write(f'orphan\t\t{event_id}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{start} - {end}: {len(diff['missing'])} missing, "
+            f"{len(diff['mismatched'])} mismatched, {len(diff['orphans'])} orphans"
+        ))
+        if stats is not None:
+            self.stdout.write(self.style.SUCCESS(
+                f"Repaired: {stats['created']} created, {stats['patched']} patched, "
+                f"{stats['deleted']} deleted, {stats['failed']} failed"
+            ))
+        self.stdout.write(call_stats.summary())
@@ -0,0 +1,59 @@
+"""
+Management command to pull changes made directly in Google Calendar
+(deleted events, changed attendees) into the schedule, incrementally.
+
+Uses the credentials saved by the OAuth callback, so authenticate once
+through the web UI first. Run it periodically (e.g. from cron), or register
+a push channel so Google calls the webhook whenever the calendar changes.
+
+Usage:
+    python manage.py sync_calendar
+    python manage.py sync_calendar --full
+    python manage.py sync_calendar --watch https://jidouka.example.com/google/calendar/webhook/
+    python manage.py sync_calendar --stop
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from core.calendar_sync import get_sync_state, stop_watch, sync_calendar, watch_calendar
+from core.google_calendar import call_stats, get_stored_calendar
+
+
+class Command(BaseCommand):
+    help = 'Incrementally sync schedule entries with changes made in Google Calendar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Discard the sync token and list every event again')
+        parser.add_argument('--watch', metavar='URL', help='Register a push channel that notifies this webhook URL')
+        parser.add_argument('--stop', action='store_true', help='Stop the registered push channel')
+
+    def handle(self, *args, **options):
+        calendar = get_stored_calendar()
+        if calendar is None:
+            raise CommandError('No stored Google credentials. Authenticate through /google/auth/ first.')
+
+        state = get_sync_state(calendar)
+
+        if options['stop']:
+            if not state.channel_id:
+                raise CommandError('No push channel is registered.')
+            stop_watch(calendar, state)
+            self.stdout.write(self.style.SUCCESS('Push channel stopped'))
+            return
+
+        if options['full']:
+            state.sync_token = None
+            state.save(update_fields=['sync_token'])
+
+        stats = sync_calendar(calendar)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Full' if stats['full'] else 'Incremental'} sync: {stats['changed']} changed events, "
+            f"{stats['deleted']} deleted, {stats['reassigned']} reassigned"
+        ))
+
+        if options['watch']:
+            state = watch_calendar(calendar, options['watch'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Push channel {state.channel_id} registered (expires {state.channel_expiration})'
+            ))
+
+        self.stdout.write(call_stats.summary())
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:42
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_counters(apps, schema_editor):
+    """
+    Start every counter at the highest value already in use, so allocated
+    employee IDs / order slots never collide with existing employees.
+    """
+    Counter = apps.get_model('core', 'Counter')
+    Employee = apps.get_model('core', 'Employee')
+
+    max_employee_number = 0
+    for employee_id in Employee.objects.values_list('employee_id', flat=True):
+        match = re.fullmatch(r'EMP(\d+)', employee_id or '')
+        if match:
+            max_employee_number = max(max_employee_number, int(match.group(1)))
+
+    stats = Employee.objects.aggregate(max_order=Max('order'), max_order_gyomu=Max('order_gyomu'))
+
+    Counter.objects.bulk_create([
+        Counter(name='employee_id', value=max_employee_number),
+        Counter(name='order', value=stats['max_order'] or 0),
+        Counter(name='order_gyomu', value=stats['max_order_gyomu'] or 0),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_monthlyeventbatch_scheduleentry_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
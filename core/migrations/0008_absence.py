@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Absence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='absences', to='core.employee')),
+            ],
+            options={
+                'ordering': ['start_date'],
+                'indexes': [models.Index(fields=['start_date', 'end_date'], name='core_absence_range_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='absence',
+            constraint=models.CheckConstraint(check=models.Q(('end_date__gte', models.F('start_date'))), name='core_absence_end_after_start'),
+        ),
+    ]
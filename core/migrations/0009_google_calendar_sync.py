@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_absence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(max_length=255, unique=True)),
+                ('sync_token', models.CharField(blank=True, max_length=500, null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('channel_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('channel_token', models.CharField(blank=True, max_length=256, null=True)),
+                ('channel_resource_id', models.CharField(blank=True, max_length=256, null=True)),
+                ('channel_expiration', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GoogleCredential',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default='default', max_length=50, unique=True)),
+                ('data', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
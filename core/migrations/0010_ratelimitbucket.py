@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_google_calendar_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('tokens', models.FloatField()),
+                ('rate', models.FloatField()),
+                ('updated_at', models.FloatField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_ratelimitbucket'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheduleentry',
+            index=models.Index(fields=['speech_type', 'date'], name='core_entry_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleentry',
+            index=models.Index(fields=['is_sent', 'date'], name='core_entry_sent_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleentry',
+            index=models.Index(fields=['is_cancelled', 'date'], name='core_entry_cancel_date_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_scheduleentry_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('status_code', models.PositiveSmallIntegerField(null=True)),
+                ('user', models.CharField(blank=True, max_length=150)),
+                ('duration_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('query_ms', models.FloatField(default=0)),
+                ('api_call_count', models.PositiveIntegerField(default=0)),
+                ('api_ms', models.FloatField(default=0)),
+                ('profiler', models.CharField(max_length=20)),
+                ('profile', models.TextField(blank=True)),
+                ('queries', models.JSONField(default=list)),
+                ('api_calls', models.JSONField(default=list)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:47
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_profilereport'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='core_employee_email_lower_idx'),
+        ),
+    ]
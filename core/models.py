@@ -1,6 +1,29 @@
 from django.db import models
+from django.db.models.functions import Lower
 from datetime import date
 
+from .signals import bulk_change
+
+
+class ChangeTrackingQuerySet(models.QuerySet):
+    """
+    QuerySet that announces bulk writes through the `bulk_change` signal.
+    update() and bulk_create() bypass post_save, so without this cached data
+    (e.g. the dashboard) would not be invalidated.
+    bulk_update() is covered as well since it is implemented with update().
+    """
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        bulk_change.send(sender=self.model)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        bulk_change.send(sender=self.model)
+        return created
+
+
 # Create your models here.
 class Role(models.TextChoices):
     MEMBER = "MEMBER", "メンバー"
@@ -18,6 +41,13 @@ class Employee(models.Model):
 
     is_rotation_active = models.BooleanField(default=True)
 
+    objects = ChangeTrackingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Emails are matched case-insensitively (roster import, calendar sync)
+            models.Index(Lower('email'), name='core_employee_email_lower_idx'),
+        ]
 
     def days_since_last_speech(self):
         last_entry = (
@@ -61,6 +91,8 @@ class MonthlyEventBatch(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_sent = models.BooleanField(default=False)
 
+    objects = ChangeTrackingQuerySet.as_manager()
+
     def __str__(self):
         return f"Batch {self.month.isoformat()} sent={self.is_sent}"
 
@@ -86,8 +118,23 @@ class ScheduleEntry(models.Model):
         MonthlyEventBatch, null=True, blank=True, on_delete=models.SET_NULL, related_name='entries'
     )
 
+    objects = ChangeTrackingQuerySet.as_manager()
+
     class Meta:
         ordering = ['date']
+        indexes = [
+            # Admin filters, listed in date order
+            models.Index(fields=['speech_type', 'date'], name='core_entry_type_date_idx'),
+            models.Index(fields=['is_sent', 'date'], name='core_entry_sent_date_idx'),
+            models.Index(fields=['is_cancelled', 'date'], name='core_entry_cancel_date_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded assignee so a reassignment can invalidate both feeds
+        instance._loaded_assigned_employee_id = instance.__dict__.get("assigned_employee_id")
+        return instance
 
 
 
@@ -103,3 +150,129 @@ class CalendarEvent(models.Model):
         ScheduleEntry, on_delete=models.CASCADE
     )
 
+
+
+# Absence model
+class Absence(models.Model):
+    """
+    A period (inclusive) during which an employee cannot be assigned a speech:
+    leave, business trips, part-time days off...
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='absences')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    reason = models.CharField(max_length=200, blank=True)
+
+    objects = ChangeTrackingQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['start_date']
+        indexes = [
+            # Month lookups: start_date <= month_end AND end_date >= month_start
+            models.Index(fields=['start_date', 'end_date'], name='core_absence_range_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(end_date__gte=models.F('start_date')),
+                name='core_absence_end_after_start',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.employee} {self.start_date.isoformat()}〜{self.end_date.isoformat()}"
+
+
+# Counter model
+class Counter(models.Model):
+    """
+    Named monotonic counter used to hand out employee IDs and order slots
+    without races (see core/allocator.py). Rows are only ever advanced with
+    a single UPDATE ... SET value = value + n, which takes the row lock.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+# GoogleCredential model
+class GoogleCredential(models.Model):
+    """
+    OAuth credentials kept server-side so background jobs (calendar sync,
+    push notifications) can call the Calendar API outside a request.
+    Written by the OAuth callback; see core/google_calendar.py.
+    """
+    key = models.CharField(max_length=50, unique=True, default="default")
+    data = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} ({self.updated_at:%Y-%m-%d %H:%M})"
+
+
+# CalendarSyncState model
+class CalendarSyncState(models.Model):
+    """
+    Incremental sync position for one Google Calendar: the syncToken from
+    the last events().list, and the push channel registered with events().watch.
+    """
+    calendar_id = models.CharField(max_length=255, unique=True)
+    sync_token = models.CharField(max_length=500, blank=True, null=True)
+    last_synced_at = models.DateTimeField(blank=True, null=True)
+
+    channel_id = models.CharField(max_length=64, blank=True, null=True)
+    channel_token = models.CharField(max_length=256, blank=True, null=True)
+    channel_resource_id = models.CharField(max_length=256, blank=True, null=True)
+    channel_expiration = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.calendar_id} synced={self.last_synced_at}"
+
+
+# RateLimitBucket model
+class RateLimitBucket(models.Model):
+    """
+    Shared token bucket state (see core/ratelimit.py). One row per bucket,
+    updated under a row lock so every worker draws from the same budget.
+    Times are Unix timestamps in seconds.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    rate = models.FloatField()
+    updated_at = models.FloatField()
+
+    def __str__(self):
+        return f"{self.name}: {self.tokens:.1f} tokens @ {self.rate:.2f}/s"
+
+
+# ProfileReport model
+class ProfileReport(models.Model):
+    """
+    One profiled request (see core/profiling.py): CPU profile, SQL queries
+    with their timings and origin, and Google API calls. Only the newest
+    settings.PROFILE_REPORT_LIMIT reports are kept.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    user = models.CharField(max_length=150, blank=True)
+
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    query_ms = models.FloatField(default=0)
+    api_call_count = models.PositiveIntegerField(default=0)
+    api_ms = models.FloatField(default=0)
+
+    profiler = models.CharField(max_length=20)
+    profile = models.TextField(blank=True)
+    # [{"sql", "ms", "origin"}] and [{"method", "uri", "bytes", "ms"}]
+    queries = models.JSONField(default=list)
+    api_calls = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.method} {self.path} {self.duration_ms:.0f} ms ({self.created_at:%Y-%m-%d %H:%M:%S})"
@@ -0,0 +1,288 @@
+"""
+On-demand profiling of single requests, for staff.
+
+A request is profiled when it carries `X-Profile: 1` or `?__profile=1` and
+the user is staff. ProfilingMiddleware then records:
+- a CPU profile of the request: pyinstrument (sampling) if it is
+  installed, cProfile otherwise;
+- every SQL query with its duration and the project line that ran it;
+- every Google API round trip (reported by core/google_client.py).
+
+The report is saved as a ProfileReport (newest PROFILE_REPORT_LIMIT kept),
+viewable in the admin, and the response carries its URL in the
+X-Profile-Report header:
+
+    curl -H 'X-Profile: 1' -b sessionid=... https://.../dashboard/ -D - -o /dev/null
+
+Untriggered requests only pay for the header / query string check. The SQL
+hook is installed on the first profiled request; from then on it costs one
+context variable lookup per query.
+
+Queries and API calls made from worker threads (the async calendar views
+run their blocking work in threads) are recorded; the CPU profile only
+covers the request's own thread. Under ASGI, cProfile also sees the other
+requests interleaved on the event loop while profiling.
+"""
+import cProfile
+import importlib.util
+import io
+import os
+import pstats
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+
+from .models import ProfileReport
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAM = "__profile"
+REPORT_HEADER = "X-Profile-Report"
+
+# Queries / API calls kept in detail per report (all are counted)
+MAX_RECORDED_QUERIES = 500
+MAX_RECORDED_API_CALLS = 200
+# Functions listed in a cProfile report
+PROFILE_TOP_FUNCTIONS = 60
+
+_current = ContextVar("core_profile", default=None)
+# Profilers hook the interpreter per thread, and cProfile in an event loop
+# sees every task: profile one request at a time per process
+_profile_lock = threading.Lock()
+_query_hook_lock = threading.Lock()
+_query_hook_installed = False
+
+
+class _Recording:
+    """
+    Queries and API calls of the request being profiled. Shared with the
+    threads the request runs work in (asgiref copies the context).
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.api_calls = []
+        self.api_call_count = 0
+        self.api_seconds = 0.0
+
+    def add_query(self, sql, seconds):
+        self.query_count += 1
+        self.query_seconds += seconds
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append({"sql": sql, "ms": round(seconds * 1000, 2), "origin": _origin()})
+
+    def add_api_call(self, method, uri, size, seconds):
+        self.api_call_count += 1
+        self.api_seconds += seconds
+        if len(self.api_calls) < MAX_RECORDED_API_CALLS:
+            self.api_calls.append({"method": method, "uri": uri, "bytes": size, "ms": round(seconds * 1000, 1)})
+
+
+def _origin():
+    """
+    Innermost project line (outside this module and installed packages)
+    on the current stack.
+    """
+    root = str(settings.BASE_DIR) + os.sep
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if filename.startswith(root) and filename != __file__ and "site-packages" not in filename:
+            return f"{filename[len(root):]}:{frame.lineno} in {frame.name}"
+    return ""
+
+
+def record_api_call(method, uri, size, seconds):
+    """
+    Called by the Google HTTP transport after every round trip.
+    """
+    recording = _current.get()
+    if recording is not None:
+        recording.add_api_call(method, uri, size, seconds)
+
+
+def _record_query(execute, sql, params, many, context):
+    recording = _current.get()
+    if recording is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recording.add_query(sql, time.perf_counter() - started)
+
+
+def _add_query_hook(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _install_query_hook():
+    """
+    Wrap the queries of every connection from now on (connections are per
+    thread, so new ones are hooked as they connect).
+    """
+    global _query_hook_installed
+    with _query_hook_lock:
+        if not _query_hook_installed:
+            connection_created.connect(_add_query_hook, dispatch_uid="core.profiling.query_hook")
+            _query_hook_installed = True
+    for connection in connections.all(initialized_only=True):
+        _add_query_hook(connection)
+
+
+class _CProfiler:
+    name = "cProfile"
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def output(self):
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        return stream.getvalue()
+
+
+class _SamplingProfiler:
+    name = "pyinstrument"
+
+    def __init__(self):
+        from pyinstrument import Profiler
+
+        self.profiler = Profiler(async_mode="enabled")
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def output(self):
+        return self.profiler.output_text(unicode=True, color=False)
+
+
+def _make_profiler():
+    if importlib.util.find_spec("pyinstrument") is not None:
+        return _SamplingProfiler()
+    return _CProfiler()
+
+
+def _wants_profile(request):
+    if request.META.get(PROFILE_HEADER) == "1":
+        return True
+    # Only parse the query string when the parameter can be in it
+    return PROFILE_PARAM in request.META.get("QUERY_STRING", "") and request.GET.get(PROFILE_PARAM) == "1"
+
+
+def _is_staff(request):
+    user = getattr(request, "user", None)
+    return bool(user and user.is_staff)
+
+
+def _save_report(request, response, recording, profiler, seconds):
+    """
+    Store the report, keep only the newest PROFILE_REPORT_LIMIT, and point
+    the response at it.
+    """
+    report = ProfileReport.objects.create(
+        method=request.method,
+        path=request.get_full_path()[:500],
+        status_code=getattr(response, "status_code", None),
+        user=request.user.get_username(),
+        duration_ms=round(seconds * 1000, 1),
+        query_count=recording.query_count,
+        query_ms=round(recording.query_seconds * 1000, 1),
+        api_call_count=recording.api_call_count,
+        api_ms=round(recording.api_seconds * 1000, 1),
+        profiler=profiler.name,
+        profile=profiler.output(),
+        queries=recording.queries,
+        api_calls=recording.api_calls,
+    )
+    oldest_kept = list(
+        ProfileReport.objects.order_by("-id").values_list("id", flat=True)[settings.PROFILE_REPORT_LIMIT - 1:settings.PROFILE_REPORT_LIMIT]
+    )
+    if oldest_kept:
+        ProfileReport.objects.filter(id__lt=oldest_kept[0]).delete()
+    response[REPORT_HEADER] = reverse("admin:core_profilereport_change", args=[report.pk])
+
+
+class ProfilingMiddleware:
+    """
+    Profile the rest of the middleware chain and the view when a staff
+    user asks for it (see the module docstring). Sync and async capable, so
+    it never forces the async calendar views through a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not _wants_profile(request) or not _is_staff(request):
+            return self.get_response(request)
+        if not _profile_lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response[REPORT_HEADER] = "busy"
+            return response
+
+        try:
+            _install_query_hook()
+            recording, profiler = _Recording(), _make_profiler()
+            token = _current.set(recording)
+            started = time.perf_counter()
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+                seconds = time.perf_counter() - started
+                _current.reset(token)
+            _save_report(request, response, recording, profiler, seconds)
+        finally:
+            _profile_lock.release()
+        return response
+
+    async def __acall__(self, request):
+        if not _wants_profile(request) or not await sync_to_async(_is_staff)(request):
+            return await self.get_response(request)
+        if not _profile_lock.acquire(blocking=False):
+            response = await self.get_response(request)
+            response[REPORT_HEADER] = "busy"
+            return response
+
+        try:
+            _install_query_hook()
+            recording, profiler = _Recording(), _make_profiler()
+            token = _current.set(recording)
+            started = time.perf_counter()
+            profiler.start()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.stop()
+                seconds = time.perf_counter() - started
+                _current.reset(token)
+            await sync_to_async(_save_report)(request, response, recording, profiler, seconds)
+        finally:
+            _profile_lock.release()
+        return response
@@ -0,0 +1,108 @@
+"""
+Token bucket shared by every worker, used to stay under the Google Calendar
+API quotas.
+
+The bucket state lives in one RateLimitBucket row. A reservation is a single
+locked read-modify-write: tokens are refilled for the elapsed time, the
+requested amount is taken (the balance may go negative, which queues the
+caller behind earlier reservations) and the caller is told how long to wait.
+Waiting happens outside the transaction, so the lock is held for one short
+UPDATE and no caller ever polls. That only holds when no outer transaction
+is open: inside one, the row lock (and on SQLite the database write lock)
+lasts until the outer commit, through the wait and the API call. Callers
+make their calendar calls outside transaction.atomic() (see
+core/schedule_edits.py).
+
+When Google still answers with a rate-limit error, throttle() halves the
+shared rate and blocks the bucket for the Retry-After period; the rate then
+recovers linearly back to the configured maximum (additive increase,
+multiplicative decrease), so the sustained rate settles just below the quota.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import RateLimitBucket
+
+
+class TokenBucket:
+    """
+    Args:
+        name: Bucket row name
+        rate: Maximum sustained rate (tokens per second)
+        capacity: Burst size
+        recovery_seconds: Time to recover from the minimum to the maximum rate
+        min_rate: Floor for the throttled rate (default: rate / 16)
+    """
+
+    def __init__(self, name, rate, capacity, recovery_seconds=60.0, min_rate=None):
+        self.name = name
+        self.max_rate = float(rate)
+        self.capacity = float(capacity)
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 16
+        self.recovery = (self.max_rate - self.min_rate) / recovery_seconds
+
+    def _locked_state(self, now):
+        buckets = RateLimitBucket.objects.select_for_update()
+        try:
+            return buckets.get(name=self.name)
+        except RateLimitBucket.DoesNotExist:
+            RateLimitBucket.objects.get_or_create(
+                name=self.name,
+                defaults={"tokens": self.capacity, "rate": self.max_rate, "updated_at": now},
+            )
+            return buckets.get(name=self.name)
+
+    def _refill(self, bucket, now):
+        elapsed = now - bucket.updated_at
+        if elapsed > 0:
+            bucket.rate = min(self.max_rate, bucket.rate + self.recovery * elapsed)
+            bucket.tokens = min(self.capacity, bucket.tokens + elapsed * bucket.rate)
+            bucket.updated_at = now
+
+    def reserve(self, count=1):
+        """
+        Take `count` tokens and return how many seconds to wait before using them.
+        """
+        now = time.time()
+        with transaction.atomic():
+            bucket = self._locked_state(now)
+            self._refill(bucket, now)
+            bucket.tokens -= count
+            bucket.save(update_fields=["tokens", "rate", "updated_at"])
+
+        # updated_at is in the future while the bucket is blocked
+        wait = max(0.0, bucket.updated_at - now)
+        if bucket.tokens < 0:
+            wait += -bucket.tokens / bucket.rate
+        return wait
+
+    def take(self, count=1):
+        """
+        Take `count` tokens, sleeping until they are available.
+        """
+        wait = self.reserve(count)
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttle(self, retry_after):
+        """
+        The API reported a rate limit: halve the shared rate and block the
+        bucket for `retry_after` seconds.
+        """
+        now = time.time()
+        with transaction.atomic():
+            bucket = self._locked_state(now)
+            self._refill(bucket, now)
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+            bucket.tokens = min(bucket.tokens, 0.0)
+            bucket.updated_at = max(bucket.updated_at, now + retry_after)
+            bucket.save(update_fields=["tokens", "rate", "updated_at"])
+
+
+def google_api_bucket():
+    """
+    The bucket all Calendar API calls draw from (GOOGLE_API_RATE / GOOGLE_API_BURST).
+    """
+    return TokenBucket("google_calendar", settings.GOOGLE_API_RATE, settings.GOOGLE_API_BURST)
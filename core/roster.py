@@ -0,0 +1,383 @@
+"""
+Roster snapshots and bulk roster import / export.
+
+RosterMember is a compact immutable snapshot of an employee, loaded with
+values_list in a single query (no model hydration). The dashboard builder,
+the schedule planners and the what-if simulation all work on it.
+
+Import reads CSV or JSON (array or JSON Lines) incrementally and processes
+rows in chunks. Each chunk costs a handful of queries regardless of its size:
+one case-insensitive `lower(email) IN (...)` lookup (served by an index on
+lower(email)), one block allocation from the counter table
+(core/allocator.py) and one upsert through
+`bulk_create(update_conflicts=True)`.
+
+Export streams the roster straight from a server-side iterator.
+"""
+import csv
+import json
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.db.models.functions import Lower
+
+from .allocator import allocate_employee_ids, allocate_order_slots
+from .models import Employee, Role, ScheduleEntry
+
+# Columns written by the export (and accepted by the import)
+ROSTER_FIELDS = ["employee_id", "name", "email", "role", "order", "order_gyomu", "is_rotation_active"]
+
+# Fields refreshed on existing employees; order / employee_id are never overwritten
+UPSERT_UPDATE_FIELDS = ["name", "role", "is_rotation_active"]
+
+IMPORT_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+JSON_READ_SIZE = 64 * 1024
+
+TRUE_VALUES = {"1", "true", "yes", "on", "y", "t"}
+FALSE_VALUES = {"0", "false", "no", "off", "n", "f"}
+
+
+# =====================================================
+# Snapshots
+# =====================================================
+
+class RosterMember(NamedTuple):
+    """
+    Immutable snapshot of one employee.
+
+    Backed by a plain tuple (NamedTuple sets __slots__ = ()), so an instance
+    has no per-object __dict__ and costs a fraction of a model instance.
+    Attribute names match Employee, so planners work with either.
+    """
+    id: int
+    name: str
+    email: str
+    role: str
+    order: int
+    order_gyomu: int
+    is_rotation_active: bool
+
+
+def load_roster(**filters):
+    """
+    Load RosterMember snapshots ordered by (order, id) in one query.
+    Keyword arguments are passed to Employee.objects.filter().
+    """
+    rows = (
+        Employee.objects.filter(**filters)
+        .order_by("order", "id")
+        .values_list(*RosterMember._fields)
+    )
+    return [RosterMember._make(row) for row in rows]
+
+
+def gyomu_rotation(members):
+    """
+    Members taking part in the 業務 rotation, ordered by (order_gyomu, id).
+    """
+    return sorted(
+        (member for member in members if member.role == Role.MEMBER),
+        key=lambda member: (member.order_gyomu, member.id),
+    )
+
+
+def load_speech_dates(today, employee_ids=None):
+    """
+    Last and next speech date per employee, in one aggregate query
+    (instead of two queries per employee).
+
+    Matches Employee.days_since_last_speech / next_speech_date: the last date
+    is the latest non-cancelled entry, the next date the earliest one after today.
+
+    Returns:
+        Dict {employee_pk: (last_date or None, next_date or None)}
+    """
+    entries = ScheduleEntry.objects.filter(assigned_employee__isnull=False, is_cancelled=False)
+    if employee_ids is not None:
+        entries = entries.filter(assigned_employee_id__in=employee_ids)
+    rows = (
+        entries.order_by()
+        .values("assigned_employee_id")
+        .annotate(last_date=Max("date"), next_date=Min("date", filter=Q(date__gt=today)))
+    )
+    return {row["assigned_employee_id"]: (row["last_date"], row["next_date"]) for row in rows}
+
+
+# =====================================================
+# Parsing
+# =====================================================
+
+def detect_format(filename):
+    """
+    Guess the roster format ('csv' or 'json') from a file name.
+    """
+    name = (filename or "").lower()
+    if name.endswith((".json", ".jsonl", ".ndjson")):
+        return "json"
+    return "csv"
+
+
+def iter_csv_rows(stream):
+    """
+    Yield (line_number, row_dict) from a CSV text stream with a header row.
+    """
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_json_rows(stream):
+    """
+    Yield (row_number, obj) from a JSON array or JSON Lines text stream.
+
+    The stream is decoded incrementally with JSONDecoder.raw_decode, so only
+    the current read buffer is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    row_number = 0
+
+    while True:
+        # Skip separators between objects (array brackets, commas, newlines)
+        buffer = buffer.lstrip(" \t\r\n,[")
+        if buffer.startswith("]"):
+            return
+
+        if buffer:
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Invalid JSON near row {row_number + 1}: {e}")
+            else:
+                row_number += 1
+                yield row_number, obj
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            return
+
+        # Need more data: either the buffer is empty or holds a partial object
+        chunk = stream.read(JSON_READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+
+def iter_roster_rows(stream, fmt):
+    """
+    Yield (row_number, raw_row) for the given format ('csv' or 'json').
+    """
+    if fmt == "json":
+        return iter_json_rows(stream)
+    if fmt == "csv":
+        return iter_csv_rows(stream)
+    raise ValueError(f"Unsupported roster format: {fmt}")
+
+
+def _parse_bool(value, default=True):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"真偽値として解釈できません: {value}")
+
+
+def _parse_role(value):
+    if value is None or value == "":
+        return Role.MEMBER
+    text = str(value).strip()
+    for choice_value, label in Role.choices:
+        if text in (choice_value, label) or text.upper() == choice_value:
+            return choice_value
+    raise ValueError(f"不明な役割です: {value}")
+
+
+def clean_roster_row(raw):
+    """
+    Validate a raw import row and return the normalized dict
+    {"name", "email", "role", "is_rotation_active"}.
+
+    Raises ValueError with a user-facing message when the row is invalid.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("行がオブジェクトではありません。")
+
+    name = str(raw.get("name") or "").strip()
+    email = str(raw.get("email") or "").strip()
+
+    if not name:
+        raise ValueError("氏名を入力してください。")
+    if not email or "@" not in email:
+        raise ValueError("有効なメールアドレスを入力してください。")
+
+    return {
+        "name": name,
+        "email": email,
+        "role": _parse_role(raw.get("role")),
+        "is_rotation_active": _parse_bool(raw.get("is_rotation_active")),
+    }
+
+
+# =====================================================
+# Import
+# =====================================================
+
+def _allocate_slots(count):
+    """
+    Return `count` (employee_id, order, order_gyomu) tuples for new employees,
+    appended after the current roster. IDs and slots are reserved as one block
+    each from the allocator, so concurrent imports never collide.
+    """
+    if count == 0:
+        return []
+    employee_ids = allocate_employee_ids(count)
+    slots = allocate_order_slots(count)
+    return [
+        (employee_id, order, order_gyomu)
+        for employee_id, (order, order_gyomu) in zip(employee_ids, slots)
+    ]
+
+
+def _import_chunk(rows, summary, dry_run):
+    """
+    Upsert one chunk of cleaned rows (keyed by email, case-insensitively
+    like the duplicate check and member removal).
+    """
+    existing = {
+        email.lower(): (email, employee_id, order, order_gyomu)
+        for email, employee_id, order, order_gyomu in Employee.objects
+        .annotate(email_lower=Lower("email"))
+        .filter(email_lower__in=[row["email"].lower() for row in rows])
+        .values_list("email", "employee_id", "order", "order_gyomu")
+    }
+    new_rows = [row for row in rows if row["email"].lower() not in existing]
+
+    summary["created"] += len(new_rows)
+    summary["updated"] += len(rows) - len(new_rows)
+    if dry_run:
+        return
+
+    with transaction.atomic():
+        slots = iter(_allocate_slots(len(new_rows)))
+        objs = []
+        for row in rows:
+            match = existing.get(row["email"].lower())
+            if match:
+                # Keep the stored spelling: the upsert conflicts on the exact email
+                email, employee_id, order, order_gyomu = match
+                row = {**row, "email": email}
+            else:
+                employee_id, order, order_gyomu = next(slots)
+            objs.append(Employee(
+                employee_id=employee_id,
+                order=order,
+                order_gyomu=order_gyomu,
+                **row,
+            ))
+
+        Employee.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["email"],
+            update_fields=UPSERT_UPDATE_FIELDS,
+        )
+
+
+def import_roster(stream, fmt="csv", dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import (upsert by email) a roster from a text stream.
+
+    New employees get an employee_id and are appended to the end of both
+    rotations; existing employees keep their id and order and only get
+    name / role / is_rotation_active refreshed.
+
+    Returns:
+        Dict {"created": int, "updated": int, "errors": [(row_number, message), ...]}
+    """
+    summary = {"created": 0, "updated": 0, "errors": []}
+    seen_emails = set()
+    chunk = []
+
+    for row_number, raw in iter_roster_rows(stream, fmt):
+        try:
+            row = clean_roster_row(raw)
+        except ValueError as e:
+            summary["errors"].append((row_number, str(e)))
+            continue
+
+        key = row["email"].lower()
+        if key in seen_emails:
+            summary["errors"].append((row_number, f"メールアドレスが重複しています: {row['email']}"))
+            continue
+        seen_emails.add(key)
+
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, summary, dry_run)
+            chunk = []
+
+    if chunk:
+        _import_chunk(chunk, summary, dry_run)
+
+    return summary
+
+
+# =====================================================
+# Export
+# =====================================================
+
+class EchoBuffer:
+    """
+    File-like object whose write() returns the value, so csv.writer can be
+    used to produce streamed lines.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _iter_roster_values():
+    return (
+        Employee.objects.order_by("order", "id")
+        .values_list(*ROSTER_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def iter_roster_csv():
+    """
+    Yield the roster as CSV lines (header first).
+    """
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(ROSTER_FIELDS)
+    for values in _iter_roster_values():
+        yield writer.writerow(values)
+
+
+def iter_roster_json():
+    """
+    Yield the roster as a JSON array, one employee object per line.
+    """
+    yield "["
+    separator = "\n"
+    for values in _iter_roster_values():
+        yield separator + json.dumps(dict(zip(ROSTER_FIELDS, values)), ensure_ascii=False)
+        separator = ",\n"
+    yield "\n]\n"
+
+
+def iter_roster_export(fmt):
+    if fmt == "json":
+        return iter_roster_json()
+    if fmt == "csv":
+        return iter_roster_csv()
+    raise ValueError(f"Unsupported roster format: {fmt}")
@@ -0,0 +1,138 @@
+"""
+Rotation and roster ordering, independent of any request.
+
+- advance_rotation(): reorder both rotations after a month was sent
+  (missed speakers first, speakers last, see scheduling.apply_rotation);
+- move_in_rotation(): swap an employee with their neighbour (dashboard arrows);
+- remove_employee(): delete an employee and close the gaps in both rotations.
+
+Orders are written with bulk_update, one query per rotation.
+"""
+import logging
+import time
+
+from django.db import transaction
+
+from .allocator import sync_order_counters
+from .models import Employee, Role, ScheduleEntry
+from .roster import gyomu_rotation, load_roster
+from .scheduling import apply_rotation
+
+logger = logging.getLogger(__name__)
+
+# Who takes part in the rotation ordered by each field: everyone for the
+# 3-minute speech, members only for 業務 (社長室 order_gyomu values are
+# interleaved with theirs but never shown or assigned)
+ROTATION_QUERYSETS = {
+    "order": lambda: Employee.objects.all(),
+    "order_gyomu": lambda: Employee.objects.filter(role=Role.MEMBER),
+}
+
+
+def _save_order(members, field):
+    Employee.objects.bulk_update(
+        [Employee(id=member.id, **{field: idx}) for idx, member in enumerate(members, start=1)],
+        [field],
+    )
+
+
+def advance_rotation(batch, spoken_dates):
+    """
+    Apply the rotation for a sent month.
+
+    Args:
+        batch: The sent MonthlyEventBatch
+        spoken_dates: Set of dates whose speaker actually spoke; assigned
+            speakers of other (or cancelled) days count as missed
+    """
+    started = time.monotonic()
+    entries = list(
+        ScheduleEntry.objects
+        .filter(batch=batch, assigned_employee__isnull=False)
+        .only("id", "date", "is_cancelled", "assigned_employee")
+    )
+    did_speak_map = {
+        entry.assigned_employee_id: entry.date in spoken_dates and not entry.is_cancelled
+        for entry in entries
+    }
+    assigned_members = [Employee(id=employee_id) for employee_id in did_speak_map]
+    logger.debug("Rotation for %s: did_speak=%s", batch.month, did_speak_map)
+
+    # Both rotations are updated to keep them consistent
+    three_min_employees = load_roster(is_rotation_active=True)
+    gyomu_employees = gyomu_rotation(three_min_employees)
+
+    with transaction.atomic():
+        if three_min_employees:
+            _save_order(apply_rotation(three_min_employees, assigned_members, did_speak_map), "order")
+        if gyomu_employees:
+            _save_order(apply_rotation(gyomu_employees, assigned_members, did_speak_map), "order_gyomu")
+        sync_order_counters()
+
+    spoke = sum(did_speak_map.values())
+    duration_ms = round((time.monotonic() - started) * 1000)
+    logger.info(
+        "Rotation for %s: %d spoke, %d missed in %d ms",
+        batch.month, spoke, len(did_speak_map) - spoke, duration_ms,
+        extra={
+            "event": "rotation.advance",
+            "month": batch.month.isoformat(),
+            "spoke": spoke,
+            "missed": len(did_speak_map) - spoke,
+            "duration_ms": duration_ms,
+        },
+    )
+
+
+def move_in_rotation(employee, field, step):
+    """
+    Swap `employee` with the previous (step=-1) or next (step=1) employee
+    in the rotation ordered by `field` (see ROTATION_QUERYSETS).
+
+    Returns:
+        The neighbour that was swapped with, or None at either end
+    """
+    if field not in ROTATION_QUERYSETS:
+        raise ValueError(f"Unknown rotation field: {field}")
+
+    members = ROTATION_QUERYSETS[field]()
+    position = getattr(employee, field)
+    if step < 0:
+        neighbour = members.filter(**{f"{field}__lt": position}).order_by(f"-{field}").first()
+    else:
+        neighbour = members.filter(**{f"{field}__gt": position}).order_by(field).first()
+
+    if neighbour:
+        setattr(employee, field, getattr(neighbour, field))
+        setattr(neighbour, field, position)
+        employee.save()
+        neighbour.save()
+    return neighbour
+
+
+def compact_rotations():
+    """
+    Renumber both rotations 1..n, preserving the relative order.
+    """
+    all_emps = list(Employee.objects.order_by("order", "id").only("id", "order"))
+    Employee.objects.bulk_update(
+        [Employee(id=e.id, order=idx) for idx, e in enumerate(all_emps, start=1) if e.order != idx],
+        ["order"],
+    )
+    gyomu_emps = list(ROTATION_QUERYSETS["order_gyomu"]().order_by("order_gyomu", "id").only("id", "order_gyomu"))
+    Employee.objects.bulk_update(
+        [Employee(id=e.id, order_gyomu=idx) for idx, e in enumerate(gyomu_emps, start=1) if e.order_gyomu != idx],
+        ["order_gyomu"],
+    )
+    sync_order_counters()
+
+
+def remove_employee(employee):
+    """
+    Delete an employee and close the gap in both rotations. Their schedule
+    entries are unassigned (on_delete=SET_NULL) but keep their sent event
+    ids, so retracting the month still deletes those calendar events.
+    """
+    with transaction.atomic():
+        employee.delete()
+        compact_rotations()
@@ -0,0 +1,347 @@
+"""
+Edits to a generated (or already sent) schedule: cancel a day, reassign it
+to another employee, swap the speakers of two days, or withdraw a day left
+sent in an unsent month.
+
+Only the affected Google Calendar events are touched: one events().patch
+per changed attendee and one events().delete per cancelled day, instead of
+retracting and resending the whole month. Each edit runs in three steps:
+
+1. the entries are locked, checked and updated in a short transaction;
+2. the calendar calls are made after that commit, so no row lock (nor the
+   SQLite write lock) is held while they wait on the shared rate limiter
+   (core/ratelimit.py) or on Google;
+3. only once they succeeded is the rotation adjusted. A failed call puts
+   the entries back as they were (a swap also restores the event it
+   already patched) and re-raises.
+
+Calendar calls go through a CalendarGateway (core/google_calendar.py), or
+`calendar` is None when not authenticated.
+
+Last/next speech dates and the fair strategy read ScheduleEntry directly, so
+they follow an edit immediately. The stored rotation orders were already
+advanced when the batch was sent, so for sent batches they are adjusted
+incrementally by the rule advance_rotation (core/rotation.py) applies: a
+month's speakers and missed speakers are moved in both rotations, whatever
+the type of their speech, the 業務 one for members only. A speaker left
+without any speech that month goes back to the front, a speaker who takes
+over a day goes to the back.
+"""
+from django.db import transaction
+from django.db.models import F, Min
+
+from .allocator import ORDER_COUNTER, ORDER_GYOMU_COUNTER, allocate
+from .models import Absence, Employee, ScheduleEntry
+from .rotation import ROTATION_QUERYSETS
+from .scheduling import can_take
+
+# Rotation order fields and the counter used to append to each
+ROTATION_COUNTERS = {
+    "order": ORDER_COUNTER,
+    "order_gyomu": ORDER_GYOMU_COUNTER,
+}
+
+class ScheduleEditError(Exception):
+    """
+    An edit that cannot be applied; the message is shown to the user.
+    """
+
+
+# =====================================================
+# Rotation
+# =====================================================
+
+def _move_to_front(employee_id):
+    """
+    Put an employee at the front of the rotations they take part in
+    (missed speakers go first). Everyone ahead of them shifts back by one,
+    in a single UPDATE per rotation.
+    """
+    for field in ROTATION_COUNTERS:
+        members = ROTATION_QUERYSETS[field]()
+        current = members.filter(pk=employee_id).values_list(field, flat=True).first()
+        if current is None:
+            continue
+        first = members.aggregate(first=Min(field))["first"]
+        if first >= current:
+            continue
+        members.filter(**{f"{field}__lt": current}).update(**{field: F(field) + 1})
+        Employee.objects.filter(pk=employee_id).update(**{field: first})
+
+
+def _move_to_back(employee_id):
+    """
+    Put an employee at the back of the rotations they take part in, using
+    a fresh order slot in each.
+    """
+    for field, counter in ROTATION_COUNTERS.items():
+        members = ROTATION_QUERYSETS[field]().filter(pk=employee_id)
+        if members.exists():
+            [slot] = allocate(counter, 1)
+            members.update(**{field: slot})
+
+
+def _rotation_applied(entry):
+    return entry.batch is not None and entry.batch.is_sent
+
+
+def _still_speaks(employee_id, entry):
+    """
+    Whether the employee keeps another (non-cancelled) speech of any type
+    in the entry's month, in which case they did not miss the month.
+    """
+    return (
+        ScheduleEntry.objects
+        .filter(batch_id=entry.batch_id, assigned_employee_id=employee_id, is_cancelled=False)
+        .exclude(pk=entry.pk)
+        .exists()
+    )
+
+
+# =====================================================
+# Google Calendar
+# =====================================================
+
+def _require_calendar(calendar, entry):
+    if entry.google_event_id and calendar is None:
+        raise ScheduleEditError("Not authenticated with Google Calendar. Please authenticate first.")
+
+
+def _patch_attendee(calendar, entry, email):
+    """
+    Point an already sent event at a new attendee. No-op for unsent entries.
+    """
+    if entry.google_event_id:
+        calendar.patch_attendee(entry.google_event_id, email)
+
+
+# =====================================================
+# Edits
+# =====================================================
+
+def _lock_entries(*entry_ids):
+    """
+    Lock and return the given entries (in the order requested).
+
+    Raises:
+        ScheduleEditError: an entry does not exist or has no speaker
+    """
+    entries = (
+        ScheduleEntry.objects
+        # Lock the entries only: PostgreSQL refuses FOR UPDATE on the
+        # nullable side of the outer joins below
+        .select_for_update(of=("self",))
+        .select_related("assigned_employee", "batch")
+        .in_bulk(entry_ids)
+    )
+    locked = []
+    for entry_id in entry_ids:
+        entry = entries.get(entry_id)
+        if entry is None:
+            raise ScheduleEditError("スケジュールが見つかりません。")
+        if entry.is_cancelled:
+            raise ScheduleEditError(f"{entry.date} は既にキャンセルされています。")
+        if entry.assigned_employee is None:
+            raise ScheduleEditError(f"{entry.date} には担当者が割り当てられていません。")
+        locked.append(entry)
+    return locked
+
+
+def _check_can_take(employee, entry):
+    """
+    Apply the planner's rules to a new speaker for `entry`: active in the
+    rotation, a member for 業務 days (scheduling.can_take), and not absent.
+
+    Raises:
+        ScheduleEditError: the employee cannot take the day
+    """
+    if not employee.is_rotation_active:
+        raise ScheduleEditError(f"{employee.name} はローテーションから外れています。")
+    if not can_take(employee, entry.speech_type):
+        raise ScheduleEditError(f"{employee.name} は業務スピーチを担当できません。")
+    if Absence.objects.filter(employee=employee, start_date__lte=entry.date, end_date__gte=entry.date).exists():
+        raise ScheduleEditError(f"{employee.name} は {entry.date} に不在です。")
+
+
+def _restore(entry, **values):
+    """
+    Undo a committed edit of `entry` after a failed calendar call, unless
+    another edit changed the entry in the meantime.
+    """
+    changed = {field: getattr(entry, field) for field in values}
+    ScheduleEntry.objects.filter(pk=entry.pk, **changed).update(**values)
+
+
+def cancel_entry(calendar, entry_id):
+    """
+    Cancel one day: delete its calendar event and mark the entry cancelled.
+    The speaker counts as having missed the month unless they have another
+    speech in it.
+
+    Returns:
+        The updated ScheduleEntry
+    """
+    with transaction.atomic():
+        [entry] = _lock_entries(entry_id)
+        _require_calendar(calendar, entry)
+
+        event_id, was_sent = entry.google_event_id, entry.is_sent
+        entry.is_cancelled = True
+        entry.google_event_id = None
+        entry.is_sent = False
+        entry.save(update_fields=["is_cancelled", "google_event_id", "is_sent"])
+
+    if event_id:
+        try:
+            # Already deleted on the Google side is fine
+            calendar.delete_event(event_id)
+        except Exception:
+            _restore(entry, is_cancelled=False, google_event_id=event_id, is_sent=was_sent)
+            raise
+
+    if _rotation_applied(entry) and not _still_speaks(entry.assigned_employee_id, entry):
+        with transaction.atomic():
+            _move_to_front(entry.assigned_employee_id)
+    return entry
+
+
+def reassign_entry(calendar, entry_id, employee_id):
+    """
+    Give one day to another employee with a single attendee patch.
+
+    Returns:
+        The updated ScheduleEntry
+
+    Raises:
+        ScheduleEditError: unknown employee, one who cannot take the day
+            (see _check_can_take), or invalid entry
+    """
+    with transaction.atomic():
+        [entry] = _lock_entries(entry_id)
+        _require_calendar(calendar, entry)
+
+        employee = (
+            Employee.objects.filter(pk=employee_id)
+            .only("id", "name", "email", "role", "is_rotation_active")
+            .first()
+        )
+        if employee is None:
+            raise ScheduleEditError("社員が見つかりません。")
+        if employee.pk == entry.assigned_employee_id:
+            return entry
+        _check_can_take(employee, entry)
+        if entry.google_event_id and not employee.email:
+            raise ScheduleEditError(f"{employee.name} has no email.")
+
+        previous_id = entry.assigned_employee_id
+        entry.assigned_employee = employee
+        entry.save(update_fields=["assigned_employee"])
+
+    try:
+        _patch_attendee(calendar, entry, employee.email)
+    except Exception:
+        _restore(entry, assigned_employee_id=previous_id)
+        raise
+
+    if _rotation_applied(entry):
+        with transaction.atomic():
+            if not _still_speaks(previous_id, entry):
+                _move_to_front(previous_id)
+            _move_to_back(employee.pk)
+    return entry
+
+
+def swap_entries(calendar, entry_id, other_entry_id):
+    """
+    Swap the speakers of two days of the same month and speech type: at
+    most two attendee patches. Both speakers still give that speech this
+    month, so the rotation is unchanged.
+
+    Returns:
+        (entry, other_entry) after the swap
+
+    Raises:
+        ScheduleEditError: the days are of different months or types, a
+            speaker cannot take the other day (see _check_can_take), or
+            an entry is invalid
+    """
+    if entry_id == other_entry_id:
+        raise ScheduleEditError("同じ日付同士は入れ替えできません。")
+
+    with transaction.atomic():
+        entry, other = _lock_entries(entry_id, other_entry_id)
+        if entry.batch_id != other.batch_id or entry.date.replace(day=1) != other.date.replace(day=1):
+            raise ScheduleEditError("同じ月のスケジュール同士のみ入れ替えできます。")
+        if entry.speech_type != other.speech_type:
+            raise ScheduleEditError("同じ種類のスピーチ同士のみ入れ替えできます。")
+        _require_calendar(calendar, entry)
+        _require_calendar(calendar, other)
+
+        first, second = entry.assigned_employee, other.assigned_employee
+        _check_can_take(second, entry)
+        _check_can_take(first, other)
+        entry.assigned_employee, other.assigned_employee = second, first
+        entry.save(update_fields=["assigned_employee"])
+        other.save(update_fields=["assigned_employee"])
+
+    try:
+        _patch_attendee(calendar, entry, second.email)
+        try:
+            _patch_attendee(calendar, other, first.email)
+        except Exception:
+            # Put the first event back
+            _patch_attendee(calendar, entry, first.email)
+            raise
+    except Exception:
+        _restore(entry, assigned_employee_id=first.pk)
+        _restore(other, assigned_employee_id=second.pk)
+        raise
+    return entry, other
+
+
+def unsend_entry(calendar, entry_id):
+    """
+    Withdraw one day left sent in a month that is not (or no longer) sent,
+    e.g. after a retract that failed to delete some events: delete its
+    calendar event and mark the entry unsent, so the next send of the month
+    creates it again. The rotation is unchanged.
+
+    Days of a sent month are refused: the send view only sends unsent months
+    and reconcile_calendar only checks entries with an event, so such a day
+    would never be sent again. Retract the month instead.
+
+    Returns:
+        The updated ScheduleEntry
+
+    Raises:
+        ScheduleEditError: unknown entry, or its month is sent
+    """
+    with transaction.atomic():
+        entry = (
+            ScheduleEntry.objects
+            .select_for_update(of=("self",))
+            .select_related("batch")
+            .filter(pk=entry_id)
+            .first()
+        )
+        if entry is None:
+            raise ScheduleEditError("スケジュールが見つかりません。")
+        if _rotation_applied(entry):
+            raise ScheduleEditError(
+                f"{entry.date} の月は送信済みのため未送信に戻せません。月の送信を取り消してください。"
+            )
+        _require_calendar(calendar, entry)
+
+        event_id, was_sent = entry.google_event_id, entry.is_sent
+        entry.google_event_id = None
+        entry.is_sent = False
+        entry.save(update_fields=["google_event_id", "is_sent"])
+
+    if event_id:
+        try:
+            # Already deleted on the Google side is fine
+            calendar.delete_event(event_id)
+        except Exception:
+            _restore(entry, google_event_id=event_id, is_sent=was_sent)
+            raise
+    return entry
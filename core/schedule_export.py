@@ -0,0 +1,170 @@
+"""
+Streaming export of schedule entries as CSV or iCalendar (RFC 5545).
+
+Rows are read with values_list(...).iterator(chunk_size=...) joined to the
+assigned employee, and written out as they arrive, so memory stays flat no
+matter how long the date range is.
+"""
+import csv
+from datetime import datetime, timedelta, timezone
+
+from .models import ScheduleEntry, SpeechType
+from .roster import EchoBuffer
+
+EXPORT_CHUNK_SIZE = 2000
+
+SCHEDULE_FIELDS = [
+    "date",
+    "speech_type",
+    "is_cancelled",
+    "is_sent",
+    "assigned_employee__employee_id",
+    "assigned_employee__name",
+    "assigned_employee__email",
+]
+
+CSV_HEADER = ["date", "speech_type", "is_cancelled", "is_sent", "employee_id", "name", "email"]
+
+SPEECH_TYPE_LABELS = dict(SpeechType.choices)
+
+ICS_PRODID = "-//jidouka//schedule//JA"
+ICS_UID_DOMAIN = "jidouka"
+
+
+def iter_schedule_values(start=None, end=None, queryset=None):
+    """
+    Yield value tuples (in SCHEDULE_FIELDS order) for entries between
+    `start` and `end` (inclusive, either may be None), ordered by date.
+    """
+    if queryset is None:
+        queryset = ScheduleEntry.objects.all()
+    if start is not None:
+        queryset = queryset.filter(date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(date__lte=end)
+    return (
+        queryset.order_by("date")
+        .values_list(*SCHEDULE_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+# =====================================================
+# CSV
+# =====================================================
+
+def iter_schedule_csv(start, end):
+    """
+    Yield the schedule between `start` and `end` as CSV lines (header first).
+    """
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(CSV_HEADER)
+    for entry_date, speech_type, is_cancelled, is_sent, employee_id, name, email in iter_schedule_values(start, end):
+        yield writer.writerow([
+            entry_date.isoformat(), speech_type, is_cancelled, is_sent,
+            employee_id or "", name or "", email or "",
+        ])
+
+
+# =====================================================
+# iCalendar
+# =====================================================
+
+def _escape_text(value):
+    """
+    Escape a TEXT property value (RFC 5545 section 3.3.11).
+    """
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """
+    Fold a content line to at most 75 octets per physical line
+    (RFC 5545 section 3.1), never splitting a UTF-8 character.
+    """
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+
+    parts = []
+    current = ""
+    current_size = 0
+    limit = 75
+    for char in line:
+        size = len(char.encode("utf-8"))
+        if current_size + size > limit:
+            parts.append(current)
+            # Continuation lines start with a space, which counts toward the limit
+            current, current_size, limit = "", 0, 74
+        current += char
+        current_size += size
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _format_date(value):
+    return value.strftime("%Y%m%d")
+
+
+def iter_vevents(values, dtstamp):
+    """
+    Yield folded VEVENT lines for schedule value tuples. Unassigned days are
+    skipped; cancelled entries are kept with STATUS:CANCELLED so subscribed
+    calendars remove them.
+    """
+    for entry_date, speech_type, is_cancelled, _is_sent, _employee_id, name, email in values:
+        if not email:
+            continue
+        label = SPEECH_TYPE_LABELS.get(speech_type, speech_type)
+        lines = [
+            "BEGIN:VEVENT",
+            # Stable across exports and regenerations, unique per speech of the day
+            f"UID:schedule-{_format_date(entry_date)}-{speech_type.lower()}@{ICS_UID_DOMAIN}",
+            f"DTSTAMP:{dtstamp}",
+            f"DTSTART;VALUE=DATE:{_format_date(entry_date)}",
+            f"DTEND;VALUE=DATE:{_format_date(entry_date + timedelta(days=1))}",
+            f"SUMMARY:{_escape_text(f'{label} - {name}')}",
+            f"ATTENDEE;CN=\"{name.replace(chr(34), '')}\":mailto:{email}",
+            "TRANSP:TRANSPARENT",
+        ]
+        if is_cancelled:
+            lines.append("STATUS:CANCELLED")
+        lines.append("END:VEVENT")
+        yield "".join(_fold(line) for line in lines)
+
+
+def iter_ics(values, calendar_name):
+    """
+    Yield a complete VCALENDAR document for schedule value tuples.
+    """
+    dtstamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield "".join(_fold(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{ICS_PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape_text(calendar_name)}",
+        "X-WR-TIMEZONE:Asia/Tokyo",
+    ])
+    yield from iter_vevents(values, dtstamp)
+    yield "END:VCALENDAR\r\n"
+
+
+def iter_schedule_ics(start, end):
+    """
+    Yield the schedule between `start` and `end` as an iCalendar document.
+    """
+    return iter_ics(iter_schedule_values(start, end), "朝礼スピーチ")
+
+
+def iter_schedule_export(fmt, start, end):
+    if fmt == "ics":
+        return iter_schedule_ics(start, end)
+    if fmt == "csv":
+        return iter_schedule_csv(start, end)
+    raise ValueError(f"Unsupported schedule export format: {fmt}")
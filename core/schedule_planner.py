@@ -0,0 +1,142 @@
+"""
+Generating a month's schedule, independent of any request.
+
+plan_month() decides who speaks on each business day (read-only: one roster
+query, one absence query and the history the strategy needs), and
+generate_month() writes the plan in bulk: one query for the existing rows of
+the month, then one bulk_update and one bulk_create. The generate view is a
+thin adapter over generate_month(); jobs and benchmarks can call it for any
+number of months without a request.
+"""
+from datetime import date
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import MonthlyEventBatch, ScheduleEntry, SpeechType
+from .roster import gyomu_rotation, load_roster
+from .scheduling import STRATEGIES, AbsenceIndex, get_business_days, plan_assignments, split_business_days
+
+ENTRY_FIELDS = ["speech_type", "assigned_employee", "is_cancelled", "is_sent", "google_event_id", "batch"]
+
+
+class ScheduleError(Exception):
+    """
+    A schedule operation that cannot be applied; the message is shown to the user.
+    """
+
+
+class PlannedDay(NamedTuple):
+    date: date
+    speech_type: str
+    employee_id: Optional[int]
+
+
+def get_or_create_batch(month_date):
+    """
+    Get or create a MonthlyEventBatch for the given month.
+    Ensures idempotency - no duplicate batches are created.
+
+    Args:
+        month_date: A date object (preferably YYYY-MM-01)
+
+    Returns:
+        MonthlyEventBatch instance
+    """
+    month_start = date(month_date.year, month_date.month, 1)
+    batch, created = MonthlyEventBatch.objects.get_or_create(month=month_start)
+    return batch
+
+
+def plan_month(year, month, strategy):
+    """
+    Plan every business day of a month without writing anything:
+    - First 6 business days: no assignment
+    - Middle business days: assigned using order (３分間スピーチ)
+    - Last 5 business days: assigned using order_gyomu (業務スピーチ)
+
+    Returns:
+        List of PlannedDay in date order
+
+    Raises:
+        ScheduleError: unknown strategy or no business days
+    """
+    if strategy not in STRATEGIES:
+        raise ScheduleError(f"Unknown schedule strategy: {strategy}")
+
+    business_days = get_business_days(year, month)
+    if not business_days:
+        raise ScheduleError(f"No business days in {year}-{month:02d}.")
+
+    first_six, middle_days, last_five = split_business_days(business_days)
+    month_start = date(year, month, 1)
+
+    # One snapshot query for both rotations, one range query for absences
+    three_min_employees = load_roster(is_rotation_active=True)
+    gyomu_employees = gyomu_rotation(three_min_employees)
+    absences = AbsenceIndex.load(business_days[0], business_days[-1])
+
+    plan = [PlannedDay(day, SpeechType.THREE_MIN, None) for day in first_six]
+    for days, employees, speech_type in (
+        (middle_days, three_min_employees, SpeechType.THREE_MIN),
+        (last_five, gyomu_employees, SpeechType.BUSINESS),
+    ):
+        if not employees:
+            continue
+        assignments = plan_assignments(strategy, days, employees, speech_type, month_start, absences)
+        plan.extend(
+            PlannedDay(day, speech_type, employee.id if employee else None)
+            for day, employee in zip(days, assignments)
+        )
+    return plan
+
+
+def generate_month(year, month, strategy=None):
+    """
+    Generate (or regenerate) the schedule entries of a month.
+    A month whose batch was already sent cannot be regenerated.
+
+    Args:
+        strategy: Strategy name (default: settings.SCHEDULE_STRATEGY)
+
+    Returns:
+        Number of entries written
+
+    Raises:
+        ScheduleError: the batch is sent, or plan_month() failed
+    """
+    strategy = strategy or settings.SCHEDULE_STRATEGY
+
+    with transaction.atomic():
+        batch = get_or_create_batch(date(year, month, 1))
+        if batch.is_sent:
+            raise ScheduleError("この月は既に送信済みのため、スケジュールの作成はできません。")
+
+        plan = plan_month(year, month, strategy)
+        existing = ScheduleEntry.objects.in_bulk([day.date for day in plan], field_name="date")
+
+        to_update = []
+        to_create = []
+        for day in plan:
+            values = {
+                "speech_type": day.speech_type,
+                "assigned_employee_id": day.employee_id,
+                "is_cancelled": False,
+                "is_sent": False,
+                "google_event_id": None,
+                "batch": batch,
+            }
+            entry = existing.get(day.date)
+            if entry is None:
+                to_create.append(ScheduleEntry(date=day.date, **values))
+                continue
+            for field, value in values.items():
+                setattr(entry, field, value)
+            to_update.append(entry)
+
+        if to_update:
+            ScheduleEntry.objects.bulk_update(to_update, ENTRY_FIELDS)
+        if to_create:
+            ScheduleEntry.objects.bulk_create(to_create)
+    return len(plan)
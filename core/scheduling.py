@@ -0,0 +1,296 @@
+"""
+Schedule planning: business-day calendar, rotation, and the assignment
+strategies used to fill speech days with employees.
+
+These functions do not write to the database, so they can be shared by
+generate_schedule and the in-memory what-if simulation (core/simulation.py).
+
+A strategy is a function `(days, employees, history, absences) -> [employee, ...]`
+returning one assignee (or None) per day. `employees` is the active roster in
+rotation order, `history` maps employee pk -> SpeechHistory (it is only loaded
+for strategies that need it, see STRATEGIES) and `absences` is an optional
+AbsenceIndex; absent employees are skipped for the days they are out.
+
+- round_robin: walk the roster from the top every month (original behaviour).
+- fair: always pick the employee with the lowest fairness score, using a heap,
+  so uneven day counts do not keep favouring the top of the order.
+"""
+import heapq
+from bisect import bisect_right
+from calendar import monthrange
+from collections import defaultdict, namedtuple
+from datetime import date
+
+from django.db.models import Count, Max, Q
+
+from .models import Absence, Role, ScheduleEntry, SpeechType
+
+# =====================================================
+# Calendar helpers
+# =====================================================
+
+def get_business_days(year, month):
+    """
+    Returns a list of all business days (Monday-Friday) in the given month.
+    """
+    first_day, num_days = monthrange(year, month)
+    business_days = []
+    
+    for day in range(1, num_days + 1):
+        current_date = date(year, month, day)
+        # 0=Monday, 6=Sunday
+        if current_date.weekday() < 5:  # Monday to Friday
+            business_days.append(current_date)
+    
+    return business_days
+
+
+def split_business_days(business_days):
+    """
+    Split a month's business days into (first_six, middle_days, last_five):
+    - First 6 business days: no assignment
+    - Middle business days: ３分間スピーチ
+    - Last 5 business days: 業務スピーチ
+    """
+    first_six = business_days[:6]
+    last_five = business_days[-5:] if len(business_days) >= 5 else []
+    middle_days = business_days[6:-5] if len(business_days) > 11 else []
+    return first_six, middle_days, last_five
+
+
+# =====================================================
+# Rotation
+# =====================================================
+
+def can_take(employee, speech_type):
+    """
+    Whether `employee` may be given a speech of `speech_type`, by the rules
+    plan_month applies: only the active rotation speaks, and 業務 speeches
+    go to members only. Absences are checked separately (AbsenceIndex).
+    """
+    if not employee.is_rotation_active:
+        return False
+    return speech_type != SpeechType.BUSINESS or employee.role == Role.MEMBER
+
+
+def apply_rotation(current_order, assigned_members, did_speak_map):
+    """
+    Apply rotation logic based on speech history.
+    
+    Groups members into three categories and merges them in order:
+    1. Missed speakers (assigned but did_speak=False) - HIGHEST priority
+    2. Unassigned members - MIDDLE priority (preserve original order)
+    3. Spoke members (assigned and did_speak=True) - LOWEST priority
+    
+    Args:
+        current_order: List of Employee objects in current order (e.g., by .order field)
+        assigned_members: List of Employee objects assigned this month
+        did_speak_map: Dict {employee_id: bool} indicating if each assigned member spoke
+    
+    Returns:
+        List of Employee objects in new rotation order
+    """
+    # Identify the three groups
+    assigned_set = set(emp.id for emp in assigned_members)
+    missed_speakers = []
+    spoke_members = []
+    unassigned_members = []
+    
+    for emp in current_order:
+        if emp.id in assigned_set:
+            # This employee was assigned
+            if did_speak_map.get(emp.id, True):
+                # Checkbox was checked (True) or not present -> they spoke
+                spoke_members.append(emp)
+            else:
+                # Checkbox was unchecked (False) -> they didn't speak
+                missed_speakers.append(emp)
+        else:
+            # This employee was NOT assigned
+            unassigned_members.append(emp)
+    
+    # Merge in the required order
+    new_rotation = missed_speakers + unassigned_members + spoke_members
+    
+    return new_rotation
+
+
+# =====================================================
+# Assignment strategies
+# =====================================================
+
+# spoken: delivered speeches, missed: cancelled speeches (debt owed to them),
+# last_date: date of the last delivered speech or None
+SpeechHistory = namedtuple("SpeechHistory", ["spoken", "missed", "last_date"])
+
+NO_HISTORY = SpeechHistory(0, 0, None)
+
+
+def load_speech_history(speech_type, before):
+    """
+    Per-employee speech history for one speech type, for entries before
+    `before`. One aggregate query.
+
+    Returns:
+        Dict {employee_pk: SpeechHistory}
+    """
+    rows = (
+        ScheduleEntry.objects
+        .filter(speech_type=speech_type, date__lt=before, assigned_employee__isnull=False)
+        .order_by()
+        .values("assigned_employee_id")
+        .annotate(
+            spoken=Count("id", filter=Q(is_cancelled=False)),
+            missed=Count("id", filter=Q(is_cancelled=True)),
+            last_date=Max("date", filter=Q(is_cancelled=False)),
+        )
+    )
+    return {
+        row["assigned_employee_id"]: SpeechHistory(row["spoken"], row["missed"], row["last_date"])
+        for row in rows
+    }
+
+
+class AbsenceIndex:
+    """
+    In-memory interval index of absences: per employee, a sorted list of
+    merged (start, end) date ranges. Availability checks are a bisect,
+    so filling a month costs no queries beyond the single load().
+    """
+
+    def __init__(self, intervals=()):
+        by_employee = defaultdict(list)
+        for employee_id, start, end in intervals:
+            by_employee[employee_id].append((start, end))
+
+        self._starts = {}
+        self._ends = {}
+        for employee_id, ranges in by_employee.items():
+            merged = []
+            for start, end in sorted(ranges):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            self._starts[employee_id] = [start for start, _ in merged]
+            self._ends[employee_id] = [end for _, end in merged]
+
+    @classmethod
+    def load(cls, start, end):
+        """
+        Load every absence overlapping [start, end] with one range query.
+        """
+        return cls(
+            Absence.objects
+            .filter(start_date__lte=end, end_date__gte=start)
+            .values_list("employee_id", "start_date", "end_date")
+        )
+
+    def is_available(self, employee_id, day):
+        starts = self._starts.get(employee_id)
+        if not starts:
+            return True
+        idx = bisect_right(starts, day) - 1
+        return idx < 0 or self._ends[employee_id][idx] < day
+
+
+def _is_available(absences, emp, day):
+    return absences is None or absences.is_available(emp.id, day)
+
+
+def round_robin(days, employees, history=None, absences=None):
+    """
+    Assign employees in rotation order, restarting from the top.
+    An absent employee is skipped and the rotation continues after the
+    employee who took the day.
+    """
+    if not employees:
+        return [None] * len(days)
+
+    assignments = []
+    pointer = 0
+    for day in days:
+        chosen = None
+        for offset in range(len(employees)):
+            idx = (pointer + offset) % len(employees)
+            if _is_available(absences, employees[idx], day):
+                chosen = idx
+                break
+        if chosen is None:
+            assignments.append(None)
+            pointer += 1
+            continue
+        assignments.append(employees[chosen])
+        pointer = chosen + 1
+    return assignments
+
+
+def fairness_score(record):
+    """
+    Lower is more deserving: fewest speeches net of missed-speech debt first,
+    then the longest time since the last speech (never spoken comes first).
+    """
+    return (record.spoken - record.missed, record.last_date or date.min)
+
+
+def fair_share(days, employees, history=None, absences=None):
+    """
+    Assign each day to the employee with the lowest fairness score.
+
+    The roster is kept in a heap keyed by (score, rotation position), so
+    each day costs O(log N) and a month costs O(days log N). Ties fall
+    back to the rotation order chosen on the dashboard. Absent employees
+    are set aside for that day and keep their priority for the next one.
+    """
+    if not employees:
+        return [None] * len(days)
+
+    history = history or {}
+    heap = []
+    for position, emp in enumerate(employees):
+        record = history.get(emp.id, NO_HISTORY)
+        heap.append((fairness_score(record), position, record, emp))
+    heapq.heapify(heap)
+
+    assignments = []
+    for day in days:
+        skipped = []
+        while heap and not _is_available(absences, heap[0][3], day):
+            skipped.append(heapq.heappop(heap))
+
+        if heap:
+            _score, position, record, emp = heapq.heappop(heap)
+            assignments.append(emp)
+            record = SpeechHistory(record.spoken + 1, record.missed, day)
+            heapq.heappush(heap, (fairness_score(record), position, record, emp))
+        else:
+            assignments.append(None)
+
+        for item in skipped:
+            heapq.heappush(heap, item)
+    return assignments
+
+
+# name -> (strategy function, needs speech history)
+STRATEGIES = {
+    "round_robin": (round_robin, False),
+    "fair": (fair_share, True),
+}
+
+
+def plan_assignments(strategy, days, employees, speech_type, before, absences=None):
+    """
+    Assign `days` to `employees` with the named strategy, loading the speech
+    history (entries before `before`) only when the strategy uses it.
+    `absences` is an AbsenceIndex covering `days` (see AbsenceIndex.load).
+
+    Raises:
+        ValueError: unknown strategy name
+    """
+    try:
+        func, needs_history = STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(f"Unknown schedule strategy: {strategy}")
+
+    history = load_speech_history(speech_type, before) if needs_history and days else None
+    return func(days, employees, history, absences)
@@ -0,0 +1,60 @@
+"""
+Signal wiring used to invalidate cached data when the schedule changes.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+
+from .cache import bump_dashboard_version, bump_employee_feed_versions, bump_feed_epoch
+
+# Sent by ChangeTrackingQuerySet after update() / bulk_create() / bulk_update(),
+# which do not emit post_save or post_delete.
+bulk_change = Signal()
+
+
+def invalidate_dashboard(sender, **kwargs):
+    bump_dashboard_version()
+
+
+def invalidate_entry_feeds(sender, instance, **kwargs):
+    """
+    A schedule entry changed: invalidate the feeds of its current and
+    previously loaded assignee.
+    """
+    employee_ids = {
+        instance.assigned_employee_id,
+        getattr(instance, "_loaded_assigned_employee_id", None),
+    }
+    bump_employee_feed_versions(employee_ids - {None})
+    instance._loaded_assigned_employee_id = instance.assigned_employee_id
+
+
+def invalidate_employee_feeds(sender, instance, **kwargs):
+    # Name / email appear in the feed
+    bump_employee_feed_versions([instance.pk])
+
+
+def invalidate_all_feeds(sender, **kwargs):
+    bump_feed_epoch()
+
+
+def connect_signals():
+    """
+    Connect cache invalidation to every model shown on the dashboard
+    and in the feeds. Called from CoreConfig.ready().
+    """
+    from .models import Absence, Employee, MonthlyEventBatch, ScheduleEntry
+
+    # Absence is not shown on the dashboard, but what-if simulations are
+    # memoized on the same version (core/simulation.py)
+    for model in (Employee, ScheduleEntry, MonthlyEventBatch, Absence):
+        uid = f"core.invalidate_dashboard.{model.__name__}"
+        post_save.connect(invalidate_dashboard, sender=model, dispatch_uid=uid)
+        post_delete.connect(invalidate_dashboard, sender=model, dispatch_uid=uid)
+        bulk_change.connect(invalidate_dashboard, sender=model, dispatch_uid=uid)
+
+    post_save.connect(invalidate_entry_feeds, sender=ScheduleEntry, dispatch_uid="core.invalidate_feeds.entry")
+    post_delete.connect(invalidate_entry_feeds, sender=ScheduleEntry, dispatch_uid="core.invalidate_feeds.entry")
+    post_save.connect(invalidate_employee_feeds, sender=Employee, dispatch_uid="core.invalidate_feeds.employee")
+    post_delete.connect(invalidate_employee_feeds, sender=Employee, dispatch_uid="core.invalidate_feeds.employee")
+    for model in (Employee, ScheduleEntry):
+        bulk_change.connect(invalidate_all_feeds, sender=model, dispatch_uid=f"core.invalidate_feeds.bulk.{model.__name__}")
@@ -0,0 +1,224 @@
+"""
+What-if schedule simulation, run entirely in memory.
+
+Given a hypothetical 3分間 / 業務 ordering, an active set and a number of
+months, this projects the assignments month by month exactly like
+generate_schedule + the rotation applied after sending would, and reports
+fairness statistics. Nothing is written to the database: the roster, the
+speech history and absences are read once, then every month is planned with
+the shared helpers in core/scheduling.py.
+
+Results are memoized in the cache on a hash of the normalized inputs plus the
+data version, so repeating a what-if query is a single cache hit.
+"""
+import hashlib
+import json
+import statistics
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import get_dashboard_version
+from .models import Role, SpeechType
+from .roster import load_roster
+from .scheduling import (
+    STRATEGIES, AbsenceIndex, SpeechHistory, NO_HISTORY, apply_rotation, get_business_days,
+    load_speech_history, split_business_days,
+)
+
+
+def _add_months(month_start, count):
+    index = month_start.year * 12 + month_start.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def normalize_simulation_input(data, today=None):
+    """
+    Validate and normalize a what-if request.
+
+    Accepted keys (all optional except as noted):
+    - start: "YYYY-MM" first simulated month (default: next month)
+    - months: number of months to simulate (default 3)
+    - order: employee pks in 3分間 rotation order (default: current order)
+    - order_gyomu: employee pks in 業務 rotation order (default: current order)
+    - active: employee pks taking part in the rotation (default: current active set)
+    - strategy: assignment strategy name (default: settings.SCHEDULE_STRATEGY)
+
+    Raises:
+        ValueError: with a message describing the invalid input
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object.")
+
+    today = today or date.today()
+    if data.get("start"):
+        try:
+            year, month = (int(part) for part in str(data["start"]).split("-")[:2])
+            start = date(year, month, 1)
+        except (TypeError, ValueError):
+            raise ValueError("start must be in YYYY-MM format.")
+    else:
+        start = _add_months(date(today.year, today.month, 1), 1)
+
+    try:
+        months = int(data.get("months", 3))
+    except (TypeError, ValueError):
+        raise ValueError("months must be an integer.")
+    if not 1 <= months <= settings.SIMULATION_MAX_MONTHS:
+        raise ValueError(f"months must be between 1 and {settings.SIMULATION_MAX_MONTHS}.")
+
+    strategy = data.get("strategy") or settings.SCHEDULE_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown schedule strategy: {strategy}")
+
+    normalized = {"start": start.isoformat(), "months": months, "strategy": strategy}
+    for key in ("order", "order_gyomu", "active"):
+        value = data.get(key)
+        if value is None:
+            normalized[key] = None
+            continue
+        if not isinstance(value, list):
+            raise ValueError(f"{key} must be a list of employee ids.")
+        try:
+            normalized[key] = [int(pk) for pk in value]
+        except (TypeError, ValueError):
+            raise ValueError(f"{key} must be a list of employee ids.")
+    return normalized
+
+
+def _ordered(employees, order, field):
+    """
+    Employees in the hypothetical `order` (pks); employees missing from it
+    keep their current relative order after the listed ones.
+    """
+    by_id = {emp.id: emp for emp in employees}
+    current = sorted(employees, key=lambda emp: (getattr(emp, field), emp.id))
+    if order is None:
+        return current
+    listed = [by_id[pk] for pk in dict.fromkeys(order) if pk in by_id]
+    listed_ids = {emp.id for emp in listed}
+    return listed + [emp for emp in current if emp.id not in listed_ids]
+
+
+def _record_assignments(history, days, assignments):
+    for day, emp in zip(days, assignments):
+        if emp is not None:
+            record = history.get(emp.id, NO_HISTORY)
+            history[emp.id] = SpeechHistory(record.spoken + 1, record.missed, day)
+
+
+def _fairness_stats(employees, counts, unassigned_days):
+    totals = [counts[emp.id]["three_min"] + counts[emp.id]["business"] for emp in employees]
+    return {
+        "per_employee": [
+            {
+                "id": emp.id,
+                "name": emp.name,
+                "three_min": counts[emp.id]["three_min"],
+                "business": counts[emp.id]["business"],
+                "total": total,
+            }
+            for emp, total in zip(employees, totals)
+        ],
+        "min": min(totals, default=0),
+        "max": max(totals, default=0),
+        "mean": round(statistics.fmean(totals), 3) if totals else 0,
+        "stdev": round(statistics.pstdev(totals), 3) if totals else 0,
+        "unassigned_days": unassigned_days,
+    }
+
+
+def run_simulation(params):
+    """
+    Project `params["months"]` months of assignments for normalized input
+    (see normalize_simulation_input). Read-only.
+
+    Returns:
+        Dict {"input": params, "months": [...], "stats": {...}}
+    """
+    start = date.fromisoformat(params["start"])
+    end_month = _add_months(start, params["months"] - 1)
+    func, needs_history = STRATEGIES[params["strategy"]]
+
+    employees = load_roster()
+    if params["active"] is None:
+        active_ids = {emp.id for emp in employees if emp.is_rotation_active}
+    else:
+        active_ids = set(params["active"])
+
+    active = [emp for emp in employees if emp.id in active_ids]
+    three_min = _ordered(active, params["order"], "order")
+    gyomu = _ordered([emp for emp in active if emp.role == Role.MEMBER], params["order_gyomu"], "order_gyomu")
+
+    history = {SpeechType.THREE_MIN: {}, SpeechType.BUSINESS: {}}
+    if needs_history:
+        for speech_type in history:
+            history[speech_type] = load_speech_history(speech_type, start)
+
+    last_day = get_business_days(end_month.year, end_month.month)[-1]
+    absences = AbsenceIndex.load(start, last_day)
+
+    counts = {emp.id: {"three_min": 0, "business": 0} for emp in active}
+    unassigned_days = 0
+    projected = []
+
+    for offset in range(params["months"]):
+        month_start = _add_months(start, offset)
+        _first_six, middle_days, last_five = split_business_days(
+            get_business_days(month_start.year, month_start.month)
+        )
+
+        plans = [
+            (SpeechType.THREE_MIN, "three_min", middle_days, three_min),
+            (SpeechType.BUSINESS, "business", last_five, gyomu),
+        ]
+        entries = []
+        assigned_members = {}
+        for speech_type, counter, days, roster in plans:
+            assignments = func(days, roster, history[speech_type] if needs_history else None, absences)
+            _record_assignments(history[speech_type], days, assignments)
+            for day, emp in zip(days, assignments):
+                if emp is None:
+                    unassigned_days += 1
+                else:
+                    counts[emp.id][counter] += 1
+                    assigned_members[emp.id] = emp
+                entries.append({
+                    "date": day.isoformat(),
+                    "speech_type": speech_type,
+                    "employee_id": emp.id if emp else None,
+                    "name": emp.name if emp else None,
+                })
+
+        entries.sort(key=lambda entry: entry["date"])
+        projected.append({"month": month_start.strftime("%Y-%m"), "entries": entries})
+
+        # Rotate as if every assigned member gave their speech
+        assigned = list(assigned_members.values())
+        three_min = apply_rotation(three_min, assigned, {})
+        gyomu = apply_rotation(gyomu, assigned, {})
+
+    return {
+        "input": params,
+        "months": projected,
+        "stats": _fairness_stats(active, counts, unassigned_days),
+    }
+
+
+def simulate(data):
+    """
+    Normalize `data`, then return the (memoized) simulation result.
+
+    Raises:
+        ValueError: invalid input
+    """
+    params = normalize_simulation_input(data)
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+    key = f"core:simulation:{get_dashboard_version()}:{digest}"
+
+    result = cache.get(key)
+    if result is None:
+        result = run_simulation(params)
+        cache.set(key, result, settings.SIMULATION_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,156 @@
+async function moveEmployee(e, employeeId, direction, zone) {
+  e.preventDefault();
+  e.stopPropagation();
+  
+  let endpoint;
+  if (zone === 'gyomu') {
+    endpoint = direction === 'up'
+      ? `/employee/${employeeId}/up-gyomu/`
+      : `/employee/${employeeId}/down-gyomu/`;
+  } else {
+    endpoint = direction === 'up'
+      ? `/employee/${employeeId}/up/`
+      : `/employee/${employeeId}/down/`;
+  }
+
+  try {
+    const res = await fetch(endpoint, { method: 'GET', headers: { 'X-Requested-With': 'XMLHttpRequest' } });
+    if (!res.ok) return;
+    const data = await res.json();
+    patchZones(data.zones);
+  } catch (err) { console.error(err); }
+}
+
+// Row fragments are cached server-side, so their forms carry no CSRF
+// token: it is taken from the csrftoken cookie instead.
+async function toggleActive(e, form) {
+  try {
+    const res = await fetch(form.action, {
+      method: 'POST',
+      headers: { 'X-Requested-With': 'XMLHttpRequest', 'X-CSRFToken': getCookie('csrftoken') },
+      body: new FormData(form)
+    });
+    if (!res.ok) { submitWithCsrf(form); return; }
+    const data = await res.json();
+    patchZones(data.zones);
+  } catch (err) {
+    // fallback: regular form post + redirect
+    submitWithCsrf(form);
+  }
+}
+
+function submitWithCsrf(form) {
+  const input = document.createElement('input');
+  input.type = 'hidden';
+  input.name = 'csrfmiddlewaretoken';
+  input.value = getCookie('csrftoken');
+  form.appendChild(input);
+  form.submit();
+}
+
+// Replace only the rows returned by the server.
+// `zones` maps a zone name ('gyomu' / '3min') to its affected rows,
+// listed in their new display order: [{id, html}, ...]
+function patchZones(zones) {
+  Object.entries(zones || {}).forEach(([zone, rows]) => {
+    const olds = rows
+      .map(r => document.getElementById(`row-${zone}-${r.id}`))
+      .filter(Boolean);
+    if (!olds.length) return;
+    // Anchor on whichever of the old rows comes first in the document
+    const anchor = olds.reduce((a, b) =>
+      (a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_PRECEDING) ? b : a);
+    const tpl = document.createElement('template');
+    tpl.innerHTML = rows.map(r => r.html).join('');
+    anchor.before(tpl.content);
+    olds.forEach(el => el.remove());
+  });
+}
+
+// Helper to get CSRF token from cookies
+function getCookie(name) {
+  let cookieValue = null;
+  if (document.cookie && document.cookie !== '') {
+    const cookies = document.cookie.split(';');
+    for (let i = 0; i < cookies.length; i++) {
+      const cookie = cookies[i].trim();
+      if (cookie.substring(0, name.length + 1) === (name + '=')) {
+        cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+        break;
+      }
+    }
+  }
+  return cookieValue;
+}
+
+document.addEventListener('click', async function (e) {
+  // Open modal when clicking remove-member button
+  const target = e.target.closest('#remove-member-btn');
+  if (!target) return;
+  e.preventDefault();
+
+  try {
+    const res = await fetch(target.href, { headers: { 'X-Requested-With': 'XMLHttpRequest' } });
+    if (!res.ok) {
+      // fallback: navigate to href
+      window.location.href = target.href;
+      return;
+    }
+    const html = await res.text();
+    const container = document.getElementById('modal-root');
+    container.innerHTML = html;
+
+    // show modal (already visible by fragment markup). Setup handlers
+    const form = container.querySelector('#remove-member-form');
+    const cancelBtn = container.querySelector('#remove-member-cancel');
+    const errorP = container.querySelector('#remove-member-error');
+    const submitBtn = container.querySelector('#remove-member-submit');
+
+    if (cancelBtn) cancelBtn.addEventListener('click', () => { container.innerHTML = ''; });
+
+    if (form) {
+      form.addEventListener('submit', async function (ev) {
+        ev.preventDefault();
+        if (submitBtn) { submitBtn.disabled = true; }
+        if (errorP) { errorP.classList.add('hidden'); errorP.textContent = ''; }
+
+        const formData = new FormData(form);
+        try {
+          const resp = await fetch(form.action, {
+            method: 'POST',
+            headers: {
+              'X-Requested-With': 'XMLHttpRequest',
+              'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: formData
+          });
+
+          const data = await resp.json();
+          if (resp.ok && data.status === 'success') {
+            // show quick toast then reload
+            container.innerHTML = '';
+            // small toast
+            const t = document.createElement('div');
+            t.className = 'fixed bottom-6 right-6 bg-green-600 text-white px-4 py-2 rounded';
+            t.textContent = data.message || 'メンバーを削除しました。';
+            document.body.appendChild(t);
+            setTimeout(() => { t.remove(); location.reload(); }, 900);
+            return;
+          }
+
+          // error
+          const msg = data && data.message ? data.message : 'メンバー削除中にエラーが発生しました。';
+          if (errorP) { errorP.textContent = msg; errorP.classList.remove('hidden'); }
+        } catch (err) {
+          if (errorP) { errorP.textContent = 'メンバー削除中にエラーが発生しました。'; errorP.classList.remove('hidden'); }
+        } finally {
+          if (submitBtn) submitBtn.disabled = false;
+        }
+      });
+    }
+
+  } catch (err) {
+    // fallback navigation
+    window.location.href = target.href;
+  }
+});
@@ -1,3 +1,1395 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models.functions import Lower
+from django.templatetags.static import static
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .allocator import (
+    EMPLOYEE_ID_COUNTER, ORDER_COUNTER, allocate, allocate_employee_ids, sync_order_counters,
+)
+from .cache import get_dashboard_context, get_employee_versions
+from .calendar_sync import (
+    _run_pending_syncs, apply_changes, diff_calendar, repair_calendar, request_sync, retract_batch, send_batch,
+)
+from .feeds import employee_feed_token
+from .google_calendar import ID_FIELDS, CalendarGateway, EventInfo, load_credentials_data
+from .log import JsonFormatter, QueueStreamHandler
+from .models import (
+    Absence, CalendarSyncState, Counter, Employee, GoogleCredential, MonthlyEventBatch, ProfileReport,
+    RateLimitBucket, Role, ScheduleEntry, SpeechType,
+)
+from .ratelimit import TokenBucket
+from .roster import gyomu_rotation, import_roster, load_roster, load_speech_dates
+from .rotation import advance_rotation, remove_employee
+from .schedule_edits import ScheduleEditError, cancel_entry, reassign_entry, swap_entries, unsend_entry
+from .schedule_export import CSV_HEADER, _fold, iter_schedule_csv, iter_schedule_ics, iter_vevents
+from .schedule_planner import generate_month
+from .scheduling import STRATEGIES, AbsenceIndex, SpeechHistory, fair_share, round_robin
+from .simulation import normalize_simulation_input, run_simulation
+from .views import GOOGLE_SESSION_FLAG, _render_zone_rows
+
+
+def _employees(count):
+    return [Employee(id=number, name=f"E{number}") for number in range(1, count + 1)]
+
+
+def _days(count, start=date(2030, 1, 7)):
+    return [start + timedelta(days=offset) for offset in range(count)]
+
+
+class AllocatorTests(TestCase):
+    def test_allocations_are_consecutive_and_disjoint(self):
+        first = allocate(ORDER_COUNTER, 3)
+        second = allocate(ORDER_COUNTER, 2)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(second.start, first.stop)
+        self.assertEqual(list(second), [first.stop, first.stop + 1])
+        self.assertEqual(allocate(ORDER_COUNTER, 0), range(0))
+
+    def test_missing_counter_is_seeded_from_the_highest_order(self):
+        Counter.objects.filter(name=ORDER_COUNTER).delete()
+        Employee.objects.create(name="Last", email="last@example.com", employee_id="T900", order=900)
+        highest = Employee.objects.aggregate(value=Max("order"))["value"]
+
+        self.assertEqual(list(allocate(ORDER_COUNTER, 2)), [highest + 1, highest + 2])
+        self.assertEqual(Counter.objects.get(name=ORDER_COUNTER).value, highest + 2)
+
+    def test_missing_employee_id_counter_skips_foreign_ids(self):
+        Counter.objects.filter(name=EMPLOYEE_ID_COUNTER).delete()
+        Employee.objects.all().delete()
+        Employee.objects.create(name="A", email="a@example.com", employee_id="EMP041")
+        Employee.objects.create(name="B", email="b@example.com", employee_id="X999")
+
+        self.assertEqual(allocate_employee_ids(2), ["EMP042", "EMP043"])
+
+    def test_sync_order_counters_returns_to_the_current_maximum(self):
+        allocate(ORDER_COUNTER, 50)
+        sync_order_counters()
+        highest = Employee.objects.aggregate(value=Max("order"))["value"] or 0
+        self.assertEqual(Counter.objects.get(name=ORDER_COUNTER).value, highest)
+
+    def test_sync_order_counters_breaks_ties_in_id_order(self):
+        Employee.objects.all().delete()
+        first = Employee.objects.create(name="A", email="a@example.com", employee_id="T011", order=1)
+        tied = [
+            Employee.objects.create(name=name, email=f"{name}@example.com", employee_id=f"T01{n}", order=2)
+            for n, name in enumerate("bcd", start=2)
+        ]
+        last = Employee.objects.create(name="E", email="e@example.com", employee_id="T015", order=3)
+
+        sync_order_counters()
+        orders = dict(Employee.objects.values_list("id", "order"))
+        self.assertEqual(
+            [orders[employee.pk] for employee in [first, *tied, last]],
+            [1, 2, 3, 4, 5],
+        )
+        self.assertEqual(Counter.objects.get(name=ORDER_COUNTER).value, 5)
+
+class IcsFoldingTests(SimpleTestCase):
+    def assertFolded(self, line):
+        folded = _fold(line)
+        self.assertTrue(folded.endswith("\r\n"))
+        physical = folded[:-2].split("\r\n")
+        for number, part in enumerate(physical):
+            self.assertLessEqual(len(part.encode("utf-8")), 75)
+            if number:
+                self.assertTrue(part.startswith(" "))
+        # Unfolding (dropping CRLF + space) gives the line back
+        self.assertEqual(folded[:-2].replace("\r\n ", ""), line)
+        return physical
+
+    def test_short_line_is_unchanged(self):
+        self.assertEqual(_fold("SUMMARY:３分間"), "SUMMARY:３分間\r\n")
+
+    def test_exactly_75_octets_is_not_folded(self):
+        self.assertEqual(len(self.assertFolded("X" * 75)), 1)
+
+    def test_long_ascii_line(self):
+        self.assertEqual(len(self.assertFolded("DESCRIPTION:" + "a" * 200)), 3)
+
+    def test_multibyte_characters_are_not_split(self):
+        # 3 octets per character: a split inside one would not decode
+        physical = self.assertFolded("SUMMARY:" + "朝礼スピーチ" * 20)
+        for part in physical:
+            part.encode("utf-8").decode("utf-8")
+        self.assertGreater(len(physical), 1)
+
+
+class ScheduleExportTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(name="Export", email="export@example.com", employee_id="T200")
+        ScheduleEntry.objects.create(
+            date=date(2030, 6, 3), speech_type=SpeechType.THREE_MIN, assigned_employee=self.employee,
+        )
+        ScheduleEntry.objects.create(
+            date=date(2030, 6, 4), speech_type=SpeechType.BUSINESS, assigned_employee=self.employee,
+            is_cancelled=True,
+        )
+        # Unassigned days are exported as CSV rows but have no event
+        ScheduleEntry.objects.create(date=date(2030, 6, 5), speech_type=SpeechType.THREE_MIN)
+        ScheduleEntry.objects.create(
+            date=date(2030, 7, 1), speech_type=SpeechType.THREE_MIN, assigned_employee=self.employee,
+        )
+
+    def test_csv_header_and_rows_in_range(self):
+        rows = list(csv.reader("".join(iter_schedule_csv(date(2030, 6, 1), date(2030, 6, 30))).splitlines()))
+        self.assertEqual(rows[0], CSV_HEADER)
+        self.assertEqual(rows[1:], [
+            ["2030-06-03", "THREE_MIN", "False", "False", "T200", "Export", "export@example.com"],
+            ["2030-06-04", "BUSINESS", "True", "False", "T200", "Export", "export@example.com"],
+            ["2030-06-05", "THREE_MIN", "False", "False", "", "", ""],
+        ])
+
+    def test_ics_has_one_event_per_assigned_entry_with_stable_uids(self):
+        document = "".join(iter_schedule_ics(date(2030, 6, 1), date(2030, 6, 30)))
+        self.assertTrue(document.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertTrue(document.endswith("END:VCALENDAR\r\n"))
+        self.assertEqual(document.count("BEGIN:VEVENT"), 2)
+        self.assertEqual(document.count("STATUS:CANCELLED"), 1)
+
+        def uids(text):
+            return [line for line in text.split("\r\n") if line.startswith("UID:")]
+
+        # Re-exporting must not make subscribed calendars see new events
+        again = "".join(iter_schedule_ics(date(2030, 6, 1), date(2030, 6, 30)))
+        self.assertEqual(uids(again), uids(document))
+        self.assertEqual(len(set(uids(document))), 2)
+
+    def test_uids_differ_per_speech_of_a_day(self):
+        day = date(2030, 6, 3)
+        values = [
+            (day, SpeechType.THREE_MIN, False, True, "T200", "Export", "export@example.com"),
+            (day, SpeechType.BUSINESS, False, True, "T201", "Other", "other@example.com"),
+        ]
+        uids = [line for line in "".join(iter_vevents(values, "20300101T000000Z")).split("\r\n")
+                if line.startswith("UID:")]
+        self.assertEqual(uids, ["UID:schedule-20300603-three_min@jidouka", "UID:schedule-20300603-business@jidouka"])
+
+class FeedConditionalRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = Employee.objects.create(name="Feed", email="feed@example.com", employee_id="T100")
+        self.entry = ScheduleEntry.objects.create(
+            date=date(2030, 5, 20), speech_type=SpeechType.THREE_MIN, assigned_employee=self.employee,
+        )
+        self.url = reverse("employee_feed", kwargs={"token": employee_feed_token(self.employee.pk)})
+
+    def test_unchanged_feed_is_answered_with_304_without_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"BEGIN:VCALENDAR", response.content)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_gives_a_new_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.entry.date = date(2030, 5, 21)
+        self.entry.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn(b"20300521", response.content)
+
+    def test_bad_token_is_404(self):
+        url = reverse("employee_feed", kwargs={"token": f"{self.employee.pk}:forged"})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class FairShareTests(SimpleTestCase):
+    def test_matches_round_robin_without_history_or_absences(self):
+        for employee_count in (1, 3, 7):
+            for day_count in (0, 1, 5, 20):
+                employees, days = _employees(employee_count), _days(day_count)
+                with self.subTest(employees=employee_count, days=day_count):
+                    self.assertEqual(fair_share(days, employees), round_robin(days, employees))
+
+    def test_fewest_speeches_first(self):
+        employees = _employees(3)
+        last = date(2029, 12, 1)
+        history = {
+            1: SpeechHistory(3, 0, last),
+            2: SpeechHistory(1, 0, last),
+            3: SpeechHistory(2, 0, last - timedelta(days=30)),
+        }
+        assigned = fair_share(_days(3), employees, history)
+        # 2 catches up with 3, who spoke longer ago and goes first on the tie
+        self.assertEqual([emp.id for emp in assigned], [2, 3, 2])
+
+    def test_missed_speeches_count_as_debt(self):
+        employees = _employees(2)
+        last = date(2029, 12, 1)
+        history = {1: SpeechHistory(2, 2, last), 2: SpeechHistory(1, 0, last)}
+        [assigned] = fair_share(_days(1), employees, history)
+        self.assertEqual(assigned.id, 1)
+
+    def test_absent_employee_keeps_priority(self):
+        employees = _employees(3)
+        days = _days(2)
+        absences = AbsenceIndex([(1, days[0], days[0])])
+        assigned = fair_share(days, employees, absences=absences)
+        self.assertEqual([emp.id for emp in assigned], [2, 1])
+
+    def test_day_without_available_employee(self):
+        employees = _employees(2)
+        days = _days(2)
+        absences = AbsenceIndex([(1, days[0], days[0]), (2, days[0], days[0])])
+        self.assertEqual(fair_share(days, employees, absences=absences), [None, employees[0]])
+
+    def test_empty_roster(self):
+        self.assertEqual(fair_share(_days(2), []), [None, None])
+
+
+class AbsenceIndexTests(SimpleTestCase):
+    def test_overlapping_and_nested_intervals_are_merged(self):
+        d = _days(15, start=date(2030, 3, 1))
+        index = AbsenceIndex([
+            (1, d[1], d[5]),
+            (1, d[3], d[8]),
+            # Nested in the first: must not shorten the merged interval
+            (1, d[2], d[4]),
+            (1, d[11], d[12]),
+        ])
+        self.assertEqual(index._starts[1], [d[1], d[11]])
+        self.assertEqual(index._ends[1], [d[8], d[12]])
+
+        unavailable = {d[day] for day in (1, 2, 3, 4, 5, 6, 7, 8, 11, 12)}
+        for day in d:
+            with self.subTest(day=day):
+                self.assertEqual(index.is_available(1, day), day not in unavailable)
+
+    def test_other_employees_are_available(self):
+        day = date(2030, 3, 4)
+        index = AbsenceIndex([(1, day, day)])
+        self.assertFalse(index.is_available(1, day))
+        self.assertTrue(index.is_available(2, day))
+        self.assertTrue(AbsenceIndex().is_available(1, day))
+
+
+class AbsenceIndexLoadTests(TestCase):
+    def test_load_only_overlapping_absences(self):
+        employee = Employee.objects.create(name="Absent", email="absent@example.com", employee_id="T001")
+        Absence.objects.create(employee=employee, start_date=date(2030, 2, 20), end_date=date(2030, 3, 2))
+        Absence.objects.create(employee=employee, start_date=date(2030, 4, 1), end_date=date(2030, 4, 3))
+
+        with self.assertNumQueries(1):
+            index = AbsenceIndex.load(date(2030, 3, 1), date(2030, 3, 31))
+        self.assertFalse(index.is_available(employee.pk, date(2030, 3, 2)))
+        self.assertTrue(index.is_available(employee.pk, date(2030, 3, 3)))
+        # Outside the loaded range
+        self.assertTrue(index.is_available(employee.pk, date(2030, 4, 2)))
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        self.now = 1_000_000.0
+        patcher = mock.patch("core.ratelimit.time.time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bucket = TokenBucket("test", rate=2, capacity=3, recovery_seconds=10)
+
+    def test_burst_is_free_then_callers_queue(self):
+        self.assertEqual([self.bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        # Each further token takes 1 / rate seconds, behind the earlier ones
+        self.assertAlmostEqual(self.bucket.reserve(), 0.5)
+        self.assertAlmostEqual(self.bucket.reserve(), 1.0)
+        self.assertAlmostEqual(self.bucket.reserve(2), 2.0)
+
+    def test_tokens_refill_with_time_up_to_capacity(self):
+        self.bucket.reserve(3)
+        self.now += 1.0
+        self.assertEqual(self.bucket.reserve(2), 0.0)
+        self.now += 60.0
+        self.assertEqual(self.bucket.reserve(3), 0.0)
+        self.assertAlmostEqual(self.bucket.reserve(), 0.5)
+
+    def test_throttle_blocks_and_halves_the_rate(self):
+        self.bucket.reserve()
+        self.bucket.throttle(retry_after=5)
+        # Blocked for 5 s, then one token at the halved rate (1/s)
+        self.assertAlmostEqual(self.bucket.reserve(), 6.0)
+
+    def test_rate_recovers_linearly(self):
+        self.bucket.throttle(retry_after=0)
+        self.now += 5.0
+        self.bucket.reserve()
+        # Recovery adds (max_rate - min_rate) / recovery_seconds per second
+        expected = 1.0 + (2.0 - 2 / 16) / 10 * 5
+        self.assertAlmostEqual(RateLimitBucket.objects.get(name="test").rate, expected)
+
+
+class FakeCalendar:
+    """
+    Records gateway calls; calls on the events in `fail` raise instead.
+    Inserted events get the id "event-<date>".
+    """
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+
+    def _call(self, name, event_id, *args):
+        self.calls.append((name, event_id, *args))
+        if event_id in self.fail:
+            raise RuntimeError(f"{name} {event_id} failed")
+
+    def insert_event(self, body):
+        event_id = f"event-{body['start']['date']}"
+        self._call("insert_event", event_id, body["attendees"][0]["email"])
+        return event_id
+
+    def patch_attendee(self, event_id, email):
+        self._call("patch_attendee", event_id, email)
+
+    def delete_event(self, event_id):
+        self._call("delete_event", event_id)
+
+
+class ScheduleEditTests(TestCase):
+    def setUp(self):
+        self.batch = MonthlyEventBatch.objects.create(month=date(2030, 9, 1))
+        self.member = Employee.objects.create(
+            name="Member", email="member@example.com", employee_id="T301", order=1, order_gyomu=1,
+        )
+        self.other = Employee.objects.create(
+            name="Other", email="other@example.com", employee_id="T302", order=2, order_gyomu=2,
+        )
+        self.office = Employee.objects.create(
+            name="Office", email="office@example.com", employee_id="T303", order=3, order_gyomu=3,
+            role=Role.SHACHOU_SHITSU,
+        )
+        self.three_min = ScheduleEntry.objects.create(
+            date=date(2030, 9, 10), speech_type=SpeechType.THREE_MIN, assigned_employee=self.member,
+            batch=self.batch,
+        )
+        self.business = ScheduleEntry.objects.create(
+            date=date(2030, 9, 25), speech_type=SpeechType.BUSINESS, assigned_employee=self.other,
+            batch=self.batch,
+        )
+
+    def test_reassign_checks_who_can_take_the_day(self):
+        inactive = Employee.objects.create(
+            name="Inactive", email="inactive@example.com", employee_id="T304", is_rotation_active=False,
+        )
+        Absence.objects.create(employee=self.other, start_date=date(2030, 9, 9), end_date=date(2030, 9, 11))
+        for entry, employee in (
+            (self.business, self.office),
+            (self.three_min, inactive),
+            (self.three_min, self.other),
+        ):
+            with self.subTest(employee=employee.name), self.assertRaises(ScheduleEditError):
+                reassign_entry(None, entry.pk, employee.pk)
+        self.assertEqual(ScheduleEntry.objects.get(pk=self.business.pk).assigned_employee_id, self.other.pk)
+        self.assertEqual(ScheduleEntry.objects.get(pk=self.three_min.pk).assigned_employee_id, self.member.pk)
+
+        # 社長室 employees still take 3-minute speeches
+        reassign_entry(None, self.three_min.pk, self.office.pk)
+        self.assertEqual(ScheduleEntry.objects.get(pk=self.three_min.pk).assigned_employee_id, self.office.pk)
+
+    def test_swap_only_within_a_month_and_speech_type(self):
+        next_batch = MonthlyEventBatch.objects.create(month=date(2030, 10, 1))
+        next_month = ScheduleEntry.objects.create(
+            date=date(2030, 10, 10), speech_type=SpeechType.THREE_MIN, assigned_employee=self.other,
+            batch=next_batch,
+        )
+        for other_entry in (self.business, next_month):
+            with self.subTest(date=other_entry.date), self.assertRaises(ScheduleEditError):
+                swap_entries(None, self.three_min.pk, other_entry.pk)
+        self.assertEqual(ScheduleEntry.objects.get(pk=self.three_min.pk).assigned_employee_id, self.member.pk)
+
+        same_type = ScheduleEntry.objects.create(
+            date=date(2030, 9, 11), speech_type=SpeechType.THREE_MIN, assigned_employee=self.other,
+            batch=self.batch,
+        )
+        swap_entries(None, self.three_min.pk, same_type.pk)
+        self.assertEqual(ScheduleEntry.objects.get(pk=self.three_min.pk).assigned_employee_id, self.other.pk)
+        self.assertEqual(ScheduleEntry.objects.get(pk=same_type.pk).assigned_employee_id, self.member.pk)
+
+    def test_sent_month_edits_move_speakers_in_both_rotations(self):
+        def rotations():
+            # The employees of the data migrations are left out
+            employees = Employee.objects.filter(pk__in=[self.member.pk, self.other.pk, self.office.pk])
+            return (
+                list(employees.order_by("order", "id").values_list("name", flat=True)),
+                list(employees.filter(role=Role.MEMBER).order_by("order_gyomu", "id")
+                     .values_list("name", flat=True)),
+            )
+
+        MonthlyEventBatch.objects.filter(pk=self.batch.pk).update(is_sent=True)
+
+        # Other misses their only (業務) speech: front of both rotations
+        cancel_entry(None, self.business.pk)
+        self.assertEqual(rotations(), (["Other", "Member", "Office"], ["Other", "Member"]))
+
+        # Member loses their 3-minute day to Other, who moves to the back of
+        # both rotations as advance_rotation would have done
+        reassign_entry(None, self.three_min.pk, self.other.pk)
+        self.assertEqual(rotations(), (["Member", "Office", "Other"], ["Member", "Other"]))
+
+
+class ScheduleEditCompensationTests(TestCase):
+    """
+    A failed calendar call after the edit committed puts the rows back and
+    leaves the rotation alone.
+    """
+
+    def setUp(self):
+        self.batch = MonthlyEventBatch.objects.create(month=date(2030, 9, 1), is_sent=True)
+        self.first = Employee.objects.create(name="First", email="first@example.com", employee_id="T311")
+        self.second = Employee.objects.create(name="Second", email="second@example.com", employee_id="T312")
+        self.spare = Employee.objects.create(name="Spare", email="spare@example.com", employee_id="T313")
+        self.entry = ScheduleEntry.objects.create(
+            date=date(2030, 9, 10), speech_type=SpeechType.THREE_MIN, assigned_employee=self.first,
+            batch=self.batch, is_sent=True, google_event_id="event-1",
+        )
+        self.other = ScheduleEntry.objects.create(
+            date=date(2030, 9, 11), speech_type=SpeechType.THREE_MIN, assigned_employee=self.second,
+            batch=self.batch, is_sent=True, google_event_id="event-2",
+        )
+        self.orders = self._orders()
+
+    def _orders(self):
+        return list(Employee.objects.order_by("pk").values_list("pk", "order", "order_gyomu"))
+
+    def _row(self, entry):
+        return ScheduleEntry.objects.values(
+            "assigned_employee_id", "is_cancelled", "is_sent", "google_event_id",
+        ).get(pk=entry.pk)
+
+    def assertUnchanged(self):
+        self.assertEqual(self._row(self.entry), {
+            "assigned_employee_id": self.first.pk, "is_cancelled": False, "is_sent": True,
+            "google_event_id": "event-1",
+        })
+        self.assertEqual(self._row(self.other)["assigned_employee_id"], self.second.pk)
+        self.assertEqual(self._orders(), self.orders)
+
+    def test_cancel(self):
+        calendar = FakeCalendar(fail={"event-1"})
+        with self.assertRaises(RuntimeError):
+            cancel_entry(calendar, self.entry.pk)
+        self.assertEqual(calendar.calls, [("delete_event", "event-1")])
+        self.assertUnchanged()
+
+    def test_reassign(self):
+        calendar = FakeCalendar(fail={"event-1"})
+        with self.assertRaises(RuntimeError):
+            reassign_entry(calendar, self.entry.pk, self.spare.pk)
+        self.assertUnchanged()
+
+    def test_swap_puts_the_patched_event_back(self):
+        calendar = FakeCalendar(fail={"event-2"})
+        with self.assertRaises(RuntimeError):
+            swap_entries(calendar, self.entry.pk, self.other.pk)
+        self.assertEqual(calendar.calls, [
+            ("patch_attendee", "event-1", "second@example.com"),
+            ("patch_attendee", "event-2", "first@example.com"),
+            ("patch_attendee", "event-1", "first@example.com"),
+        ])
+        self.assertUnchanged()
+
+    def test_unsend(self):
+        # Left sent by a retract that failed to delete the event
+        MonthlyEventBatch.objects.filter(pk=self.batch.pk).update(is_sent=False)
+        calendar = FakeCalendar(fail={"event-1"})
+        with self.assertRaises(RuntimeError):
+            unsend_entry(calendar, self.entry.pk)
+        self.assertUnchanged()
+
+    def test_unsend_refuses_a_sent_month(self):
+        calendar = FakeCalendar()
+        with self.assertRaises(ScheduleEditError):
+            unsend_entry(calendar, self.entry.pk)
+        self.assertEqual(calendar.calls, [])
+        self.assertUnchanged()
+
+    def test_successful_calls_are_kept(self):
+        calendar = FakeCalendar()
+        reassign_entry(calendar, self.entry.pk, self.spare.pk)
+        self.assertEqual(calendar.calls, [("patch_attendee", "event-1", "spare@example.com")])
+        self.assertEqual(self._row(self.entry)["assigned_employee_id"], self.spare.pk)
+        self.assertNotEqual(self._orders(), self.orders)
+
+
+class ScheduleEntryAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "password")
+        )
+        employee = Employee.objects.create(name="Admin", email="admin-edit@example.com", employee_id="T321")
+        self.entries = [
+            ScheduleEntry.objects.create(
+                date=date(2030, 11, day), speech_type=SpeechType.THREE_MIN, assigned_employee=employee,
+                is_sent=True, google_event_id=f"event-{day}",
+            )
+            for day in (11, 12, 13)
+        ]
+
+    def test_failed_entry_does_not_stop_the_action(self):
+        calendar = FakeCalendar(fail={"event-12"})
+        with mock.patch("core.admin.get_stored_calendar", return_value=calendar), \
+                self.assertLogs("core.admin", "ERROR"):
+            response = self.client.post(
+                reverse("admin:core_scheduleentry_changelist"),
+                {"action": "cancel_entries", "_selected_action": [entry.pk for entry in self.entries]},
+                follow=True,
+            )
+        self.assertEqual(len(calendar.calls), 3)
+        self.assertEqual(
+            list(ScheduleEntry.objects.filter(pk__in=[e.pk for e in self.entries])
+                 .order_by("date").values_list("is_cancelled", flat=True)),
+            [True, False, True],
+        )
+        shown = [str(message) for message in response.context["messages"]]
+        self.assertIn("2件をキャンセルにしました。", shown)
+        self.assertTrue(any(message.startswith("2030-11-12:") for message in shown))
+
+
+class ExportStreamingTests(TestCase):
+    def setUp(self):
+        employee = Employee.objects.create(name="Stream", email="stream@example.com", employee_id="T331")
+        for day in range(1, 29):
+            ScheduleEntry.objects.create(
+                date=date(2030, 2, day), speech_type=SpeechType.THREE_MIN, assigned_employee=employee,
+            )
+        self.url = reverse("export_schedule") + "?start=2030-02-01&end=2030-02-28"
+
+    def test_wsgi_streams_a_sync_iterator(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 29)
+
+    async def test_asgi_streams_an_async_iterator(self):
+        # A sync iterator would be buffered whole by Django under ASGI
+        with mock.patch("core.views.ASYNC_STREAM_BATCH", 5):
+            response = await self.async_client.get(self.url)
+            self.assertTrue(response.is_async)
+            content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), 29)
+
+
+class ApplyChangesTests(TestCase):
+    def setUp(self):
+        self.current = Employee.objects.create(name="Current", email="current@example.com", employee_id="T341")
+        self.new = Employee.objects.create(name="New", email="New.Speaker@Example.com", employee_id="T342")
+        self.entry = ScheduleEntry.objects.create(
+            date=date(2030, 4, 8), speech_type=SpeechType.THREE_MIN, assigned_employee=self.current,
+            is_sent=True, google_event_id="event-1",
+        )
+        self.deleted = ScheduleEntry.objects.create(
+            date=date(2030, 4, 9), speech_type=SpeechType.THREE_MIN, assigned_employee=self.current,
+            is_sent=True, google_event_id="event-2",
+        )
+
+    def test_attendee_is_matched_case_insensitively(self):
+        stats = apply_changes({
+            "event-1": EventInfo("event-1", status="confirmed", attendee="NEW.SPEAKER@EXAMPLE.COM"),
+            "event-2": EventInfo("event-2", status="cancelled"),
+        })
+        self.assertEqual(stats, {"deleted": 1, "reassigned": 1})
+        self.assertEqual(ScheduleEntry.objects.get(pk=self.entry.pk).assigned_employee_id, self.new.pk)
+        deleted = ScheduleEntry.objects.get(pk=self.deleted.pk)
+        self.assertEqual((deleted.google_event_id, deleted.is_sent), (None, False))
+
+    def test_same_attendee_in_another_case_is_not_a_change(self):
+        stats = apply_changes({"event-1": EventInfo("event-1", status="confirmed", attendee="Current@Example.com")})
+        self.assertEqual(stats, {"deleted": 0, "reassigned": 0})
+
+
+class CalendarWebhookTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        CalendarSyncState.objects.create(calendar_id="primary", channel_id="channel", channel_token="secret")
+        patcher = mock.patch("core.calendar_sync.threading.Thread")
+        self.thread = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def notify(self, token="secret"):
+        return self.client.post(
+            reverse("calendar_webhook"),
+            HTTP_X_GOOG_CHANNEL_ID="channel", HTTP_X_GOOG_CHANNEL_TOKEN=token, HTTP_X_GOOG_RESOURCE_STATE="exists",
+        )
+
+    def test_notifications_are_acknowledged_and_coalesced(self):
+        with mock.patch("core.calendar_sync.sync_calendar") as sync:
+            self.assertEqual(self.notify().status_code, 204)
+            self.assertEqual(self.notify().status_code, 204)
+            sync.assert_not_called()
+        # The second notification found the sync thread already started
+        self.thread.assert_called_once()
+        self.assertEqual(self.notify(token="forged").status_code, 404)
+
+    def test_notification_during_a_sync_runs_it_again(self):
+        request_sync()
+        syncs = []
+
+        def sync_and_notify():
+            syncs.append(len(syncs))
+            if len(syncs) == 1:
+                self.assertFalse(request_sync())
+
+        with mock.patch("core.calendar_sync._sync_stored_calendar", side_effect=sync_and_notify):
+            _run_pending_syncs()
+        self.assertEqual(len(syncs), 2)
+        # The lock is released for the next notification
+        self.assertTrue(request_sync())
+
+
+class RosterImportTests(TestCase):
+    def setUp(self):
+        self.existing = Employee.objects.create(
+            name="Old Name", email="Existing@Example.com", employee_id="T351", order=5, order_gyomu=6,
+        )
+
+    def employee(self, email):
+        return Employee.objects.annotate(email_lower=Lower("email")).get(email_lower=email.lower())
+
+    def test_csv(self):
+        stream = io.StringIO(
+            "name,email,role,is_rotation_active\n"
+            "New,new@example.com,社長室,no\n"
+            "Renamed,existing@example.com,,\n"
+        )
+        summary = import_roster(stream, "csv")
+        self.assertEqual(summary, {"created": 1, "updated": 1, "errors": []})
+
+        new = self.employee("new@example.com")
+        self.assertEqual((new.role, new.is_rotation_active), (Role.SHACHOU_SHITSU, False))
+        # Matched case-insensitively: same row, stored spelling, id and order kept
+        existing = Employee.objects.get(pk=self.existing.pk)
+        self.assertEqual(
+            (existing.name, existing.email, existing.employee_id, existing.order, existing.order_gyomu),
+            ("Renamed", "Existing@Example.com", "T351", 5, 6),
+        )
+
+    def test_json_array_and_lines_in_chunks(self):
+        rows = [{"name": f"Row {n}", "email": f"row{n}@example.com"} for n in range(5)]
+        documents = {
+            "array": json.dumps(rows, indent=2),
+            "lines": "\n".join(json.dumps(row) for row in rows) + "\n",
+        }
+        for label, document in documents.items():
+            with self.subTest(label), transaction.atomic():
+                # Objects straddle the read buffer and the chunks
+                with mock.patch("core.roster.JSON_READ_SIZE", 7):
+                    summary = import_roster(io.StringIO(document), "json", chunk_size=2)
+                self.assertEqual(summary, {"created": 5, "updated": 0, "errors": []})
+                self.assertEqual(Employee.objects.filter(email__startswith="row").count(), 5)
+                transaction.set_rollback(True)
+
+    def test_duplicate_emails_differing_in_case(self):
+        stream = io.StringIO(
+            '{"name": "First", "email": "dup@example.com"}\n'
+            '{"name": "Second", "email": "DUP@example.com"}\n'
+        )
+        summary = import_roster(stream, "json")
+        self.assertEqual((summary["created"], summary["updated"]), (1, 0))
+        self.assertEqual([row for row, _message in summary["errors"]], [2])
+        self.assertEqual(self.employee("dup@example.com").name, "First")
+
+    def test_malformed_json(self):
+        stream = io.StringIO('[{"name": "Ok", "email": "ok@example.com"}, {"name": "Broken",')
+        with self.assertRaisesMessage(ValueError, "row 2"):
+            import_roster(stream, "json")
+
+    def test_invalid_rows_are_reported(self):
+        stream = io.StringIO(
+            "name,email,role\n"
+            ",noname@example.com,\n"
+            "No email,,\n"
+            "Bad role,bad-role@example.com,部長\n"
+            "Valid,valid@example.com,MEMBER\n"
+        )
+        summary = import_roster(stream, "csv")
+        self.assertEqual(summary["created"], 1)
+        self.assertEqual([row for row, _message in summary["errors"]], [2, 3, 4])
+
+
+class SimulationTests(TestCase):
+    def setUp(self):
+        ScheduleEntry.objects.all().delete()
+        Employee.objects.all().delete()
+        for number in range(1, 8):
+            Employee.objects.create(
+                name=f"S{number}", email=f"s{number}@example.com", employee_id=f"T36{number}",
+                order=number, order_gyomu=8 - number,
+                role=Role.SHACHOU_SHITSU if number == 3 else Role.MEMBER,
+                is_rotation_active=number != 6,
+            )
+        Absence.objects.create(
+            employee=Employee.objects.get(name="S1"), start_date=date(2030, 3, 11), end_date=date(2030, 3, 15),
+        )
+
+    def generated_months(self, strategy, months):
+        """
+        generate_month for each month, sending it (every speaker spoke) before
+        generating the next, as the simulation assumes.
+        """
+        projected = []
+        for month in months:
+            generate_month(2030, month, strategy)
+            batch = MonthlyEventBatch.objects.get(month=date(2030, month, 1))
+            entries = batch.entries.order_by("date")
+            projected.append([(entry.date, entry.speech_type, entry.assigned_employee_id) for entry in entries])
+            batch.is_sent = True
+            batch.save()
+            with self.assertLogs("core.rotation"):
+                advance_rotation(batch, {entry.date for entry in entries})
+        return projected
+
+    def test_matches_generate_month(self):
+        for strategy in STRATEGIES:
+            with self.subTest(strategy=strategy), transaction.atomic():
+                result = run_simulation(normalize_simulation_input(
+                    {"start": "2030-03", "months": 3, "strategy": strategy},
+                ))
+                simulated = [
+                    [(date.fromisoformat(entry["date"]), entry["speech_type"], entry["employee_id"])
+                     for entry in month["entries"]]
+                    for month in result["months"]
+                ]
+                generated = [
+                    [day for day in month if day[2] is not None]
+                    for month in self.generated_months(strategy, (3, 4, 5))
+                ]
+                self.assertEqual(simulated, generated)
+                transaction.set_rollback(True)
+
+
+class FakeBatchCalendar:
+    """
+    Request builders return plain tuples; execute_batched fails the keys in
+    `fail` and creates events numbered from 100.
+    """
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.batches = []
+
+    def insert_request(self, body):
+        return ("insert", body["attendees"][0]["email"])
+
+    def patch_attendee_request(self, event_id, email):
+        return ("patch", event_id, email)
+
+    def delete_request(self, event_id):
+        return ("delete", event_id)
+
+    def execute_batched(self, requests):
+        requests = list(requests)
+        self.batches.append(requests)
+        results = {}
+        for number, (key, request) in enumerate(requests, start=100):
+            if key in self.fail:
+                results[key] = (None, RuntimeError(f"{request[0]} failed"))
+            else:
+                results[key] = ({"id": f"event-{number}"}, None)
+        return results
+
+
+class CalendarReconcileTests(TestCase):
+    def setUp(self):
+        self.speaker = Employee.objects.create(name="Speaker", email="speaker@example.com", employee_id="T371")
+        self.other = Employee.objects.create(name="Other", email="other@example.com", employee_id="T372")
+
+        def entry(day, event_id, **kwargs):
+            return ScheduleEntry.objects.create(**{
+                "date": date(2030, 8, day), "speech_type": SpeechType.THREE_MIN,
+                "assigned_employee": self.speaker, "is_sent": True, "google_event_id": event_id, **kwargs,
+            })
+
+        self.ok = entry(5, "ok")
+        self.case_only = entry(6, "case")
+        self.mismatched = entry(7, "moved")
+        self.missing = entry(8, "gone")
+        self.missing_other = entry(9, "gone-too", assigned_employee=self.other)
+        self.missing_cancelled = entry(12, "gone-cancelled", is_cancelled=True)
+        self.events = {
+            "ok": EventInfo("ok", summary="３分間", attendee="speaker@example.com"),
+            "case": EventInfo("case", summary="３分間", attendee="Speaker@Example.COM"),
+            "moved": EventInfo("moved", summary="３分間", attendee="other@example.com"),
+            "orphan": EventInfo("orphan", summary="業務", attendee="other@example.com"),
+            "lunch": EventInfo("lunch", summary="Lunch", attendee="other@example.com"),
+        }
+
+    def diff(self):
+        entries = ScheduleEntry.objects.filter(google_event_id__isnull=False).select_related("assigned_employee")
+        return diff_calendar(self.events, list(entries.order_by("date")))
+
+    def test_diff(self):
+        diff = self.diff()
+        self.assertEqual(
+            [entry.pk for entry in diff["missing"]],
+            [self.missing.pk, self.missing_other.pk, self.missing_cancelled.pk],
+        )
+        self.assertEqual([entry.pk for entry in diff["mismatched"]], [self.mismatched.pk])
+        # Events that are not speeches are never orphans
+        self.assertEqual(diff["orphans"], ["orphan"])
+
+    def test_repair_counts_failures_and_leaves_those_entries_alone(self):
+        calendar = FakeBatchCalendar(fail={str(self.missing_other.pk), self.mismatched.pk})
+        stats = repair_calendar(calendar, self.diff())
+
+        self.assertEqual(stats, {"created": 1, "patched": 0, "deleted": 1, "failed": 2})
+        inserts, patches, deletes = calendar.batches
+        self.assertEqual([request for _key, request in inserts], [
+            ("insert", "speaker@example.com"), ("insert", "other@example.com"),
+        ])
+        self.assertEqual(deletes, [("orphan", ("delete", "orphan"))])
+
+        def row(entry):
+            return ScheduleEntry.objects.values_list("google_event_id", "is_sent").get(pk=entry.pk)
+
+        self.assertEqual(row(self.missing), ("event-100", True))
+        # Failed: still pointing at the missing event, for the next run
+        self.assertEqual(row(self.missing_other), ("gone-too", True))
+        self.assertEqual(row(self.mismatched), ("moved", True))
+        # Cancelled: the stale id is just dropped
+        self.assertEqual(row(self.missing_cancelled), (None, False))
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = Employee.objects.create(name="Cached", email="cached@example.com", employee_id="T381")
+        self.builds = []
+
+    def context(self):
+        def build(today):
+            self.builds.append(today)
+            return {"built": len(self.builds)}
+        return get_dashboard_context(date(2030, 1, 15), build)
+
+    def assertRebuiltAfter(self, write):
+        before = self.context()
+        self.assertEqual(self.context(), before)
+        write()
+        self.assertNotEqual(self.context(), before)
+
+    def test_cached_until_a_write(self):
+        self.context()
+        self.context()
+        self.assertEqual(len(self.builds), 1)
+
+    def test_save_and_delete_invalidate(self):
+        self.assertRebuiltAfter(lambda: self.employee.save())
+        self.assertRebuiltAfter(lambda: MonthlyEventBatch.objects.create(month=date(2030, 1, 1)))
+        self.assertRebuiltAfter(lambda: self.employee.delete())
+
+    def test_bulk_writes_invalidate(self):
+        self.assertRebuiltAfter(lambda: Employee.objects.filter(pk=self.employee.pk).update(name="Renamed"))
+        self.assertRebuiltAfter(lambda: Employee.objects.bulk_update([self.employee], ["name"]))
+        self.assertRebuiltAfter(lambda: ScheduleEntry.objects.bulk_create([
+            ScheduleEntry(date=date(2030, 1, 20), speech_type=SpeechType.THREE_MIN),
+        ]))
+
+    def test_bulk_writes_invalidate_the_feeds(self):
+        before = get_employee_versions([self.employee.pk])
+        ScheduleEntry.objects.filter(assigned_employee=self.employee).update(is_sent=True)
+        self.assertNotEqual(get_employee_versions([self.employee.pk]), before)
+
+
+class MoveEmployeeTests(TestCase):
+    def setUp(self):
+        Employee.objects.all().delete()
+        self.first, self.second, self.third = [
+            Employee.objects.create(
+                name=f"Row {number}", email=f"row{number}@example.com", employee_id=f"T40{number}",
+                order=number, order_gyomu=number,
+            )
+            for number in (1, 2, 3)
+        ]
+
+    def move(self, name, employee):
+        return self.client.post(
+            reverse(name, args=[employee.pk]), HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+
+    def test_ajax_move_returns_only_the_swapped_rows(self):
+        response = self.move("employee-move-up-gyomu", self.second)
+
+        rows = response.json()["zones"]["gyomu"]
+        self.assertEqual([row["id"] for row in rows], [self.second.pk, self.first.pk])
+        self.assertIn(f'id="row-gyomu-{self.second.pk}"', rows[0]["html"])
+        # The new head loses its up arrow, the old head gains one
+        self.assertNotIn("'up'", rows[0]["html"])
+        self.assertIn("'up'", rows[1]["html"])
+        self.assertEqual(
+            list(Employee.objects.order_by("order_gyomu").values_list("pk", flat=True)),
+            [self.second.pk, self.first.pk, self.third.pk],
+        )
+
+    def test_move_at_the_end_renders_one_row(self):
+        rows = self.move("employee-move-down", self.third).json()["zones"]["3min"]
+        self.assertEqual([row["id"] for row in rows], [self.third.pk])
+        self.assertNotIn("'down'", rows[0]["html"])
+
+    def test_non_member_cannot_move_in_the_gyomu_rotation(self):
+        Employee.objects.filter(pk=self.second.pk).update(role=Role.SHACHOU_SHITSU)
+        self.assertEqual(self.move("employee-move-up-gyomu", self.second).status_code, 404)
+
+    def test_plain_request_redirects(self):
+        response = self.client.post(reverse("employee-move-up", args=[self.second.pk]))
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+
+
+class RosterSnapshotTests(TestCase):
+    def setUp(self):
+        Employee.objects.all().delete()
+        self.office = Employee.objects.create(
+            name="Office", email="office@example.com", employee_id="T411", order=1, order_gyomu=1,
+            role=Role.SHACHOU_SHITSU,
+        )
+        self.late = Employee.objects.create(
+            name="Late", email="late@example.com", employee_id="T412", order=3, order_gyomu=1,
+        )
+        self.early = Employee.objects.create(
+            name="Early", email="early@example.com", employee_id="T413", order=2, order_gyomu=2,
+        )
+
+    def test_load_roster_orders_by_order_and_gyomu_rotation_by_order_gyomu(self):
+        with self.assertNumQueries(1):
+            members = load_roster()
+        self.assertEqual([member.id for member in members], [self.office.pk, self.early.pk, self.late.pk])
+        self.assertEqual(members[1].email, "early@example.com")
+        self.assertEqual([member.id for member in gyomu_rotation(members)], [self.late.pk, self.early.pk])
+        self.assertEqual([member.id for member in load_roster(role=Role.SHACHOU_SHITSU)], [self.office.pk])
+
+    def test_speech_dates_match_the_model_methods(self):
+        today = date.today()
+        for offset, employee, cancelled in [
+            (-10, self.late, False),
+            (-3, self.late, True),
+            (5, self.late, False),
+            (9, self.late, False),
+            (-1, self.early, False),
+        ]:
+            ScheduleEntry.objects.create(
+                date=today + timedelta(days=offset), speech_type=SpeechType.THREE_MIN,
+                assigned_employee=employee, is_cancelled=cancelled,
+            )
+
+        with self.assertNumQueries(1):
+            dates = load_speech_dates(today)
+
+        self.assertEqual(dates[self.late.pk], (today + timedelta(days=9), today + timedelta(days=5)))
+        self.assertEqual(dates[self.early.pk], (today - timedelta(days=1), None))
+        self.assertNotIn(self.office.pk, dates)
+        for employee in (self.late, self.early):
+            last, upcoming = dates[employee.pk]
+            self.assertEqual((today - last).days, employee.days_since_last_speech())
+            self.assertEqual(upcoming, employee.next_speech_date())
+        self.assertEqual(list(load_speech_dates(today, [self.early.pk])), [self.early.pk])
+
+
+class FakeBucket:
+    def __init__(self):
+        self.taken = []
+        self.throttled = []
+
+    def take(self, count=1):
+        self.taken.append(count)
+
+    def throttle(self, retry_after):
+        self.throttled.append(retry_after)
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(status)
+        self.resp = type("Resp", (dict,), {"status": status})()
+        if retry_after is not None:
+            self.resp["retry-after"] = retry_after
+        self.content = b""
+
+
+class FakeBatchService:
+    """
+    new_batch_http_request() stand-in: records the keys of every batch and
+    answers each call with the next outcome listed for its key.
+    """
+
+    def __init__(self, outcomes=None):
+        self.outcomes = outcomes or {}
+        self.batches = []
+
+    def new_batch_http_request(self, callback):
+        service = self
+
+        class Batch:
+            def __init__(self):
+                self.keys = []
+
+            def add(self, request, request_id):
+                self.keys.append(request_id)
+
+            def execute(self):
+                service.batches.append(self.keys)
+                for key in self.keys:
+                    queued = service.outcomes.get(key) or []
+                    outcome = queued.pop(0) if queued else {"id": key}
+                    if isinstance(outcome, Exception):
+                        callback(key, None, outcome)
+                    else:
+                        callback(key, outcome, None)
+
+        return Batch()
+
+
+class CalendarGatewayTests(SimpleTestCase):
+    def gateway(self, service):
+        return CalendarGateway(service, calendar_id="cal", bucket=FakeBucket())
+
+    def test_requests_ask_for_ids_only(self):
+        service = mock.MagicMock()
+        gateway = self.gateway(service)
+        service.events.return_value.insert.return_value.execute.return_value = {"id": "event-1"}
+
+        self.assertEqual(gateway.insert_event({"summary": "業務"}), "event-1")
+        gateway.patch_attendee("event-1", "a@example.com")
+
+        service.events.return_value.insert.assert_called_once_with(
+            calendarId="cal", body={"summary": "業務"}, sendNotifications=False, fields=ID_FIELDS,
+        )
+        service.events.return_value.patch.assert_called_once_with(
+            calendarId="cal", eventId="event-1", body={"attendees": [{"email": "a@example.com"}]},
+            sendUpdates="none", fields=ID_FIELDS,
+        )
+        self.assertEqual(gateway.bucket.taken, [1, 1])
+
+    def test_list_events_masks_items_and_follows_pages(self):
+        service = mock.MagicMock()
+        service.events.return_value.list.return_value.execute.side_effect = [
+            {"items": [{"id": "a", "status": "confirmed"}], "nextPageToken": "p2"},
+            {"items": [{"id": "b", "attendees": [{"email": "b@example.com"}]}], "nextSyncToken": "s"},
+        ]
+
+        events, sync_token = self.gateway(service).list_events("id,status,attendees(email)")
+
+        self.assertEqual(events, {
+            "a": EventInfo("a", status="confirmed"),
+            "b": EventInfo("b", attendee="b@example.com"),
+        })
+        self.assertEqual(sync_token, "s")
+        calls = service.events.return_value.list.call_args_list
+        self.assertEqual(calls[0].kwargs["fields"], "items(id,status,attendees(email)),nextPageToken,nextSyncToken")
+        self.assertEqual(calls[1].kwargs["pageToken"], "p2")
+
+    def test_execute_batched_chunks_and_retries_rate_limited_calls(self):
+        failure = FakeHttpError(404)
+        service = FakeBatchService({"2": [FakeHttpError(429, retry_after="3")], "4": [failure]})
+        gateway = self.gateway(service)
+
+        results = gateway.execute_batched(((number, object()) for number in range(5)), batch_size=2)
+
+        self.assertEqual(service.batches, [["0", "1"], ["2", "3"], ["4"], ["2"]])
+        self.assertEqual(gateway.bucket.taken, [2, 2, 1, 1])
+        self.assertEqual(gateway.bucket.throttled, [3.0])
+        self.assertEqual(results["2"], ({"id": "2"}, None))
+        self.assertEqual(results["4"], (None, failure))
+        self.assertEqual(len(results), 5)
+
+
+GOOGLE_CLIENT_MODULES = ("googleapiclient", "google_auth_oauthlib", "httplib2", "core.google_client")
+
+
+class LazyGoogleImportTests(SimpleTestCase):
+    def test_startup_does_not_import_the_google_client(self):
+        # A fresh interpreter: this test process may already have loaded it
+        script = (
+            "import sys, django; django.setup(); "
+            "import core.urls, core.admin, core.management.commands.sync_calendar; "
+            f"print(sorted(name for name in sys.modules if name.startswith({GOOGLE_CLIENT_MODULES!r})))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR, env={**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE},
+        )
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+class PublishBatchTests(TestCase):
+    def setUp(self):
+        self.batch = MonthlyEventBatch.objects.create(month=date(2030, 11, 1))
+        self.speaker = Employee.objects.create(
+            name="Speaker", email="speaker@example.com", employee_id="T421", order=1, order_gyomu=1,
+        )
+        self.no_email = Employee.objects.create(
+            name="No Email", email="", employee_id="T422", order=2, order_gyomu=2,
+        )
+        self.ok, self.failing, self.unaddressed = [
+            ScheduleEntry.objects.create(
+                batch=self.batch, date=day, speech_type=SpeechType.THREE_MIN, assigned_employee=employee,
+            )
+            for day, employee in zip(_days(3, date(2030, 11, 4)), [self.speaker, self.speaker, self.no_email])
+        ]
+        ScheduleEntry.objects.create(
+            batch=self.batch, date=date(2030, 11, 7), speech_type=SpeechType.THREE_MIN,
+            assigned_employee=self.speaker, is_cancelled=True,
+        )
+
+    def test_send_keeps_the_events_created_before_a_failure(self):
+        calendar = FakeCalendar(fail={"event-2030-11-05"})
+
+        with self.assertLogs("core.calendar_sync", "WARNING"):
+            result = send_batch(calendar, self.batch)
+
+        self.assertEqual(result.done, 1)
+        self.assertEqual(
+            sorted((entry.pk, message.split(":")[0]) for entry, message in result.failures),
+            sorted([(self.failing.pk, "Failed to create event for 2030-11-05"),
+                    (self.unaddressed.pk, "No Email has no email.")]),
+        )
+        self.assertEqual(
+            list(ScheduleEntry.objects.filter(batch=self.batch).order_by("date").values_list("google_event_id", "is_sent")),
+            [("event-2030-11-04", True), (None, False), (None, False), (None, False)],
+        )
+        self.batch.refresh_from_db()
+        self.assertTrue(self.batch.is_sent)
+
+    def test_send_with_no_event_created_leaves_the_batch_unsent(self):
+        with self.assertLogs("core.calendar_sync", "WARNING"):
+            result = send_batch(FakeCalendar(fail={"event-2030-11-04", "event-2030-11-05"}), self.batch)
+        self.assertEqual((result.done, len(result.failures)), (0, 3))
+        self.batch.refresh_from_db()
+        self.assertFalse(self.batch.is_sent)
+
+    def test_retract_keeps_the_events_it_could_not_delete(self):
+        with self.assertLogs("core.calendar_sync"):
+            send_batch(FakeCalendar(), self.batch)
+        remove_employee(self.speaker)
+
+        with self.assertLogs("core.calendar_sync", "WARNING"):
+            result = retract_batch(FakeCalendar(fail={"event-2030-11-05"}), self.batch)
+
+        self.assertEqual((result.done, [entry.pk for entry, _message in result.failures]), (1, [self.failing.pk]))
+        self.assertEqual(
+            list(ScheduleEntry.objects.filter(google_event_id__isnull=False).values_list("pk", "google_event_id")),
+            [(self.failing.pk, "event-2030-11-05")],
+        )
+        self.batch.refresh_from_db()
+        self.assertFalse(self.batch.is_sent)
+
+
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db")
+class GoogleSessionTests(TestCase):
+    def start_flow(self):
+        session = self.client.session
+        session["oauth_state"] = "state-1"
+        session.save()
+
+    def test_callback_stores_the_token_server_side_only(self):
+        self.start_flow()
+        creds = SimpleNamespace(
+            token="secret-token", refresh_token="secret-refresh", token_uri="https://oauth2.example/token",
+            client_id="client", client_secret="client-secret", scopes=["calendar"],
+        )
+
+        with mock.patch("core.views._fetch_credentials", return_value=creds) as fetch:
+            response = self.client.get(reverse("google_callback"), {"state": "state-1", "code": "c"})
+
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+        self.assertEqual(fetch.call_args.args[0], "state-1")
+        self.assertEqual(load_credentials_data()["refresh_token"], "secret-refresh")
+        self.assertEqual(dict(self.client.session.items()), {GOOGLE_SESSION_FLAG: True})
+
+    def test_callback_without_state_restarts_the_flow(self):
+        with mock.patch("core.views._fetch_credentials") as fetch:
+            response = self.client.get(reverse("google_callback"))
+        self.assertRedirects(response, reverse("google_auth"), fetch_redirect_response=False)
+        fetch.assert_not_called()
+        self.assertFalse(GoogleCredential.objects.exists())
+
+    def test_purge_sessions_deletes_only_expired_rows(self):
+        for number in range(5):
+            Session.objects.create(
+                session_key=f"expired{number}", session_data="",
+                expire_date=timezone.now() - timedelta(days=1),
+            )
+        Session.objects.create(session_key="live", session_data="", expire_date=timezone.now() + timedelta(days=1))
+
+        out = io.StringIO()
+        call_command("purge_sessions", chunk_size=2, stdout=out)
+
+        self.assertIn("Deleted 5 expired sessions", out.getvalue())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
+
+
+class DashboardRowCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Employee.objects.all().delete()
+        self.employee = Employee.objects.create(
+            name="Before", email="row@example.com", employee_id="T431", order=1, order_gyomu=1,
+        )
+        self.request = RequestFactory().get("/")
+
+    def render_row(self):
+        employee = Employee.objects.get(pk=self.employee.pk)
+        [row] = _render_zone_rows(self.request, "3min", [employee])
+        return row["html"]
+
+    def rename_untracked(self, name):
+        # Bypasses ChangeTrackingQuerySet and the signals: no version bump
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE core_employee SET name = %s WHERE id = %s", [name, self.employee.pk])
+
+    def test_row_is_served_from_the_fragment_cache_until_the_version_changes(self):
+        self.assertIn("Before", self.render_row())
+
+        self.rename_untracked("Untracked")
+        self.assertIn("Before", self.render_row())
+
+        employee = Employee.objects.get(pk=self.employee.pk)
+        employee.name = "Saved"
+        employee.save()
+        self.assertIn("Saved", self.render_row())
+
+        self.rename_untracked("Bulk")
+        Employee.objects.filter(pk=self.employee.pk).update(is_rotation_active=True)
+        self.assertIn("Bulk", self.render_row())
+
+    def test_fragment_key_includes_the_zone_edges(self):
+        self.assertNotIn("'down'", self.render_row())
+        self.rename_untracked("Untracked")
+        Employee.objects.create(name="Next", email="next@example.com", employee_id="T432", order=2, order_gyomu=2)
+
+        html = self.render_row()
+        self.assertIn("'down'", html)
+        self.assertIn("Untracked", html)
+
+
+class StaticFilesTests(TestCase):
+    def test_hashed_assets_are_compressed_and_cached_for_a_year(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(
+            STATIC_ROOT=static_root,
+            STORAGES={**settings.STORAGES, "staticfiles": {
+                "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+            }},
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            url = static("core/js/dashboard.js")
+            self.assertRegex(url, r"/core/js/dashboard\.[0-9a-f]{12}\.js$")
+
+            hashed = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+            plain = self.client.get(settings.STATIC_URL + "core/js/dashboard.js")
+
+        self.assertEqual(hashed.status_code, 200)
+        self.assertEqual(hashed["Content-Encoding"], "gzip")
+        self.assertIn("immutable", hashed["Cache-Control"])
+        self.assertEqual(plain.status_code, 200)
+        self.assertEqual(plain["Cache-Control"], f"max-age={settings.WHITENOISE_MAX_AGE}, public")
+
+
+class StructuredLoggingTests(SimpleTestCase):
+    def test_queue_handler_writes_json_lines_from_the_listener(self):
+        stream = io.StringIO()
+        handler = QueueStreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        logger = logging.getLogger("core.tests.structured")
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            days = ["2030-01-07"]
+            logger.warning("Sent %s: %s", "2030-01", days, extra={"event": "calendar.send", "failed": 1})
+            # Formatted when logged, not when the listener gets to it
+            days.append("2030-01-08")
+            try:
+                raise RuntimeError("boom")
+            except RuntimeError:
+                logger.exception("Failed")
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+        first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(
+            {key: first[key] for key in ("level", "logger", "message", "event", "failed")},
+            {"level": "WARNING", "logger": "core.tests.structured",
+             "message": "Sent 2030-01: ['2030-01-07']", "event": "calendar.send", "failed": 1},
+        )
+        self.assertEqual(second["message"], "Failed")
+        self.assertIn("RuntimeError: boom", second["exc"])
+
+
+class PublishLoggingTests(TestCase):
+    def test_send_logs_one_summary_with_the_counts(self):
+        batch = MonthlyEventBatch.objects.create(month=date(2030, 12, 1))
+        speaker = Employee.objects.create(name="Log", email="log@example.com", employee_id="T441")
+        for day in _days(2, date(2030, 12, 2)):
+            ScheduleEntry.objects.create(
+                batch=batch, date=day, speech_type=SpeechType.THREE_MIN, assigned_employee=speaker,
+            )
+
+        with self.assertLogs("core.calendar_sync", "INFO") as logs:
+            send_batch(FakeCalendar(fail={"event-2030-12-03"}), batch)
+
+        [record] = logs.records
+        self.assertEqual(record.levelname, "WARNING")
+        self.assertEqual(
+            (record.event, record.month, record.done, record.failed),
+            ("calendar.send", "2030-12-01", 1, 1),
+        )
+        self.assertIsInstance(record.duration_ms, int)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.user = User.objects.create_user("user", password="pw")
+
+    def test_only_staff_requests_that_ask_are_profiled(self):
+        response = self.client.get(reverse("dashboard"), HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile-Report", response)
+
+        self.client.force_login(self.user)
+        self.assertNotIn("X-Profile-Report", self.client.get(reverse("dashboard"), HTTP_X_PROFILE="1"))
+
+        self.client.force_login(self.staff)
+        self.assertNotIn("X-Profile-Report", self.client.get(reverse("dashboard")))
+        self.assertNotIn("X-Profile-Report", self.client.get(reverse("dashboard"), {"__profile": "0"}))
+        self.assertFalse(ProfileReport.objects.exists())
+
+    def test_profiled_request_stores_a_report(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get(reverse("dashboard"), {"__profile": "1"})
+
+        report = ProfileReport.objects.get()
+        self.assertEqual(response["X-Profile-Report"], reverse("admin:core_profilereport_change", args=[report.pk]))
+        self.assertEqual((report.method, report.path, report.status_code, report.user),
+                         ("GET", reverse("dashboard") + "?__profile=1", 200, "staff"))
+        self.assertGreater(report.query_count, 0)
+        self.assertEqual(len(report.queries), report.query_count)
+        self.assertTrue(any(query["origin"].startswith("core/") for query in report.queries))
+        self.assertTrue(report.profile)
+
+    @override_settings(PROFILE_REPORT_LIMIT=2)
+    def test_only_the_newest_reports_are_kept(self):
+        self.client.force_login(self.staff)
+        for _ in range(3):
+            self.client.get(reverse("dashboard"), HTTP_X_PROFILE="1")
+        self.assertEqual(ProfileReport.objects.count(), 2)
@@ -21,8 +21,11 @@ urlpatterns = [
     path("", views.home , name="home"),
     path("dashboard/", views.dashboard_view, name="dashboard"),
     path("members/add/", views.add_member_view, name="add_member"),
+    path("members/import/", views.import_roster_view, name="import_roster"),
+    path("members/export/", views.export_roster, name="export_roster"),
     path("google/auth/", views.google_auth, name="google_auth"),
     path("google/callback/", views.google_callback, name="google_callback"),
+    path("google/calendar/webhook/", views.calendar_webhook, name="calendar_webhook"),
     path("google/test-create/", views.test_create_event, name="test_create_event"),
     path('employee/<int:employee_id>/up/', views.move_up, name='employee-move-up'),
     path('employee/<int:employee_id>/down/', views.move_down, name='employee-move-down'),
@@ -32,9 +35,16 @@ urlpatterns = [
     
     # Schedule management URLs
     path('schedule/generate/', views.generate_schedule, name='generate_schedule'),
+    path('schedule/simulate/', views.simulate_schedule, name='simulate_schedule'),
     path('schedule/preview/<int:year>/<int:month>/', views.schedule_preview, name='schedule_preview'),
     path('schedule/send/<int:year>/<int:month>/', views.send_schedule_to_calendar, name='send_to_calendar_month'),
     path('schedule/retract/<int:year>/<int:month>/', views.retract_schedule, name='retract_schedule'),
+    path('schedule/entry/<int:entry_id>/cancel/', views.cancel_entry, name='cancel_entry'),
+    path('schedule/entry/<int:entry_id>/reassign/', views.reassign_entry, name='reassign_entry'),
+    path('schedule/entry/<int:entry_id>/swap/', views.swap_entries, name='swap_entries'),
+    path('schedule/export/', views.export_schedule, name='export_schedule'),
+    path('feeds/employee/<str:token>.ics', views.schedule_feed, {'kind': 'employee'}, name='employee_feed'),
+    path('feeds/roster/<str:token>.ics', views.schedule_feed, {'kind': 'roster'}, name='roster_feed'),
     
     # Dashboard button redirects
     path('send-to-calendar/', views.send_to_calendar_redirect, name='send_to_calendar'),
@@ -1,17 +1,37 @@
+import io
+import json
 import os
+from functools import wraps
+from itertools import islice
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.template.loader import render_to_string
+from django.views.decorators.http import condition, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
-from django.db import models
-from datetime import date, timedelta
-from .models import Employee, ScheduleEntry, Role, SpeechType, MonthlyEventBatch
+from django.db import connection, models
+from datetime import date
+from .models import Employee, ScheduleEntry, Role, MonthlyEventBatch
+from .allocator import allocate_employee_ids, allocate_order_slots
+from .cache import get_dashboard_context, get_employee_versions
+from .roster import (
+    detect_format, gyomu_rotation, import_roster, iter_roster_export, load_roster, load_speech_dates,
+)
+from .schedule_export import iter_schedule_export
+from .feeds import get_feed_body, get_feed_state
+from .google_calendar import get_stored_calendar, save_credentials
+from .calendar_sync import find_channel, request_sync, retract_batch, send_batch
+from .simulation import simulate
+from . import schedule_edits
+from .schedule_edits import ScheduleEditError
+from .rotation import ROTATION_QUERYSETS, advance_rotation, move_in_rotation, remove_employee
+from .schedule_planner import ScheduleError, generate_month
+from .scheduling import get_business_days
 import logging
-from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from calendar import monthrange
 import calendar as cal_module
 
@@ -20,48 +40,6 @@ import calendar as cal_module
 # Helper Functions
 # =====================================================
 
-def apply_rotation(current_order, assigned_members, did_speak_map):
-    """
-    Apply rotation logic based on speech history.
-    
-    Groups members into three categories and merges them in order:
-    1. Missed speakers (assigned but did_speak=False) - HIGHEST priority
-    2. Unassigned members - MIDDLE priority (preserve original order)
-    3. Spoke members (assigned and did_speak=True) - LOWEST priority
-    
-    Args:
-        current_order: List of Employee objects in current order (e.g., by .order field)
-        assigned_members: List of Employee objects assigned this month
-        did_speak_map: Dict {employee_id: bool} indicating if each assigned member spoke
-    
-    Returns:
-        List of Employee objects in new rotation order
-    """
-    # Identify the three groups
-    assigned_set = set(emp.id for emp in assigned_members)
-    missed_speakers = []
-    spoke_members = []
-    unassigned_members = []
-    
-    for emp in current_order:
-        if emp.id in assigned_set:
-            # This employee was assigned
-            if did_speak_map.get(emp.id, True):
-                # Checkbox was checked (True) or not present -> they spoke
-                spoke_members.append(emp)
-            else:
-                # Checkbox was unchecked (False) -> they didn't speak
-                missed_speakers.append(emp)
-        else:
-            # This employee was NOT assigned
-            unassigned_members.append(emp)
-    
-    # Merge in the required order
-    new_rotation = missed_speakers + unassigned_members + spoke_members
-    
-    return new_rotation
-
-
 def get_next_month_date(from_date=None):
     """
     Calculate the first day of next month from a given date.
@@ -84,20 +62,70 @@ def get_next_month_date(from_date=None):
     return date(next_year, next_month, 1)
 
 
-def get_or_create_batch(month_date):
+def _build_dashboard_entry(member, speech_dates, today, version=None):
     """
-    Get or create a MonthlyEventBatch for the given month.
-    Ensures idempotency - no duplicate batches are created.
-    
+    Build the dict used by the dashboard to render a single employee row.
+
     Args:
-        month_date: A date object (preferably YYYY-MM-01)
-    
+        member: RosterMember (or Employee)
+        speech_dates: Dict from load_speech_dates()
+        today: Reference date for "days passed"
+        version: Employee version from get_employee_versions(), which keys
+            the cached row fragment
+    """
+    last_date, next_date = speech_dates.get(member.id, (None, None))
+    return {
+        "id": member.id,
+        "name": member.name,
+        "is_rotation_active": member.is_rotation_active,
+        "order": member.order,
+        "order_gyomu": member.order_gyomu,
+        "days_passed": (today - last_date).days if last_date else None,
+        "speech_date": next_date,
+        "speech_type": None,
+        "calendar": "",
+        "version": version,
+    }
+
+
+# Dashboard zones: zone name -> (order field, queryset of employees shown in the zone)
+DASHBOARD_ZONES = {
+    "3min": ("order", ROTATION_QUERYSETS["order"]),
+    "gyomu": ("order_gyomu", ROTATION_QUERYSETS["order_gyomu"]),
+}
+
+
+def _render_zone_rows(request, zone, employees):
+    """
+    Render dashboard row fragments for the given employees of one zone
+    (employees outside the zone are skipped).
+
+    Only the affected rows are rendered; the first/last flags (which control
+    the up/down arrows) are derived from a single min/max aggregate over the zone.
+
     Returns:
-        MonthlyEventBatch instance
+        List of {"id": employee pk, "html": rendered row} in display order
     """
-    month_start = date(month_date.year, month_date.month, 1)
-    batch, created = MonthlyEventBatch.objects.get_or_create(month=month_start)
-    return batch
+    field, zone_queryset = DASHBOARD_ZONES[zone]
+    in_zone = set(zone_queryset().filter(id__in=[emp.id for emp in employees]).values_list("id", flat=True))
+    employees = [emp for emp in employees if emp.id in in_zone]
+    bounds = zone_queryset().aggregate(first=models.Min(field), last=models.Max(field))
+
+    today = date.today()
+    speech_dates = load_speech_dates(today, [emp.id for emp in employees])
+    versions = get_employee_versions(emp.id for emp in employees)
+
+    rows = []
+    for emp in sorted(employees, key=lambda e: (getattr(e, field), e.id)):
+        position = getattr(emp, field)
+        html = render_to_string("core/_employee_row.html", {
+            "member": _build_dashboard_entry(emp, speech_dates, today, versions[emp.id]),
+            "zone": zone,
+            "is_first": position <= bounds["first"],
+            "is_last": position >= bounds["last"],
+        }, request=request)
+        rows.append({"id": emp.id, "html": html})
+    return rows
 
 
 # Create your views here.
@@ -105,47 +133,26 @@ def home(request):
     return render(request, "core/home.html", {"message": "Welcome to the Core Home Page!"})
 
 
-def dashboard_view(request):
+def _build_dashboard_context(today):
     """
-    Dashboard view that loads employee lists and batch info for current & next months.
-    
-    Context variables:
-    - top_zone: All employees ordered by 'order' (3分間スピーチ)
-    - bottom_zone: Member employees ordered by 'order_gyomu' (業務スピーチ)
-    - google_authenticated: Whether user has authenticated with Google Calendar
-    - current_year, current_month, next_year, next_month: Date info
-    - current_batch_exists, current_batch_sent: Current month batch status
-    - next_batch_exists, next_batch_sent: Next month batch status
+    Build the request-independent part of the dashboard context.
+    The result is cached by get_dashboard_context() until the data changes.
     """
-    # Top zone: order by `order` (3分間スピーチ ordering)
-    all_employees = Employee.objects.all().order_by("order", "id")
-    # Bottom zone: order by `order_gyomu` (業務スピーチ ordering)
-    member_employees = Employee.objects.filter(role=Role.MEMBER).order_by("order_gyomu", "id")
-
-    def build_entry(emp):
-        return {
-            "id": emp.id,
-            "name": emp.name,
-            "is_rotation_active": emp.is_rotation_active,
-            "order": getattr(emp, 'order', None),
-            "order_gyomu": getattr(emp, 'order_gyomu', None),
-            "days_passed": emp.days_since_last_speech(),
-            "speech_date": emp.next_speech_date(),
-            "speech_type": None,
-            "calendar": "",
-        }
-
-    # Check if user is authenticated with Google
-    google_authenticated = "google_credentials" in request.session
+    # One roster query + one aggregate for the speech dates of every row
+    members = load_roster()
+    speech_dates = load_speech_dates(today)
+    versions = get_employee_versions(m.id for m in members)
+    # One row dict per employee, shared by both zones
+    entries = {m.id: _build_dashboard_entry(m, speech_dates, today, versions[m.id]) for m in members}
 
     context = {
-        "top_zone": [build_entry(e) for e in all_employees],
-        "bottom_zone": [build_entry(e) for e in member_employees],
-        "google_authenticated": google_authenticated,
+        # Top zone: order by `order` (3分間スピーチ ordering)
+        "top_zone": [entries[m.id] for m in members],
+        # Bottom zone: order by `order_gyomu` (業務スピーチ ordering)
+        "bottom_zone": [entries[m.id] for m in gyomu_rotation(members)],
     }
 
     # Calculate current and next month dates
-    today = date.today()
     current_year = today.year
     current_month = today.month
     current_month_start = date(current_year, current_month, 1)
@@ -172,6 +179,29 @@ def dashboard_view(request):
         'next_batch_sent': bool(next_batch.is_sent) if next_batch else False,
     })
 
+    return context
+
+
+def dashboard_view(request):
+    """
+    Dashboard view that loads employee lists and batch info for current & next months.
+    
+    Context variables:
+    - top_zone: All employees ordered by 'order' (3分間スピーチ)
+    - bottom_zone: Member employees ordered by 'order_gyomu' (業務スピーチ)
+    - google_authenticated: Whether user has authenticated with Google Calendar
+    - current_year, current_month, next_year, next_month: Date info
+    - current_batch_exists, current_batch_sent: Current month batch status
+    - next_batch_exists, next_batch_sent: Next month batch status
+
+    Everything except google_authenticated is served from the cache
+    (see core/cache.py) and rebuilt only after a write to the underlying models.
+    """
+    context = dict(get_dashboard_context(date.today(), _build_dashboard_context))
+
+    # Check if user is authenticated with Google
+    context["google_authenticated"] = bool(request.session.get(GOOGLE_SESSION_FLAG))
+
     return render(request, "core/dashboard.html", context) 
 
 
@@ -226,6 +256,9 @@ def retract_schedule_redirect(request):
 
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"  # allow HTTP for local dev
 
+# Session key set once this browser completed the OAuth flow
+GOOGLE_SESSION_FLAG = "google_authenticated"
+
 CLIENT_SECRETS_FILE = "credentials.json"
 REDIRECT_URI = "http://localhost:8000/google/callback/"
 
@@ -235,11 +268,9 @@ REDIRECT_URI = "http://localhost:8000/google/callback/"
 # ---------------------------------------------------
 def google_auth(request):
 
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRETS_FILE,
-        scopes=['https://www.googleapis.com/auth/calendar'],
-        redirect_uri=REDIRECT_URI,
-    )
+    from .google_client import oauth_flow
+
+    flow = oauth_flow(CLIENT_SECRETS_FILE, REDIRECT_URI)
 
     authorization_url, state = flow.authorization_url(
         access_type='offline',
@@ -248,8 +279,8 @@ def google_auth(request):
     )
 
     # Store state in session - CRITICAL for CSRF protection
+    # (saved by SessionMiddleware with the response)
     request.session['oauth_state'] = state
-    request.session.save()  # Explicitly save the session
 
     return redirect(authorization_url)
 
@@ -257,44 +288,40 @@ def google_auth(request):
 # ---------------------------------------------------
 # 2) Google redirects HERE after you click Allow
 # ---------------------------------------------------
-@csrf_exempt
-def google_callback(request):
+def _fetch_credentials(state, authorization_response):
+    from .google_client import oauth_flow
+
+    flow = oauth_flow(CLIENT_SECRETS_FILE, REDIRECT_URI, state=state)
+    flow.fetch_token(authorization_response=authorization_response)
+    return flow.credentials
+
+
+def _store_credentials(request, creds):
+    # The token is kept server-side only (also used by background calendar
+    # sync); the session just remembers that this browser authenticated
+    save_credentials(creds)
+    request.session[GOOGLE_SESSION_FLAG] = True
+
+    # Clean up state from session
+    request.session.pop('oauth_state', None)
+
+
+async def google_callback(request):
     # Retrieve the state we saved in google_auth
-    state = request.session.get('oauth_state')
+    state = await sync_to_async(request.session.get)('oauth_state')
     
     if not state:
         messages.error(request, "Session expired. Please try authenticating again.")
         return redirect('google_auth')
 
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRETS_FILE,
-        scopes=['https://www.googleapis.com/auth/calendar'],
-        redirect_uri=REDIRECT_URI,
-        state=state,
-    )
-
+    # The token exchange is a round trip to Google: keep the event loop free
     try:
-        flow.fetch_token(authorization_response=request.build_absolute_uri())
+        creds = await _blocking(_fetch_credentials)(state, request.build_absolute_uri())
     except Exception as e:
         messages.error(request, f"Failed to authenticate with Google: {str(e)}")
         return redirect('google_auth')
 
-    creds = flow.credentials
-
-    # Save credentials in the session
-    request.session['google_credentials'] = {
-        "token": creds.token,
-        "refresh_token": creds.refresh_token,
-        "client_id": creds.client_id,
-        "client_secret": creds.client_secret,
-        "token_uri": creds.token_uri,
-        "scopes": creds.scopes,
-    }
-    
-    # Clean up state from session
-    if 'oauth_state' in request.session:
-        del request.session['oauth_state']
-    request.session.save()
+    await sync_to_async(_store_credentials)(request, creds)
 
     messages.success(request, "Google Calendar authentication successful!")
     return redirect('dashboard')
@@ -303,21 +330,10 @@ def google_callback(request):
 
 def test_create_event(request):
 
-    creds_data = request.session.get("google_credentials")
-    if not creds_data:
+    calendar = _get_calendar(request)
+    if not calendar:
         return HttpResponse(" Not authenticated. Go to /google/auth/ first.")
 
-    creds = Credentials(
-        token=creds_data["token"],
-        refresh_token=creds_data["refresh_token"],
-        token_uri=creds_data["token_uri"],
-        client_id=creds_data["client_id"],
-        client_secret=creds_data["client_secret"],
-        scopes=creds_data["scopes"]
-    )
-
-    service = build("calendar", "v3", credentials=creds)
-
     event_data = {
         "summary": "朝礼スピーチ試し",
         "start": {"date": "2025-12-01", "timeZone": "GMT+9"},
@@ -328,63 +344,51 @@ def test_create_event(request):
         ],
     }
 
-    event = service.events().insert(calendarId="primary", body=event_data).execute()
+    event = calendar.execute(calendar.service.events().insert(calendarId="primary", body=event_data, fields="htmlLink"))
     return HttpResponse(f"✔ Event created: {event.get('htmlLink')}")
 
 
 
 
-def move_up(request, employee_id):
-    emp = get_object_or_404(Employee, id=employee_id)
-    # Find employee with the highest order value less than current
-    above = Employee.objects.filter(order__lt=emp.order).order_by("-order").first()
-    if above:
-        emp.order, above.order = above.order, emp.order
-        emp.save()
-        above.save()
-    
-    # Return JSON for AJAX requests, otherwise redirect
+def _move(request, employee_id, field, step):
+    # Only employees of that rotation can be moved in it
+    emp = get_object_or_404(ROTATION_QUERYSETS[field](), id=employee_id)
+    neighbour = move_in_rotation(emp, field, step)
+
+    # Return only the swapped rows for AJAX requests, otherwise redirect
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return JsonResponse({'status': 'success', 'message': 'Order updated'})
+        zone = "3min" if field == "order" else "gyomu"
+        return _order_updated_response(request, zone, [emp, neighbour])
     return redirect("dashboard")
 
+
+def move_up(request, employee_id):
+    return _move(request, employee_id, "order", -1)
+
+
 def move_down(request, employee_id):
-    emp = get_object_or_404(Employee, id=employee_id)
-    below = Employee.objects.filter(order__gt=emp.order).order_by("order").first()
-    if below:
-        emp.order, below.order = below.order, emp.order
-        emp.save()
-        below.save()
-    
-    # Return JSON for AJAX requests, otherwise redirect
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return JsonResponse({'status': 'success', 'message': 'Order updated'})
-    return redirect("dashboard")
+    return _move(request, employee_id, "order", 1)
 
 
 def move_up_gyomu(request, employee_id):
-    emp = get_object_or_404(Employee, id=employee_id)
-    # Find employee with the highest order_gyomu value less than current
-    above = Employee.objects.filter(order_gyomu__lt=emp.order_gyomu).order_by("-order_gyomu").first()
-    if above:
-        emp.order_gyomu, above.order_gyomu = above.order_gyomu, emp.order_gyomu
-        emp.save()
-        above.save()
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return JsonResponse({'status': 'success', 'message': 'Order updated'})
-    return redirect("dashboard")
+    return _move(request, employee_id, "order_gyomu", -1)
 
 
 def move_down_gyomu(request, employee_id):
-    emp = get_object_or_404(Employee, id=employee_id)
-    below = Employee.objects.filter(order_gyomu__gt=emp.order_gyomu).order_by("order_gyomu").first()
-    if below:
-        emp.order_gyomu, below.order_gyomu = below.order_gyomu, emp.order_gyomu
-        emp.save()
-        below.save()
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return JsonResponse({'status': 'success', 'message': 'Order updated'})
-    return redirect("dashboard")
+    return _move(request, employee_id, "order_gyomu", 1)
+
+
+def _order_updated_response(request, zone, employees):
+    """
+    JSON response for AJAX reorder requests: the re-rendered rows of the
+    affected employees, so the client can patch the DOM without a reload.
+    """
+    employees = [emp for emp in employees if emp is not None]
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Order updated',
+        'zones': {zone: _render_zone_rows(request, zone, employees)},
+    })
 
 
 def toggle_active(request, employee_id):
@@ -392,6 +396,17 @@ def toggle_active(request, employee_id):
         employee = get_object_or_404(Employee, id=employee_id)
         employee.is_rotation_active = not employee.is_rotation_active
         employee.save()
+
+        # Return the employee's row in every zone it appears in for AJAX requests
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            zones = {"3min": _render_zone_rows(request, "3min", [employee])}
+            if employee.role == Role.MEMBER:
+                zones["gyomu"] = _render_zone_rows(request, "gyomu", [employee])
+            return JsonResponse({
+                'status': 'success',
+                'is_rotation_active': employee.is_rotation_active,
+                'zones': zones,
+            })
     return redirect(request.META.get('HTTP_REFERER', 'dashboard'))  # redirect back
 
 
@@ -439,17 +454,17 @@ def add_member_view(request):
             })
         
         try:
-            # Get the next order values
-            max_order = Employee.objects.aggregate(models.Max('order'))['order__max'] or -1
-            max_order_gyomu = Employee.objects.aggregate(models.Max('order_gyomu'))['order_gyomu__max'] or -1
+            # Reserve an employee ID and the next order slots (race-free)
+            [employee_id] = allocate_employee_ids(1)
+            [(order, order_gyomu)] = allocate_order_slots(1)
             
             # Create employee
             employee = Employee.objects.create(
                 name=name,
                 email=email,
-                employee_id=f"EMP{Employee.objects.count() + 1:03d}",
-                order=max_order + 1,
-                order_gyomu=max_order_gyomu + 1,
+                employee_id=employee_id,
+                order=order,
+                order_gyomu=order_gyomu,
                 is_rotation_active=is_active,
                 role=Role.MEMBER,
             )
@@ -466,6 +481,103 @@ def add_member_view(request):
             })
 
 
+# =====================================================
+# Bulk roster import / export
+# =====================================================
+ROSTER_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json; charset=utf-8",
+}
+
+
+def import_roster_view(request):
+    """
+    GET: display the upload form.
+    POST: upsert employees from an uploaded CSV/JSON file (see core/roster.py).
+    """
+    if request.method != "POST":
+        return render(request, "core/import_roster.html")
+
+    upload = request.FILES.get('file')
+    if not upload:
+        messages.error(request, "ファイルを選択してください。")
+        return render(request, "core/import_roster.html")
+
+    dry_run = request.POST.get('dry_run') == 'on'
+    fmt = detect_format(upload.name)
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+
+    try:
+        summary = import_roster(stream, fmt=fmt, dry_run=dry_run)
+    except (ValueError, UnicodeDecodeError) as e:
+        messages.error(request, f"ファイルを読み込めませんでした: {str(e)}")
+        return render(request, "core/import_roster.html")
+    except Exception as e:
+        logger.exception('Error importing roster')
+        messages.error(request, f"エラーが発生しました: {str(e)}")
+        return render(request, "core/import_roster.html")
+
+    # Show at most a handful of row errors; the rest are summarised
+    for row_number, message in summary['errors'][:10]:
+        messages.warning(request, f"{row_number}行目: {message}")
+    if len(summary['errors']) > 10:
+        messages.warning(request, f"他 {len(summary['errors']) - 10}件のエラーがあります。")
+
+    prefix = "（検証のみ）" if dry_run else ""
+    messages.success(
+        request,
+        f"{prefix}追加 {summary['created']}件、更新 {summary['updated']}件、スキップ {len(summary['errors'])}件"
+    )
+    if dry_run or summary['errors']:
+        return render(request, "core/import_roster.html")
+    return redirect("dashboard")
+
+
+# Chunks pulled per thread hop when a response streams under ASGI
+ASYNC_STREAM_BATCH = 200
+
+
+async def _pull_in_thread(chunks):
+    """
+    Async iterator over a blocking iterator of chunks. The iterator (and the
+    server-side cursor behind it) is advanced in the request's sync thread,
+    ASYNC_STREAM_BATCH chunks per hop.
+    """
+    chunks = iter(chunks)
+    next_batch = sync_to_async(lambda: list(islice(chunks, ASYNC_STREAM_BATCH)))
+    while True:
+        batch = await next_batch()
+        if not batch:
+            return
+        for chunk in batch:
+            yield chunk
+
+
+def _streaming_response(request, chunks, **kwargs):
+    """
+    StreamingHttpResponse that stays streamed under both servers. Under ASGI,
+    Django 4.2 consumes a sync iterator with sync_to_async(list), buffering
+    the whole export in memory, so it is given an async iterator instead.
+    """
+    if isinstance(request, ASGIRequest):
+        chunks = _pull_in_thread(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
+
+
+@require_http_methods(["GET"])
+def export_roster(request):
+    """
+    Stream the roster as CSV (default) or JSON: ?format=csv|json
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in ROSTER_CONTENT_TYPES:
+        return HttpResponse("Unsupported format.", status=400)
+
+    response = _streaming_response(request, iter_roster_export(fmt), content_type=ROSTER_CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="roster.{fmt}"'
+    return response
+
+
 # =====================================================
 # Remove member (modal + submit)
 # =====================================================
@@ -515,32 +627,12 @@ def remove_member_submit(request):
         # log admin and timestamp
         admin = getattr(request, 'user', None)
         admin_repr = getattr(admin, 'username', 'anonymous') if admin else 'anonymous'
-        logger.info(f"Removing employee {employee.email} by admin={admin_repr}")
-
-        # Remove / delete employee
-        emp_id = employee.id
-        employee.delete()
-
-        # Nullify schedule entries that referenced this employee
-        ScheduleEntry.objects.filter(assigned_employee_id=emp_id).update(
-            assigned_employee=None,
-            is_sent=False,
-            google_event_id=None
+        logger.info(
+            "Removing employee %s by admin=%s", employee.email, admin_repr,
+            extra={"event": "employee.remove", "employee_id": employee.pk, "admin": admin_repr},
         )
 
-        # Recompute order (3分間) for all employees preserving relative order
-        all_emps = list(Employee.objects.all().order_by('order', 'id'))
-        for idx, e in enumerate(all_emps, start=1):
-            if e.order != idx:
-                e.order = idx
-                e.save()
-
-        # Recompute order_gyomu for members
-        gyomu_emps = list(Employee.objects.filter(role=Role.MEMBER).order_by('order_gyomu', 'id'))
-        for idx, e in enumerate(gyomu_emps, start=1):
-            if e.order_gyomu != idx:
-                e.order_gyomu = idx
-                e.save()
+        remove_employee(employee)
 
         success_msg = 'メンバーを削除しました。'
         if is_ajax:
@@ -561,35 +653,13 @@ def remove_member_submit(request):
 # =====================================================
 # STEP 1: Generate Schedule View
 # =====================================================
-def _get_business_days(year, month):
-    """
-    Returns a list of all business days (Monday-Friday) in the given month.
-    """
-    first_day, num_days = monthrange(year, month)
-    business_days = []
-    
-    for day in range(1, num_days + 1):
-        current_date = date(year, month, day)
-        # 0=Monday, 6=Sunday
-        if current_date.weekday() < 5:  # Monday to Friday
-            business_days.append(current_date)
-    
-    return business_days
-
-
 @require_http_methods(["POST"])
 def generate_schedule(request):
     """
-    Generate schedule entries for a given month.
-
-    POST parameters: year, month
+    Generate schedule entries for a given month (see core/schedule_planner.py).
 
-    Rules:
-    - A batch can only be generated once per month (use get_or_create_batch)
-    - If batch is already sent, do NOT allow regeneration
-    - First 6 business days: no assignment
-    - Last 5 business days: assigned using order_gyomu (業務スピーチ)
-    - Middle business days: assigned using order (３分間スピーチ)
+    POST parameters: year, month, strategy (optional, defaults to
+    settings.SCHEDULE_STRATEGY)
     """
     try:
         year = int(request.POST.get('year'))
@@ -598,86 +668,38 @@ def generate_schedule(request):
         messages.error(request, "Invalid year or month.")
         return redirect('dashboard')
 
-    # Enforce batch rules: prevent regeneration of sent batches
-    month_start = date(year, month, 1)
-    batch = get_or_create_batch(month_start)
-    
-    if batch.is_sent:
-        messages.error(request, "この月は既に送信済みのため、スケジュールの作成はできません。")
+    try:
+        created_count = generate_month(year, month, request.POST.get('strategy'))
+    except ScheduleError as e:
+        messages.error(request, str(e))
         return redirect('dashboard')
 
-    # Get all business days in the month
-    business_days = _get_business_days(year, month)
+    messages.success(request, f"Generated schedule for {year}-{month:02d}. ({created_count} entries)")
+    return redirect('schedule_preview', year=year, month=month)
 
-    if len(business_days) == 0:
-        messages.error(request, f"No business days in {year}-{month:02d}.")
-        return redirect('dashboard')
 
-    # Split into groups
-    first_six = business_days[:6]
-    last_five = business_days[-5:] if len(business_days) >= 5 else []
-    middle_days = business_days[6:-5] if len(business_days) > 11 else []
-
-    # Get employees ordered for rotation
-    three_min_employees = Employee.objects.filter(is_rotation_active=True).order_by('order', 'id')
-    gyomu_employees = Employee.objects.filter(role=Role.MEMBER, is_rotation_active=True).order_by('order_gyomu', 'id')
-
-    # Create schedule entries
-    created_count = 0
-
-    # First 6 business days: no assignment (or skip)
-    for day in first_six:
-        ScheduleEntry.objects.update_or_create(
-            date=day,
-            defaults={
-                'speech_type': SpeechType.THREE_MIN,
-                'assigned_employee': None,
-                'is_cancelled': False,
-                'is_sent': False,
-                'google_event_id': None,
-                'batch': batch,
-            }
-        )
-        created_count += 1
-
-    # Middle business days: assign using order (３分間スピーチ)
-    if three_min_employees.exists():
-        for idx, day in enumerate(middle_days):
-            emp_idx = idx % len(three_min_employees)
-            employee = three_min_employees[emp_idx]
-            ScheduleEntry.objects.update_or_create(
-                date=day,
-                defaults={
-                    'speech_type': SpeechType.THREE_MIN,
-                    'assigned_employee': employee,
-                    'is_cancelled': False,
-                    'is_sent': False,
-                    'google_event_id': None,
-                    'batch': batch,
-                }
-            )
-            created_count += 1
-
-    # Last 5 business days: assign using order_gyomu (業務スピーチ)
-    if gyomu_employees.exists():
-        for idx, day in enumerate(last_five):
-            emp_idx = idx % len(gyomu_employees)
-            employee = gyomu_employees[emp_idx]
-            ScheduleEntry.objects.update_or_create(
-                date=day,
-                defaults={
-                    'speech_type': SpeechType.BUSINESS,
-                    'assigned_employee': employee,
-                    'is_cancelled': False,
-                    'is_sent': False,
-                    'google_event_id': None,
-                    'batch': batch,
-                }
-            )
-            created_count += 1
+# =====================================================
+# What-if simulation (in memory, no DB writes)
+# =====================================================
+@require_http_methods(["POST"])
+def simulate_schedule(request):
+    """
+    Project assignments and fairness stats for a hypothetical ordering /
+    active set over N months, without touching the stored schedule.
 
-    messages.success(request, f"Generated schedule for {year}-{month:02d}. ({created_count} entries)")
-    return redirect('schedule_preview', year=year, month=month)
+    JSON body: see core/simulation.normalize_simulation_input.
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
+
+    try:
+        result = simulate(data)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    return JsonResponse({'status': 'success', **result})
 
 
 # =====================================================
@@ -698,7 +720,7 @@ def schedule_preview(request, year, month):
         return redirect('dashboard')
 
     # Get all business days for this month
-    business_days = _get_business_days(year, month)
+    business_days = get_business_days(year, month)
 
     # Load schedule entries for this month
     schedule_entries = ScheduleEntry.objects.filter(
@@ -713,6 +735,7 @@ def schedule_preview(request, year, month):
     for day in business_days:
         entry = entry_map.get(day)
         schedule_data.append({
+            'id': entry.id if entry else None,
             'date': day,
             'date_display': day.strftime('%Y-%m-%d'),
             'day_name': ['月', '火', '水', '木', '金'][day.weekday()],
@@ -720,6 +743,7 @@ def schedule_preview(request, year, month):
             'speech_type_display': entry.get_speech_type_display() if entry else 'N/A',
             'assigned_employee': entry.assigned_employee.name if entry and entry.assigned_employee else 'N/A',
             'is_sent': entry.is_sent if entry else False,
+            'is_cancelled': entry.is_cancelled if entry else False,
         })
     schedule_data = schedule_data[6:]
 
@@ -741,33 +765,135 @@ def schedule_preview(request, year, month):
 
 
 # =====================================================
-# STEP 3: Send to Google Calendar View
+# Schedule export (CSV / iCalendar)
 # =====================================================
-def _get_google_service(request):
+SCHEDULE_EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ics": "text/calendar; charset=utf-8",
+}
+
+
+@require_http_methods(["GET"])
+def export_schedule(request):
     """
-    Get Google Calendar service from session credentials.
-    Returns None if not authenticated.
+    Stream schedule entries for any date range as CSV or iCalendar.
+
+    GET parameters:
+    - start, end: YYYY-MM-DD, inclusive (default: the current month)
+    - format: csv (default) or ics
     """
-    creds_data = request.session.get('google_credentials')
-    if not creds_data:
-        return None
-    
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in SCHEDULE_EXPORT_CONTENT_TYPES:
+        return HttpResponse("Unsupported format.", status=400)
+
+    today = date.today()
     try:
-        creds = Credentials(
-            token=creds_data.get("token"),
-            refresh_token=creds_data.get("refresh_token"),
-            token_uri=creds_data.get("token_uri"),
-            client_id=creds_data.get("client_id"),
-            client_secret=creds_data.get("client_secret"),
-            scopes=creds_data.get("scopes")
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else date(today.year, today.month, 1)
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else date(
+            today.year, today.month, monthrange(today.year, today.month)[1]
         )
-        return build("calendar", "v3", credentials=creds)
-    except Exception as e:
+    except ValueError:
+        return HttpResponse("Invalid start or end date (expected YYYY-MM-DD).", status=400)
+
+    if end < start:
+        return HttpResponse("end must not be before start.", status=400)
+
+    response = _streaming_response(
+        request,
+        iter_schedule_export(fmt, start, end),
+        content_type=SCHEDULE_EXPORT_CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="schedule_{start:%Y%m%d}_{end:%Y%m%d}.{fmt}"'
+    return response
+
+
+# =====================================================
+# iCalendar subscription feeds
+# =====================================================
+def _feed_state(request, kind, token):
+    """
+    Feed state for this request, resolved once and shared by the
+    conditional-GET callbacks and the view (cache lookups only, no DB).
+    """
+    if not hasattr(request, '_feed_state'):
+        request._feed_state = get_feed_state(kind, token)
+    return request._feed_state
+
+
+def _feed_etag(request, kind, token):
+    state = _feed_state(request, kind, token)
+    return state["etag"] if state else None
+
+
+def _feed_last_modified(request, kind, token):
+    state = _feed_state(request, kind, token)
+    return state["last_modified"] if state else None
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def schedule_feed(request, kind, token):
+    """
+    Serve a signed per-employee or roster .ics feed.
+    Unchanged feeds are answered with 304 by the condition() decorator.
+    """
+    state = _feed_state(request, kind, token)
+    if state is None:
+        raise Http404("Unknown feed.")
+
+    body = get_feed_body(state)
+    if body is None:
+        raise Http404("Unknown feed.")
+
+    response = HttpResponse(body, content_type="text/calendar; charset=utf-8")
+    patch_cache_control(response, private=True, max_age=settings.FEED_MAX_AGE)
+    return response
+
+
+# =====================================================
+# STEP 3: Send to Google Calendar View
+# =====================================================
+def _get_calendar(request):
+    """
+    Get a CalendarGateway for a session that completed the OAuth flow,
+    using the server-side credentials. Returns None if not authenticated.
+    """
+    if not request.session.get(GOOGLE_SESSION_FLAG):
         return None
+    return get_stored_calendar()
 
 
-@require_http_methods(["GET","POST"])
-def send_schedule_to_calendar(request, year, month):
+def _require_methods(request_method_list):
+    """
+    require_http_methods() for async views (the Django 4.2 decorators only
+    wrap sync functions).
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            if request.method not in request_method_list:
+                return HttpResponseNotAllowed(request_method_list)
+            return await view(request, *args, **kwargs)
+        return inner
+    return decorator
+
+
+def _blocking(func):
+    """
+    Run blocking Google calls (and the ORM work around them) in a worker
+    thread, so under ASGI the event loop keeps serving other requests while
+    they are in flight. The thread's DB connection is closed afterwards.
+    """
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connection.close()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+@_require_methods(["GET", "POST"])
+async def send_schedule_to_calendar(request, year, month):
     """
     Send all schedule entries for the selected month to Google Calendar.
     
@@ -776,6 +902,9 @@ def send_schedule_to_calendar(request, year, month):
     
     Also applies rotation logic based on did_speak checkboxes from Kakunin Gamen.
 
+    Async: the calendar calls run in a worker thread (see _blocking), so an
+    ASGI worker keeps serving other requests while they are in flight.
+
     POST parameters: year, month, did_speak_<date> (checkboxes)
     """
     try:
@@ -786,13 +915,13 @@ def send_schedule_to_calendar(request, year, month):
         return redirect('dashboard')
 
     # Check if user is authenticated with Google
-    service = _get_google_service(request)
-    if not service:
+    calendar = await sync_to_async(_get_calendar)(request)
+    if not calendar:
         messages.error(request, "Not authenticated with Google Calendar. Please authenticate first.")
         return redirect('google_auth')
 
     month_start = date(year, month, 1)
-    batch = MonthlyEventBatch.objects.filter(month=month_start).first()
+    batch = await MonthlyEventBatch.objects.filter(month=month_start).afirst()
     
     if not batch:
         messages.error(request, "スケジュールが生成されていません。先にスケジュールを作成してください。")
@@ -803,130 +932,25 @@ def send_schedule_to_calendar(request, year, month):
         messages.error(request, "この月は既に送信済みです。再度の送信はできません。")
         return redirect('schedule_preview', year=year, month=month)
 
-    # Load schedule entries linked to this batch
-    schedule_entries = ScheduleEntry.objects.filter(
-        batch=batch,
-        assigned_employee__isnull=False
-    ).select_related('assigned_employee')
-
-    sent_count = 0
-    error_count = 0
-
-    for entry in schedule_entries:
-        try:
-            # Validate email
-            if not entry.assigned_employee.email:
-                messages.warning(request, f"{entry.assigned_employee.name} has no email.")
-                error_count += 1
+    result = await _blocking(send_batch)(calendar, batch)
+    for _entry, message in result.failures:
+        messages.warning(request, message)
+
+    # Rotation: a checked did_speak_<YYYY-MM-DD> box means that day's speaker spoke
+    spoken_dates = set()
+    for key in request.POST:
+        if key.startswith('did_speak_'):
+            try:
+                spoken_dates.add(date.fromisoformat(key[len('did_speak_'):]))
+            except ValueError:
                 continue
-
-            # Create event with just speech type as title
-            event_title = entry.get_speech_type_display()  # Just "業務" or "３分間"
-
-            event_data = {
-                "summary": event_title,
-                "start": {"date": entry.date.isoformat(), "timeZone": "Asia/Tokyo"},
-                "end": {"date": (entry.date + timedelta(days=1)).isoformat(), "timeZone": "Asia/Tokyo"},
-                "attendees": [
-                    {"email": entry.assigned_employee.email}
-                ],
-            }
-
-            # DON'T FORGET TO CHANGE THE ID WHEN Setting up a new user
-            event = service.events().insert(calendarId="c_d4fadaaa8d92cb15033ceef352f6e8685947cad7f3cb52af359e4a814dccc6da@group.calendar.google.com", body=event_data, sendNotifications=False).execute()
-            event_id = event.get('id')
-
-            # Save event ID and mark as sent
-            entry.google_event_id = event_id
-            entry.is_sent = True
-            entry.save()
-            sent_count += 1
-
-        except HttpError as e:
-            messages.warning(request, f"Failed to create event for {entry.date}: {str(e)}")
-            error_count += 1
-        except Exception as e:
-            messages.warning(request, f"Error for {entry.date}: {str(e)}")
-            error_count += 1
-
-    # Mark batch as sent only if we successfully sent at least some events
-    if sent_count > 0:
-        batch.is_sent = True
-        batch.save()
-
-    # ==========================================
-    # ROTATION LOGIC: Apply after sending
-    # ==========================================
     try:
-        # Parse did_speak checkboxes from POST data
-        # Format: did_speak_<YYYY-MM-DD> = employee_name
-        did_speak_map = {}  # {employee_id: did_speak_bool}
-        
-        # Get all schedule entries for this month to map dates to employees
-        all_entries = ScheduleEntry.objects.filter(
-            batch=batch,
-            assigned_employee__isnull=False
-        ).select_related('assigned_employee')
-        
-        # Debug: Log POST keys
-        logging.debug(f"POST keys for rotation: {list(request.POST.keys())}")
-        
-        for entry in all_entries:
-            date_str = entry.date.strftime('%Y-%m-%d')
-            checkbox_key = f'did_speak_{date_str}'
-            # If checkbox exists in POST, employee spoke. If missing, they didn't.
-            spoke = checkbox_key in request.POST
-            did_speak_map[entry.assigned_employee.id] = spoke
-            logging.debug(f"Employee {entry.assigned_employee.name} ({entry.assigned_employee.id}): {checkbox_key} -> {spoke}")
-        
-        # Get list of assigned members for this month
-        assigned_members = set(
-            Employee.objects.filter(
-                id__in=[e.assigned_employee.id for e in all_entries]
-            )
-        )
-        
-        logging.debug(f"Assigned members: {[e.name for e in assigned_members]}")
-        logging.debug(f"did_speak_map: {did_speak_map}")
-        
-        # Determine which field to update based on speech type
-        # For now, we'll update BOTH order and order_gyomu to maintain consistency
-        # Get current rotation for 3-minute speeches
-        three_min_employees = list(
-            Employee.objects.filter(is_rotation_active=True).order_by('order', 'id')
-        )
-        
-        # Get current rotation for business speeches
-        gyomu_employees = list(
-            Employee.objects.filter(role=Role.MEMBER, is_rotation_active=True).order_by('order_gyomu', 'id')
-        )
-        
-        logging.debug(f"3-min employees before: {[(e.id, e.name, e.order) for e in three_min_employees]}")
-        logging.debug(f"Gyomu employees before: {[(e.id, e.name, e.order_gyomu) for e in gyomu_employees]}")
-        
-        # Apply rotation for 3-minute speeches
-        if three_min_employees:
-            new_order_3min = apply_rotation(three_min_employees, assigned_members, did_speak_map)
-            logging.debug(f"3-min employees after apply_rotation: {[(e.id, e.name) for e in new_order_3min]}")
-            for idx, emp in enumerate(new_order_3min, start=1):
-                emp.order = idx
-                emp.save()
-            logging.debug(f"3-min employees saved with new order")
-        
-        # Apply rotation for business speeches
-        if gyomu_employees:
-            new_order_gyomu = apply_rotation(gyomu_employees, assigned_members, did_speak_map)
-            logging.debug(f"Gyomu employees after apply_rotation: {[(e.id, e.name) for e in new_order_gyomu]}")
-            for idx, emp in enumerate(new_order_gyomu, start=1):
-                emp.order_gyomu = idx
-                emp.save()
-            logging.debug(f"Gyomu employees saved with new order")
-        
+        await sync_to_async(advance_rotation)(batch, spoken_dates)
         messages.success(request, "ローテーション更新完了しました。")
-    
     except Exception as e:
         messages.warning(request, f"ローテーション更新中にエラーが発生しました: {str(e)}")
 
+    sent_count, error_count = result.done, len(result.failures)
     messages.success(request, f"{sent_count}件　登録完了")
     if error_count > 0:
         messages.warning(request, f"{error_count} events failed to send.")
@@ -938,8 +962,8 @@ def send_schedule_to_calendar(request, year, month):
 # =====================================================
 # STEP 4: Retract (Delete from Google Calendar) View
 # =====================================================
-@require_http_methods(["POST"])
-def retract_schedule(request, year, month):
+@_require_methods(["POST"])
+async def retract_schedule(request, year, month):
     """
     Delete previously-sent Google Calendar events for the selected month.
     Resets batch.is_sent to False so the schedule can be resent if needed.
@@ -954,59 +978,22 @@ def retract_schedule(request, year, month):
         return redirect('dashboard')
 
     # Check if user is authenticated with Google
-    service = _get_google_service(request)
-    if not service:
+    calendar = await sync_to_async(_get_calendar)(request)
+    if not calendar:
         messages.error(request, "Not authenticated with Google Calendar. Please authenticate first.")
         return redirect('google_auth')
 
     month_start = date(year, month, 1)
-    batch = MonthlyEventBatch.objects.filter(month=month_start).first()
+    batch = await MonthlyEventBatch.objects.filter(month=month_start).afirst()
     if not batch:
         messages.error(request, "この月の送信情報が見つかりません。")
         return redirect('schedule_preview', year=year, month=month)
 
-    # Load schedule entries for this batch that were sent
-    schedule_entries = ScheduleEntry.objects.filter(
-        batch=batch,
-        google_event_id__isnull=False
-    )
-
-    deleted_count = 0
-    error_count = 0
-
-    for entry in schedule_entries:
-        try:
-            if entry.google_event_id:
-                # Delete from calendar where it was created
-                service.events().delete(
-                    # DON'T FORGET TO CHANGE THE ID WHEN Setting up a new user  
-                    calendarId="c_d4fadaaa8d92cb15033ceef352f6e8685947cad7f3cb52af359e4a814dccc6da@group.calendar.google.com",
-                    eventId=entry.google_event_id
-                ).execute()
-
-                # Clear event ID and mark as not sent
-                entry.google_event_id = None
-                entry.is_sent = False
-                entry.save()
-                deleted_count += 1
-        except HttpError as e:
-            if e.resp.status == 404:
-                # Event already deleted on Google side, just clear locally
-                entry.google_event_id = None
-                entry.is_sent = False
-                entry.save()
-                deleted_count += 1
-            else:
-                messages.warning(request, f"Failed to delete event for {entry.date}: {str(e)}")
-                error_count += 1
-        except Exception as e:
-            messages.warning(request, f"Error for {entry.date}: {str(e)}")
-            error_count += 1
-
-    # After deletion, reset batch.is_sent to False so schedule can be resent
-    batch.is_sent = False
-    batch.save()
+    result = await _blocking(retract_batch)(calendar, batch)
+    for _entry, message in result.failures:
+        messages.warning(request, message)
 
+    deleted_count, error_count = result.done, len(result.failures)
     messages.success(request, f"{deleted_count}件　削除完了")
     if error_count > 0:
         messages.warning(request, f"{error_count} events failed to retract.")
@@ -1014,7 +1001,112 @@ def retract_schedule(request, year, month):
     return redirect('schedule_preview', year=year, month=month)
 
 
+# =====================================================
+# STEP 5: Edit a sent schedule (cancel / reassign / swap)
+# =====================================================
+def _entry_payload(entry):
+    return {
+        'id': entry.id,
+        'date': entry.date.isoformat(),
+        'assigned_employee': entry.assigned_employee.name if entry.assigned_employee else None,
+        'is_cancelled': entry.is_cancelled,
+        'is_sent': entry.is_sent,
+    }
+
+
+def _schedule_edit(request, edit, *args):
+    """
+    Run a schedule edit and answer with JSON for AJAX requests,
+    otherwise flash a message and go back to the month's preview.
+    """
+    from .google_client import HttpError
+
+    try:
+        result = edit(_get_calendar(request), *args)
+    except ScheduleEditError as e:
+        error = str(e)
+    except HttpError as e:
+        error = f"Google Calendar の更新に失敗しました: {str(e)}"
+    else:
+        entries = result if isinstance(result, tuple) else (result,)
+        message = "スケジュールを更新しました。"
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({
+                'status': 'success',
+                'message': message,
+                'entries': [_entry_payload(entry) for entry in entries],
+            })
+        messages.success(request, message)
+        return redirect('schedule_preview', year=entries[0].date.year, month=entries[0].date.month)
+
+    return _schedule_edit_error(request, error)
+
+
+def _schedule_edit_error(request, error):
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'status': 'error', 'message': error}, status=400)
+    messages.error(request, error)
+    return redirect(request.META.get('HTTP_REFERER', 'dashboard'))
+
+
+@require_http_methods(["POST"])
+def cancel_entry(request, entry_id):
+    """
+    Cancel one day: only its calendar event is deleted.
+    """
+    return _schedule_edit(request, schedule_edits.cancel_entry, entry_id)
 
 
+@require_http_methods(["POST"])
+def reassign_entry(request, entry_id):
+    """
+    Give one day to another employee: only its calendar event is patched.
+
+    POST parameters: employee_id
+    """
+    try:
+        employee_id = int(request.POST.get('employee_id', ''))
+    except ValueError:
+        return _schedule_edit_error(request, "employee_id is required.")
+    return _schedule_edit(request, schedule_edits.reassign_entry, entry_id, employee_id)
+
+
+@require_http_methods(["POST"])
+def swap_entries(request, entry_id):
+    """
+    Swap the speakers of two days: only their two calendar events are patched.
+
+    POST parameters: other_entry_id
+    """
+    try:
+        other_entry_id = int(request.POST.get('other_entry_id', ''))
+    except ValueError:
+        return _schedule_edit_error(request, "other_entry_id is required.")
+    return _schedule_edit(request, schedule_edits.swap_entries, entry_id, other_entry_id)
+
+
+# =====================================================
+# Google Calendar push notifications
+# =====================================================
+@csrf_exempt
+@require_http_methods(["POST"])
+def calendar_webhook(request):
+    """
+    Receive a push notification for a channel registered with
+    `manage.py sync_calendar --watch URL`. Google gets its answer at once;
+    the incremental sync runs afterwards in the background and concurrent
+    notifications share it (see calendar_sync.request_sync).
+    """
+    state = find_channel(
+        request.headers.get('X-Goog-Channel-ID'),
+        request.headers.get('X-Goog-Channel-Token'),
+    )
+    if state is None:
+        raise Http404("Unknown channel.")
 
+    # The first message only confirms the channel
+    if request.headers.get('X-Goog-Resource-State') == 'sync':
+        return HttpResponse(status=204)
 
+    request_sync()
+    return HttpResponse(status=204)
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -19,13 +22,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-+ikc*=-t3*a=i5$01cdul6mci)g@z%qprh0s6qjjc$#mbzo4+e"
+# Production profile: DJANGO_DEBUG=False plus DJANGO_SECRET_KEY and
+# ALLOWED_HOSTS from the environment (see .env.example).
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DJANGO_DEBUG", "True").lower() in ("1", "true", "yes", "on")
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get(
+    "DJANGO_SECRET_KEY", "django-insecure-+ikc*=-t3*a=i5$01cdul6mci)g@z%qprh0s6qjjc$#mbzo4+e"
+)
+if not DEBUG and SECRET_KEY.startswith("django-insecure-"):
+    raise ImproperlyConfigured("Set DJANGO_SECRET_KEY when DJANGO_DEBUG is off.")
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get("ALLOWED_HOSTS", "").split(",") if host.strip()]
 
 
 # Application definition
@@ -43,12 +53,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Serves STATIC_ROOT; as early as possible so static requests skip the rest
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Staff-only, on request (X-Profile: 1 or ?__profile=1); see core/profiling.py
+    "core.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "jidouka.urls"
@@ -70,6 +84,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "jidouka.wsgi.application"
+# Served by gunicorn.conf.py (WSGI, or ASGI with the uvicorn worker class)
+ASGI_APPLICATION = "jidouka.asgi.application"
 
 
 # Database
@@ -83,6 +99,98 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# locmem is per-process: when running several workers, point this at a shared
+# backend (e.g. redis or memcached) so cache invalidation reaches every worker.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "jidouka"),
+    }
+}
+if CACHES["default"]["BACKEND"].endswith("LocMemCache"):
+    # The default limit (300) is far below the dashboard row fragments (two per employee)
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": int(os.environ.get("DJANGO_CACHE_MAX_ENTRIES", 20000))}
+
+# Sessions only hold small flags (OAuth tokens are stored in GoogleCredential).
+# With a shared cache, cached_db reads them from the cache and only hits
+# django_session on a miss; with the per-process locmem cache it would let
+# workers serve each other's stale sessions (OAuth state, the Google flag),
+# so plain db is the default there. "django.contrib.sessions.backends.cache"
+# skips the table entirely but needs a shared, persistent cache.
+# Purge expired rows with `manage.py purge_sessions`.
+SHARED_CACHE = CACHES["default"]["BACKEND"].rsplit(".", 1)[-1] not in ("LocMemCache", "DummyCache")
+SESSION_ENGINE = os.environ.get(
+    "DJANGO_SESSION_ENGINE",
+    "django.contrib.sessions.backends.cached_db" if SHARED_CACHE else "django.contrib.sessions.backends.db",
+)
+
+# Seconds a cached dashboard context is kept (it is invalidated on writes anyway)
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get("DASHBOARD_CACHE_TIMEOUT", 300))
+
+# iCalendar feeds: render cache lifetime, client max-age, and how far back
+# the roster feed reaches (per-employee feeds contain every entry)
+FEED_CACHE_TIMEOUT = int(os.environ.get("FEED_CACHE_TIMEOUT", 24 * 60 * 60))
+FEED_MAX_AGE = int(os.environ.get("FEED_MAX_AGE", 300))
+FEED_PAST_DAYS = int(os.environ.get("FEED_PAST_DAYS", 365))
+
+# Default assignment strategy for generated schedules (see core/scheduling.py):
+# "round_robin" (restart from the top each month) or "fair" (history-aware)
+SCHEDULE_STRATEGY = os.environ.get("SCHEDULE_STRATEGY", "round_robin")
+
+# What-if simulation: longest horizon accepted and how long results are memoized
+SIMULATION_MAX_MONTHS = int(os.environ.get("SIMULATION_MAX_MONTHS", 36))
+SIMULATION_CACHE_TIMEOUT = int(os.environ.get("SIMULATION_CACHE_TIMEOUT", 600))
+
+# Google Calendar that schedule events are written to
+GOOGLE_CALENDAR_ID = os.environ.get(
+    "GOOGLE_CALENDAR_ID",
+    "c_d4fadaaa8d92cb15033ceef352f6e8685947cad7f3cb52af359e4a814dccc6da@group.calendar.google.com",
+)
+
+# Calendar API throttling, shared by all workers (see core/ratelimit.py):
+# sustained requests per second, burst size, and retries after a rate-limit error
+GOOGLE_API_RATE = float(os.environ.get("GOOGLE_API_RATE", 5))
+GOOGLE_API_BURST = int(os.environ.get("GOOGLE_API_BURST", 10))
+GOOGLE_API_MAX_RETRIES = int(os.environ.get("GOOGLE_API_MAX_RETRIES", 5))
+
+# Profiled requests kept (admin: Core > Profile reports)
+PROFILE_REPORT_LIMIT = int(os.environ.get("PROFILE_REPORT_LIMIT", 50))
+
+
+# Logging
+# https://docs.djangoproject.com/en/4.2/topics/logging/
+# The app's loggers write through a queue drained by a background thread
+# (see core/log.py). DJANGO_LOG_FORMAT=json emits one JSON object per line,
+# with the `extra` fields (event, month, sent, failed, duration_ms...) as keys.
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "text": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+        "json": {"()": "core.log.JsonFormatter"},
+    },
+    "handlers": {
+        "queue": {
+            "class": "core.log.QueueStreamHandler",
+            "formatter": os.environ.get("DJANGO_LOG_FORMAT", "text"),
+        },
+    },
+    "loggers": {
+        "core": {
+            "handlers": ["queue"],
+            "level": os.environ.get("DJANGO_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -119,6 +227,32 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Filled by `manage.py collectstatic` (the Docker image runs it at build time)
+# and served by WhiteNoise.
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# Outside DEBUG, collectstatic writes content-hashed copies of every file
+# (dashboard.3f2a9c.js) with pre-compressed .gz and .br variants (.br needs
+# the Brotli package), and {% static %} points at them. WhiteNoise serves
+# hashed names with a one-year immutable Cache-Control, so browsers fetch
+# each asset once per release. In DEBUG, files are served unhashed from the
+# app directories and no collectstatic is needed.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if DEBUG
+            else "whitenoise.storage.CompressedManifestStaticFilesStorage"
+        ),
+    },
+}
+
+# Unhashed static URLs (e.g. admin assets referenced by name) are cached for this long
+WHITENOISE_MAX_AGE = int(os.environ.get("WHITENOISE_MAX_AGE", 60 * 60))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 